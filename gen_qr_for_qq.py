@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """生成抖音登录二维码并保存为图片"""
-import json, os, time, base64
+import os, sys, time, base64
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from douyin_core.cookies import save_cookies
+
 os.chdir(Path(__file__).parent)
 
 print("="*50)
@@ -107,10 +110,7 @@ with sync_playwright() as p:
         cookies = context.cookies()
         if cookies:
             cookie_file = Path('assets/cookies.json')
-            cookie_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(cookie_file, 'w', encoding='utf-8') as f:
-                json.dump(cookies, f, indent=2, ensure_ascii=False)
-            print(f"✅ Cookie 已保存：{cookie_file}")
+            save_cookies(cookies, str(cookie_file))
         
         print()
         print("🎉 完成！")
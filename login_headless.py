@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """抖音登录 - 无头模式，提取二维码 URL"""
-import json, os, time, re
+import os, sys, time, re
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from douyin_core.cookies import discard_cookies, save_cookies
+
 os.chdir(Path(__file__).parent)
 
 print("="*50)
@@ -13,8 +16,8 @@ print()
 
 cookie_file = Path('assets/cookies.json')
 if cookie_file.exists():
-    cookie_file.unlink()
-    print("🗑️  已删除旧 Cookie")
+    discard_cookies(str(cookie_file))
+    print("🗑️  已删除旧 Cookie（存入 assets/.history，可回滚）")
 
 with sync_playwright() as p:
     browser = p.chromium.launch(
@@ -115,10 +118,7 @@ with sync_playwright() as p:
         # 保存 Cookie
         cookies = context.cookies()
         if cookies:
-            cookie_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(cookie_file, 'w', encoding='utf-8') as f:
-                json.dump(cookies, f, indent=2, ensure_ascii=False)
-            print(f"✅ Cookie 已保存：{cookie_file}")
+            save_cookies(cookies, str(cookie_file))
             print(f"📊 共 {len(cookies)} 个 Cookie")
         
         print()
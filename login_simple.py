@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """抖音登录 - 简化版"""
-import json, os, time
+import os, sys, time
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from douyin_core.cookies import save_cookies
+
 os.chdir(Path(__file__).parent)
 cookie_file = 'assets/cookies.json'
 
@@ -29,10 +32,7 @@ with sync_playwright() as p:
             print("✅ 登录成功！")
             cookies = context.cookies()
             if cookies:
-                os.makedirs('assets', exist_ok=True)
-                with open(cookie_file, 'w') as f:
-                    json.dump(cookies, f, indent=2)
-                print(f"✅ Cookie 已保存：{cookie_file}")
+                save_cookies(cookies, cookie_file)
             break
     
     time.sleep(3)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+性能基准
+在本地合成页面上离线运行（不访问抖音），比较各项优化的耗时与开销
+
+用法：
+    python scripts/benchmark.py                      # 运行全部
+    python scripts/benchmark.py --only tracing -n 30
+    python scripts/benchmark.py --only startup      # 超出启动预算时退出码为 1
+    python scripts/benchmark.py --only profiles -n 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# 轻量子命令的启动耗时预算（毫秒，含解释器启动）
+STARTUP_BUDGETS_MS = {
+    'status': 100,
+    'validate': 150,
+    'queue': 150
+}
+
+# 启动档位基准中同时打开的上下文数（模拟单机多开）
+PROFILE_CONTEXTS = 4
+
+# 轻量子命令不允许加载的模块
+HEAVY_MODULES = ('playwright', 'PIL', 'numpy')
+
+# 模拟发布页：标题、话题、文件上传、发布按钮
+SYNTHETIC_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>发布</title></head>
+<body>
+  <input type="file" id="upload" multiple>
+  <input placeholder="填写标题" id="title">
+  <input placeholder="添加话题" id="topic">
+  <ul id="topics"></ul>
+  <button id="publish">发布</button>
+  <div id="result"></div>
+  <script>
+    document.getElementById('topic').addEventListener('keydown', e => {
+      if (e.key === 'Enter') {
+        const li = document.createElement('li');
+        li.textContent = e.target.value;
+        document.getElementById('topics').appendChild(li);
+        e.target.value = '';
+      }
+    });
+    document.getElementById('publish').addEventListener('click', () => {
+      setTimeout(() => { document.getElementById('result').textContent = '发布成功'; }, 50);
+    });
+  </script>
+</body></html>
+"""
+
+
+def benchmark(name: str):
+    """注册基准"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """耗时统计（毫秒）"""
+    samples_ms = sorted(s * 1000 for s in samples_s)
+    p95_index = max(0, int(round(len(samples_ms) * 0.95)) - 1)
+    return {
+        'n': len(samples_ms),
+        'mean_ms': round(statistics.mean(samples_ms), 1),
+        'median_ms': round(statistics.median(samples_ms), 1),
+        'p95_ms': round(samples_ms[p95_index], 1)
+    }
+
+
+def make_fixtures(work_dir: str) -> Dict[str, str]:
+    """生成合成页面与上传文件"""
+    page_path = os.path.join(work_dir, 'publish.html')
+    with open(page_path, 'w', encoding='utf-8') as f:
+        f.write(SYNTHETIC_PAGE)
+    upload_path = os.path.join(work_dir, 'upload.bin')
+    with open(upload_path, 'wb') as f:
+        f.write(os.urandom(512 * 1024))
+    return {'page_url': Path(page_path).as_uri(), 'upload': upload_path}
+
+
+def run_synthetic_job(page, fixtures: Dict[str, str]):
+    """模拟一次发布：打开页面、上传、填写、点击发布、等待结果"""
+    page.goto(fixtures['page_url'])
+    page.locator('#upload').set_input_files(fixtures['upload'])
+    page.locator('input[placeholder*="标题"]').fill('基准测试标题')
+    topic_input = page.locator('input[placeholder*="话题"]')
+    for topic in ('生活', '日常', '摄影'):
+        topic_input.fill(f'#{topic}')
+        topic_input.press('Enter')
+    page.locator('button:has-text("发布")').click()
+    page.locator('#result:has-text("发布成功")').wait_for()
+
+
+@benchmark('tracing')
+def bench_tracing(iterations: int, work_dir: str) -> Dict[str, dict]:
+    """失败现场 tracing 的开销：关闭 / 开启但丢弃 chunk（成功路径）/ 开启并保存 chunk（失败路径）"""
+    from playwright.sync_api import sync_playwright
+
+    fixtures = make_fixtures(work_dir)
+    trace_dir = os.path.join(work_dir, 'traces')
+    os.makedirs(trace_dir, exist_ok=True)
+    results = {}
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-gpu', '--disable-dev-shm-usage'])
+        for mode in ('off', 'chunk_discard', 'chunk_save'):
+            context = browser.new_context()
+            page = context.new_page()
+            if mode != 'off':
+                context.tracing.start(snapshots=True, screenshots=False, sources=False)
+
+            run_synthetic_job(page, fixtures)  # 预热
+            samples = []
+            trace_bytes = 0
+            for i in range(iterations):
+                started = time.perf_counter()
+                if mode != 'off':
+                    context.tracing.start_chunk(title=f'job_{i}')
+                run_synthetic_job(page, fixtures)
+                if mode == 'chunk_discard':
+                    context.tracing.stop_chunk()
+                elif mode == 'chunk_save':
+                    trace_path = os.path.join(trace_dir, f'job_{i}.zip')
+                    context.tracing.stop_chunk(path=trace_path)
+                    trace_bytes += os.path.getsize(trace_path)
+                samples.append(time.perf_counter() - started)
+
+            if mode != 'off':
+                context.tracing.stop()
+            context.close()
+
+            results[mode] = summarize(samples)
+            if trace_bytes:
+                results[mode]['trace_kb_per_job'] = round(trace_bytes / iterations / 1024, 1)
+        browser.close()
+
+    baseline = results['off']['median_ms']
+    for mode in ('chunk_discard', 'chunk_save'):
+        results[mode]['overhead_pct'] = round((results[mode]['median_ms'] / baseline - 1) * 100, 1)
+    return results
+
+
+@benchmark('profiles')
+def bench_profiles(iterations: int, work_dir: str) -> Dict[str, dict]:
+    """
+    各启动档位：启动耗时、PROFILE_CONTEXTS 个上下文并存时单条合成发布的耗时、浏览器进程树 RSS（含 Playwright 驱动）
+    debug 档位在这里同样无头且不放慢，只比较资源参数的影响
+    """
+    from playwright.sync_api import sync_playwright
+    from douyin_core import DEFAULT_CONFIG, deep_merge
+    from douyin_core.session import LAUNCH_PROFILES, launch_browser, new_context
+    from douyin_core.memory_watchdog import process_tree_rss_mb
+
+    os.environ.pop('DOUYIN_BROWSER_PROFILE', None)
+    fixtures = make_fixtures(work_dir)
+    results = {}
+
+    with sync_playwright() as p:
+        for name in LAUNCH_PROFILES:
+            config = deep_merge(DEFAULT_CONFIG, {'browser': {
+                'profile': name, 'profiles': {name: {'headless': True, 'slow_mo_ms': 0}}}})
+            started = time.perf_counter()
+            browser = launch_browser(p, config)
+            launch_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            pages = [new_context(browser, config).new_page() for _ in range(PROFILE_CONTEXTS)]
+            for page in pages:
+                run_synthetic_job(page, fixtures)  # 预热
+            samples = []
+            for i in range(iterations):
+                started = time.perf_counter()
+                run_synthetic_job(pages[i % len(pages)], fixtures)
+                samples.append(time.perf_counter() - started)
+            rss_mb = process_tree_rss_mb([os.getpid()], include_roots=False)
+            browser.close()
+
+            results[name] = summarize(samples)
+            results[name].update(launch_ms=launch_ms, contexts=PROFILE_CONTEXTS, browser_rss_mb=rss_mb)
+
+    baseline = results['balanced']['browser_rss_mb']
+    for name, stats in results.items():
+        if name != 'balanced' and baseline and stats['browser_rss_mb'] is not None:
+            stats['rss_vs_balanced_pct'] = round((stats['browser_rss_mb'] / baseline - 1) * 100, 1)
+    return results
+
+
+def _cli_argv(command: str, work_dir: str) -> List[str]:
+    """douyin_cli.py 子命令参数（validate / queue 使用合成清单）"""
+    manifest = os.path.join(work_dir, 'startup_manifest.json')
+    if not os.path.exists(manifest):
+        for name in ('a.jpg', 'b.jpg'):
+            open(os.path.join(work_dir, name), 'wb').close()
+        with open(manifest, 'w', encoding='utf-8') as f:
+            json.dump([{'title': f'post_{i}', 'images': ['a.jpg', 'b.jpg']} for i in range(20)], f)
+    argv = [sys.executable, str(SCRIPT_DIR / 'douyin_cli.py'), '--config', os.path.join(work_dir, 'none.json'),
+            '--output-json', command]
+    if command != 'status':
+        argv += ['--manifest', manifest]
+    return argv
+
+
+def _heavy_imports(argv: List[str]) -> List[str]:
+    """用 -X importtime 检查命令加载了哪些重模块"""
+    proc = subprocess.run([argv[0], '-X', 'importtime'] + argv[1:], capture_output=True, text=True)
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:'):
+            name = line.rsplit('|', 1)[-1].strip()
+            if name.split('.')[0] in HEAVY_MODULES:
+                loaded.add(name.split('.')[0])
+    return sorted(loaded)
+
+
+@benchmark('startup')
+def bench_startup(iterations: int, work_dir: str) -> Dict[str, dict]:
+    """轻量子命令的冷启动耗时（子进程墙钟时间），对照解释器空启动和预算"""
+    variants = {'interpreter': [sys.executable, '-c', 'pass']}
+    for command in STARTUP_BUDGETS_MS:
+        variants[command] = _cli_argv(command, work_dir)
+
+    results = {}
+    for name, argv in variants.items():
+        subprocess.run(argv, capture_output=True)  # 预热文件系统缓存
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            subprocess.run(argv, capture_output=True)
+            samples.append(time.perf_counter() - started)
+        results[name] = summarize(samples)
+
+    floor = results['interpreter']['median_ms']
+    for command, budget_ms in STARTUP_BUDGETS_MS.items():
+        stats = results[command]
+        stats['budget_ms'] = budget_ms
+        stats['net_ms'] = round(stats['median_ms'] - floor, 1)
+        stats['heavy_imports'] = ','.join(_heavy_imports(variants[command])) or '-'
+        stats['within_budget'] = stats['median_ms'] <= budget_ms and stats['heavy_imports'] == '-'
+    return results
+
+
+@benchmark('text_check')
+def bench_text_check(iterations: int, work_dir: str) -> Dict[str, dict]:
+    """文案预检：5000 词的词表编译一次，扫描 1000 条标题 + 话题（Aho–Corasick 对照逐词 in 查找）"""
+    import random
+    from douyin_core import load_config
+    from douyin_core.text_check import AhoCorasick, check_text, normalize_text
+
+    rng = random.Random(0)
+    alphabet = '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面'
+    words = list({''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 5))) for _ in range(5000)})
+    posts = [{'title': ''.join(rng.choice(alphabet) for _ in range(40)),
+              'topics': [''.join(rng.choice(alphabet) for _ in range(6)) for _ in range(3)]} for _ in range(1000)]
+
+    word_list = os.path.join(work_dir, 'words.txt')
+    with open(word_list, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(words))
+    config = load_config(os.path.join(work_dir, 'none.json'))
+    config['text']['word_lists'] = [word_list]
+
+    started = time.perf_counter()
+    AhoCorasick(words)
+    compile_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    results = {}
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for post in posts:
+            check_text(post, config)
+        samples.append(time.perf_counter() - started)
+    results['automaton_1000'] = dict(summarize(samples), compile_ms=compile_ms)
+
+    # 对照：逐词子串查找（只跑少量迭代）
+    texts = [normalize_text(post['title'] + ''.join(post['topics'])) for post in posts]
+    samples = []
+    for _ in range(max(1, iterations // 10)):
+        started = time.perf_counter()
+        for text in texts:
+            [word for word in words if word in text]
+        samples.append(time.perf_counter() - started)
+    results['naive_1000'] = summarize(samples)
+    return results
+
+
+def print_results(name: str, results: Dict[str, dict]):
+    """打印单个基准的结果"""
+    print(f"\n📊 {name}")
+    for variant, stats in results.items():
+        extra = ' '.join(f"{k}={v}" for k, v in stats.items() if k not in ('n', 'mean_ms', 'median_ms', 'p95_ms'))
+        print(f"  {variant:<16} median {stats['median_ms']:>8.1f}ms  mean {stats['mean_ms']:>8.1f}ms  "
+              f"p95 {stats['p95_ms']:>8.1f}ms  {extra}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='抖音发布助手性能基准（离线）')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='只运行指定基准')
+    parser.add_argument('-n', '--iterations', type=int, default=20, help='每个变体的迭代次数')
+    parser.add_argument('--output-json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    names = args.only or sorted(BENCHMARKS)
+    all_results = {}
+    with tempfile.TemporaryDirectory(prefix='douyin_bench_') as work_dir:
+        for name in names:
+            all_results[name] = BENCHMARKS[name](args.iterations, work_dir)
+            if not args.output_json:
+                print_results(name, all_results[name])
+
+    if args.output_json:
+        print(json.dumps(all_results, ensure_ascii=False, indent=2))
+
+    over_budget = [f"{name}.{variant}" for name, results in all_results.items()
+                   for variant, stats in results.items() if stats.get('within_budget') is False]
+    if over_budget:
+        print(f"❌ 超出预算：{', '.join(over_budget)}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
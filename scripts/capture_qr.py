@@ -4,13 +4,15 @@
 启动浏览器，打开登录页面，截图二维码
 """
 
-import json
 import os
 import time
 from pathlib import Path
 
 from playwright.sync_api import sync_playwright
 
+from douyin_core.display_pool import display_launch_options, get_display_pool
+from douyin_core.cookies import save_cookies
+
 
 def main():
     script_dir = Path(__file__).parent
@@ -21,8 +23,8 @@ def main():
     print("=" * 50)
     print()
     
-    with sync_playwright() as p:
-        # 启动浏览器（不 headless）
+    with sync_playwright() as p, get_display_pool({}).lease() as display:
+        # 启动浏览器（不 headless，服务器上使用虚拟显示）
         browser = p.chromium.launch(
             headless=False,
             args=[
@@ -32,7 +34,8 @@ def main():
                 '--disable-accelerated-2d-canvas',
                 '--disable-gpu',
                 '--start-maximized'
-            ]
+            ],
+            **display_launch_options(display)
         )
         
         context = browser.new_context(
@@ -89,10 +92,7 @@ def main():
                     # 保存 Cookie
                     cookies = context.cookies()
                     if cookies:
-                        cookie_file = script_dir.parent / 'assets' / 'cookies.json'
-                        with open(cookie_file, 'w', encoding='utf-8') as f:
-                            json.dump(cookies, f, indent=2, ensure_ascii=False)
-                        print(f"✅ Cookie 已保存：{cookie_file}")
+                        save_cookies(cookies, str(script_dir.parent / 'assets' / 'cookies.json'))
                     break
             
             print()
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+本地封面生成命令行（实现见 douyin_core.cover_gen）
+
+用法：
+    python scripts/cover_gen.py a.mp4 b.mp4 --workers 4
+"""
+
+from douyin_core.cover_gen import main
+
+if __name__ == '__main__':
+    main()
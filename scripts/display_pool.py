@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Xvfb 虚拟显示池健康检查（实现见 douyin_core.display_pool）
+
+用法：
+    python scripts/display_pool.py --check
+"""
+
+from douyin_core.display_pool import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+抖音发布助手命令行（子命令）
+status / validate / queue / ledger 只用标准库和轻量模块，不导入 Playwright / Pillow，秒回；
+post / login 需要浏览器时才加载重模块
+
+用法：
+    python scripts/douyin_cli.py status
+    python scripts/douyin_cli.py validate --images a.jpg b.jpg
+    python scripts/douyin_cli.py validate --manifest posts.json
+    python scripts/douyin_cli.py queue --manifest posts.json
+    python scripts/douyin_cli.py post --manifest posts.jsonl   # 流式读取，可断点续发
+    python scripts/douyin_cli.py post --title "标题" --images a.jpg b.jpg
+    python scripts/douyin_cli.py login
+    python scripts/douyin_cli.py keepalive                     # 刷新临近过期的会话
+    python scripts/douyin_cli.py cookies rollback              # Cookie 回滚到上一个版本
+    python scripts/douyin_cli.py ledger failures --by step --since week
+    python scripts/douyin_cli.py ledger posted --images a.jpg b.jpg
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from douyin_core import load_config, resolve_cookie_file
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def _result(command: str, success: bool, message: str, data: Any = None) -> Dict[str, Any]:
+    return {'command': command, 'success': success, 'message': message, 'data': data or {}}
+
+
+def _jobs_from_args(args) -> List[Dict[str, Any]]:
+    """--manifest 或单条 --title/--images/--video 组成任务列表"""
+    if args.manifest:
+        from douyin_core.manifest import load_manifest
+        return load_manifest(args.manifest)
+
+    job = {'title': args.title or '', 'topics': args.topics, 'visible': args.visible}
+    if args.video:
+        job.update(video=args.video, cover=args.cover, bgm=getattr(args, 'bgm', None))
+    else:
+        job['images'] = args.images or []
+    return [job]
+
+
+# ============ 轻量命令 ============
+def cmd_status(args, config: dict) -> Dict[str, Any]:
+    """登录状态（只读 Cookie 文件）"""
+    from douyin_core.cookies import cookie_status
+
+    status = cookie_status(resolve_cookie_file(config, str(SCRIPT_DIR)))
+    if not status['logged_in']:
+        return _result('status', False, '未登录', status)
+
+    message = '已登录'
+    if status['expires_in_s'] is not None:
+        message += f"（Cookie 最早 {status['expires_in_s'] / 86400:.1f} 天后过期）"
+    return _result('status', True, message, status)
+
+
+def cmd_validate(args, config: dict) -> Dict[str, Any]:
+    """并行预校验素材和文案（文件、图片解码与尺寸、视频探测、标题、话题、重复），不启动浏览器"""
+    from douyin_core.validation import validate_batch, print_validation_report
+
+    if args.policy:
+        config['validation']['policy'] = args.policy
+    jobs = _jobs_from_args(args)
+    report = validate_batch(config, jobs)
+    print_validation_report(report, verbose=True)
+
+    if report['failed'] and config['validation']['policy'] == 'quarantine':
+        from douyin_core.validation import write_quarantine
+        report['quarantine_file'] = write_quarantine(config, jobs, report['rows'])
+
+    message = f"{report['passed']}/{report['total']} 条通过校验"
+    return _result('validate', report['failed'] == 0, message, report)
+
+
+def cmd_queue(args, config: dict) -> Dict[str, Any]:
+    """查看清单：条数、类型分布、缺失素材（只检查文件是否存在）"""
+    from douyin_core.checks import job_kind
+
+    entries = []
+    by_kind: Dict[str, int] = {}
+    for i, job in enumerate(_jobs_from_args(args)):
+        kind = job_kind(job)
+        assets = [job['video']] if kind == 'video' and job.get('video') else list(job.get('images', []))
+        missing = [path for path in assets if not os.path.exists(path)]
+        by_kind[kind] = by_kind.get(kind, 0) + 1
+        entries.append({'index': i, 'title': job.get('title') or f'post_{i}', 'kind': kind,
+                        'assets': len(assets), 'missing': missing})
+        print(f"{'❌' if missing else '⏳'} [{i}] {entries[-1]['title']}（{kind}，{len(assets)} 个素材"
+              f"{'，缺失 ' + str(len(missing)) if missing else ''}）")
+
+    missing_total = sum(len(entry['missing']) for entry in entries)
+    kinds = '，'.join(f"{kind} {count}" for kind, count in sorted(by_kind.items()))
+    message = f"共 {len(entries)} 条（{kinds}）" + (f"，{missing_total} 个素材缺失" if missing_total else '')
+    return _result('queue', missing_total == 0,
+                   message, {'total': len(entries), 'by_kind': by_kind, 'jobs': entries})
+
+
+def cmd_ledger(args, config: dict) -> Dict[str, Any]:
+    """查询发布记录库：recent 最近记录，failures 失败率，posted 某组素材是否发布过"""
+    from datetime import datetime
+    from douyin_core.ledger import ResultsLedger, resolve_ledger_file, parse_since, job_fingerprint
+
+    path = resolve_ledger_file(config)
+    if not os.path.exists(path):
+        return _result('ledger', False, f"还没有发布记录：{path}")
+    since = parse_since(args.since) if args.since else None
+
+    with ResultsLedger(path) as ledger:
+        if args.query == 'recent':
+            rows = ledger.recent(args.limit, since, args.account, args.status)
+            for row in rows:
+                when = datetime.fromtimestamp(row['finished_at']).strftime('%m-%d %H:%M')
+                status = {'success': '✅', 'unconfirmed': '⏳'}.get(row['status'], '❌')
+                detail = f"{row['failed_step']}：{row['error'] or row['error_class'] or ''}" if row['failed_step'] else ''
+                print(f"{status} {when} [{row['account']}] {row['title']}（{row['wall_s']}s）{detail}")
+            return _result('ledger', True, f"{len(rows)} 条记录", {'rows': rows})
+
+        if args.query == 'failures':
+            stats = ledger.failure_rate(args.by, since, args.account)
+            for stat in stats:
+                total = stat['reached'] if args.by == 'step' else stat['total']
+                print(f"  {stat[args.by]}: {stat['failed']}/{total} 失败（{stat['rate'] * 100:.1f}%）")
+            return _result('ledger', True, f"按 {args.by} 统计失败率", {'stats': stats})
+
+        job = {'video': args.video} if args.video else {'images': args.images or []}
+        fingerprint = job_fingerprint(job)
+        if fingerprint is None:
+            return _result('ledger', False, '需要 --images 或 --video，且文件都存在')
+        rows = ledger.find_by_fingerprint(fingerprint)
+        for row in rows:
+            when = datetime.fromtimestamp(row['finished_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"✅ {when} [{row['account']}] {row['title']}" + (f"（作品 {row['work_id']}）" if row['work_id'] else ''))
+        message = f"已发布过 {len(rows)} 次" if rows else '没有发布过'
+        # 查询本身总是成功；是否发布过看 data.posted
+        return _result('ledger', True, message, {'fingerprint': fingerprint, 'posted': bool(rows), 'rows': rows})
+
+
+# ============ 需要浏览器的命令 ============
+def cmd_post(args, config: dict) -> Dict[str, Any]:
+    """发布单条或整个清单"""
+    from douyin_core.manifest import is_stream_manifest
+    from douyin_core.ledger import account_name
+    from douyin_core.publish import publish_accounts, publish_batch, publish_stream
+    from douyin_core.pipeline_executor import print_pipeline_summary
+    from douyin_core.screenshots import configure as configure_screenshots
+
+    if args.headless:
+        config['browser']['headless'] = True
+    if args.profile:
+        config['browser']['profile'] = args.profile
+    if args.policy:
+        config['validation']['policy'] = args.policy
+    if args.trace:
+        config['tracing']['enable'] = True
+    configure_screenshots(config)
+
+    min_gap_s = max(args.interval * 60, config['post'].get('min_gap_s', 0))
+    if args.manifest and is_stream_manifest(args.manifest):
+        # JSONL / CSV 清单流式发布，进度写入 <清单>.progress
+        summary = publish_stream(config, args.manifest, str(SCRIPT_DIR), min_gap_s=min_gap_s,
+                                 resume=not args.restart)
+        message = f"已处理 {summary['rows']} 行：成功 {summary['published']}，失败 {summary['failed']}"
+        if summary['quarantined']:
+            message += f"，隔离 {summary['quarantined']}"
+        if summary['stopped']:
+            message += '；未处理完，重新运行可从断点继续'
+        return _result('post', not summary['failed'] and not summary['stopped'], message, summary)
+
+    jobs = _jobs_from_args(args)
+    default_account = account_name(config)
+    if {job.get('account') or default_account for job in jobs} != {default_account}:
+        # 清单指定了其他账号：共用一个浏览器，每个账号一个上下文并行发布
+        results = publish_accounts(config, jobs, str(SCRIPT_DIR), min_gap_s=min_gap_s)
+    else:
+        results = publish_batch(config, jobs, str(SCRIPT_DIR), min_gap_s=min_gap_s)
+    print_pipeline_summary([result for result in results if result['attempts']])
+
+    succeeded = sum(result['success'] for result in results)
+    return _result('post', succeeded == len(results), f"成功 {succeeded}/{len(results)}", {'jobs': results})
+
+
+def cmd_login(args, config: dict) -> Dict[str, Any]:
+    """扫码登录"""
+    from login import login
+
+    login(config, script_dir=str(SCRIPT_DIR))
+    return _result('login', True, '登录完成')
+
+
+def cmd_cookies(args, config: dict) -> Dict[str, Any]:
+    """Cookie 历史版本 / 回滚（只读写 Cookie 文件）"""
+    from douyin_core.cookies import cookie_versions, rollback_cookies
+
+    if args.account:
+        from douyin_core.publish import account_config
+        config = account_config(config, args.account)
+    cookie_file = resolve_cookie_file(config, str(SCRIPT_DIR))
+    if args.action == 'rollback':
+        version = rollback_cookies(cookie_file, args.steps)
+        return _result('cookies', True, f"已回滚到 {os.path.basename(version)}", {'cookie_file': cookie_file})
+    versions = cookie_versions(cookie_file)
+    return _result('cookies', True, f"{len(versions)} 个历史版本",
+                   {'cookie_file': cookie_file, 'versions': versions})
+
+
+def cmd_keepalive(args, config: dict) -> Dict[str, Any]:
+    """检查 / 刷新所有账号的会话一轮（见 session_keepalive.py）"""
+    from session_keepalive import SessionKeeper
+
+    results = SessionKeeper(config, str(SCRIPT_DIR)).run_once()
+    alerts = [result for result in results if result['alert']]
+    refreshed = sum(result['refreshed'] for result in results)
+    message = f"{len(results)} 个账号，刷新 {refreshed} 个"
+    if alerts:
+        message += f"，{len(alerts)} 个需要处理：" + '；'.join(f"[{r['account']}] {r['alert']}" for r in alerts)
+    return _result('keepalive', not alerts, message, {'accounts': results})
+
+
+COMMANDS = {
+    'status': cmd_status,
+    'validate': cmd_validate,
+    'queue': cmd_queue,
+    'post': cmd_post,
+    'login': cmd_login,
+    'keepalive': cmd_keepalive,
+    'cookies': cmd_cookies,
+    'ledger': cmd_ledger
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建子命令解析器"""
+    parser = argparse.ArgumentParser(description='抖音发布助手')
+    parser.add_argument('--config', default='assets/config.json', help='配置文件路径')
+    parser.add_argument('--output-json', action='store_true', help='输出 JSON（过程日志转到 stderr）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('status', help='登录状态（不启动浏览器）')
+    sub.add_parser('login', help='扫码登录')
+    sub.add_parser('keepalive', help='刷新临近过期的会话，失效时告警')
+    cookies_parser = sub.add_parser('cookies', help='Cookie 历史版本 / 回滚（不启动浏览器）')
+    cookies_parser.add_argument('action', choices=['history', 'rollback'], help='history=列出版本，rollback=回滚')
+    cookies_parser.add_argument('--steps', type=int, default=1, help='rollback：回滚到第几个历史版本（1 为上一个）')
+    cookies_parser.add_argument('--account', help='多账号时指定账号')
+
+    def add_job_args(p, with_publish_options: bool = False):
+        p.add_argument('--manifest', help='批量清单（.json 数组，或逐行读取的 .jsonl / .csv）')
+        p.add_argument('--title', help='标题')
+        p.add_argument('--images', nargs='+', help='图片文件路径')
+        p.add_argument('--video', help='视频文件路径')
+        p.add_argument('--cover', help='视频封面路径')
+        p.add_argument('--topics', nargs='+', help='话题标签（不含#）')
+        p.add_argument('--visible', choices=['public', 'friends', 'private'], default='public', help='可见性')
+        if with_publish_options:
+            p.add_argument('--bgm', help='背景音乐标题')
+            p.add_argument('--interval', type=int, default=5, help='批量发布间隔（分钟）')
+            p.add_argument('--headless', action='store_true', help='无头模式')
+            p.add_argument('--profile', help='浏览器启动档位：dense / balanced / debug（或 browser.profiles 中自定义的）')
+            p.add_argument('--trace', action='store_true', help='记录 Playwright trace，仅在失败时保存')
+            p.add_argument('--policy', choices=['stop', 'quarantine'],
+                           help='预校验不通过时：stop=整批不发，quarantine=隔离后继续')
+            p.add_argument('--restart', action='store_true', help='忽略 .jsonl / .csv 清单已记录的进度，从头发布')
+
+    validate_parser = sub.add_parser('validate', help='预校验素材（不启动浏览器）')
+    add_job_args(validate_parser)
+    validate_parser.add_argument('--policy', choices=['stop', 'quarantine'],
+                                 help='quarantine 时把不通过的行写入隔离文件')
+    queue_parser = sub.add_parser('queue', help='查看清单（不启动浏览器）')
+    queue_parser.add_argument('--manifest', required=True, help='批量清单（.json / .jsonl / .csv）')
+
+    ledger_parser = sub.add_parser('ledger', help='查询发布记录（不启动浏览器）')
+    ledger_parser.add_argument('query', choices=['recent', 'failures', 'posted'],
+                               help='recent=最近记录，failures=失败率，posted=素材是否发布过')
+    ledger_parser.add_argument('--since', help='时间范围起点：7d / 24h / today / week / YYYY-MM-DD')
+    ledger_parser.add_argument('--account', help='只看某个账号')
+    ledger_parser.add_argument('--status', choices=['success', 'failed', 'unconfirmed'], help='recent：只看某种状态')
+    ledger_parser.add_argument('--by', choices=['step', 'account', 'kind', 'day', 'error_class'], default='step',
+                               help='failures：分组维度')
+    ledger_parser.add_argument('-n', '--limit', type=int, default=20, help='recent：条数')
+    ledger_parser.add_argument('--images', nargs='+', help='posted：图片文件')
+    ledger_parser.add_argument('--video', help='posted：视频文件')
+    add_job_args(sub.add_parser('post', help='发布'), with_publish_options=True)
+    return parser
+
+
+def main(argv=None):
+    """主函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # 素材路径在切换目录前解析
+    for key in ('manifest', 'video', 'cover'):
+        if getattr(args, key, None):
+            setattr(args, key, os.path.abspath(getattr(args, key)))
+    if getattr(args, 'images', None):
+        args.images = [os.path.abspath(p) for p in args.images]
+    if args.command in ('validate', 'post') and not (args.manifest or args.images or args.video):
+        parser.error('需要 --manifest、--images 或 --video')
+    if args.command == 'post' and not args.manifest and not args.title:
+        parser.error('需要 --title')
+
+    os.chdir(SCRIPT_DIR)
+    config = load_config(args.config)
+
+    command = COMMANDS[args.command]
+    try:
+        if args.output_json:
+            with contextlib.redirect_stdout(sys.stderr):
+                result = command(args, config)
+        else:
+            result = command(args, config)
+    except Exception as e:
+        result = _result(args.command, False, str(e))
+
+    if args.output_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'✅' if result['success'] else '❌'} {result['message']}")
+
+    sys.exit(0 if result['success'] else 1)
+
+
+if __name__ == '__main__':
+    main()
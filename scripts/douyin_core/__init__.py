@@ -0,0 +1,26 @@
+"""
+抖音发布核心库
+所有发布入口（douyin_post.py、douyin_post_optimized.py、douyin_video_post.py、
+scheduled_publish.py、openclaw_integration.py）都只是它的命令行包装：
+
+- config   配置加载与合并
+- session  浏览器启动、反检测上下文、Cookie、延迟与输入模拟
+- steps    通用页面步骤（打开发布页、标题、话题、可见性、发布、结果检测）
+- media    媒体处理器（图文 / 视频：校验预处理、上传、填写）
+- publish  单条与批量发布流程
+- pipeline_executor / screenshots / failure_trace / memory_watchdog / display_pool
+           流水线执行、失败截图与 trace、内存看门狗、虚拟显示
+- media_probe / video_prep / cover_gen / image_hash
+           素材探测与预处理（scripts/ 下同名脚本是它们的命令行入口）
+
+用法：
+    from douyin_core import load_config
+    from douyin_core.publish import publish
+
+    config = load_config('assets/config.json')
+    result = publish(config, {'title': '标题', 'images': ['1.jpg', '2.jpg']})
+"""
+
+from .config import DEFAULT_CONFIG, deep_merge, load_config, resolve_cookie_file
+
+__all__ = ['DEFAULT_CONFIG', 'deep_merge', 'load_config', 'resolve_cookie_file']
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+上传带宽分配
+多个账号同时上传视频时，把 bandwidth.upload_kbps 的全局上行预算按权重分给正在上传的页面，
+通过 CDP Network.emulateNetworkConditions 对每个页面限速（Chromium 按页面节流），
+避免一起把出口带宽占满、每个上传都拖到预览超时
+
+- 权重：离计划发布时间（任务的 publish_at）越近越高，没有计划时间的权重为 1
+- 有上传开始或结束时重新分配，各页面在自己的线程里等待上传时按新份额调整
+- 每条任务的上传吞吐（素材字节数 / 开始上传到上传完成的时间）写入结果的 'upload'：上传完成时间取自
+  网络指标中上传类请求的结束时间（见 douyin_core.network_metrics）；拿不到时以等待结束时刻估算，标记 'estimated'
+
+bandwidth.enable 为 False（默认）时不限速，只统计吞吐；bandwidth 配置相同的账号共用一个预算，
+账号单独覆盖了 bandwidth 时按自己的配置另算
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def parse_publish_at(value) -> Optional[float]:
+    """任务的计划发布时间：时间戳或 'YYYY-MM-DD HH:MM[:SS]'，无法解析时返回 None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).strip()).timestamp()
+    except ValueError:
+        return None
+
+
+class UploadLease:
+    """一个页面的一次上传：持有限速份额，只在页面所属线程中调用 apply / finish"""
+
+    def __init__(self, manager: 'BandwidthManager', page, title: str, size_bytes: int,
+                 publish_at: Optional[float]):
+        self.manager = manager
+        self.page = page
+        self.title = title
+        self.size_bytes = size_bytes
+        self.publish_at = publish_at
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.rate_bytes_per_s: Optional[int] = None
+        self.min_rate_bytes_per_s: Optional[int] = None
+        self._cdp = None
+
+    def weight(self, now: float) -> float:
+        """离计划发布时间越近权重越高（1 ~ bandwidth.max_priority）"""
+        if self.publish_at is None:
+            return 1.0
+        settings = self.manager.settings
+        horizon = max(1.0, settings.get('priority_horizon_s', 3600))
+        urgency = min(1.0, max(0.0, 1 - (self.publish_at - now) / horizon))
+        return 1.0 + urgency * (settings.get('max_priority', 4) - 1)
+
+    def _send(self, upload_bytes_per_s: int):
+        if self._cdp is None:
+            self._cdp = self.page.context.new_cdp_session(self.page)
+            self._cdp.send('Network.enable')
+        self._cdp.send('Network.emulateNetworkConditions', {
+            'offline': False, 'latency': 0, 'downloadThroughput': -1, 'uploadThroughput': upload_bytes_per_s
+        })
+
+    def apply(self):
+        """按当前份额调整本页面的上行限速（份额不变时不发 CDP 命令）"""
+        if not self.manager.enabled or self.finished_at is not None:
+            return
+        rate = self.manager.rate_for(self)
+        if rate == self.rate_bytes_per_s:
+            return
+        try:
+            self._send(rate)
+            self.rate_bytes_per_s = rate
+            if self.min_rate_bytes_per_s is None or rate < self.min_rate_bytes_per_s:
+                self.min_rate_bytes_per_s = rate
+        except Exception as e:
+            print(f"⚠️  设置上传限速失败：{e}")
+
+    def wait(self, seconds: float, tick_s: Optional[float] = None):
+        """等待 seconds 秒，期间按新份额调整限速"""
+        tick_s = tick_s or self.manager.settings.get('rebalance_s', 2)
+        deadline = time.time() + seconds
+        while True:
+            self.apply()
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(tick_s, remaining))
+
+    def finish(self, completed_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        上传完成：释放份额、取消本页面限速，返回吞吐统计
+
+        Args:
+            completed_at: 实测的上传完成时刻（如最后一个上传请求结束的时间），None 时以调用时刻估算
+        """
+        if self.finished_at is None:
+            self.finished_at = time.time()
+            self.completed_at = completed_at
+            self.manager.release(self)
+            if self.rate_bytes_per_s is not None:
+                try:
+                    self._send(-1)
+                except Exception:
+                    pass
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = max(0.001, (self.completed_at or self.finished_at or time.time()) - self.started_at)
+        stats = {
+            'bytes': self.size_bytes,
+            'seconds': round(seconds, 1),
+            'kbps': round(self.size_bytes * 8 / 1000 / seconds, 1)
+        }
+        if self.completed_at is None:
+            # 以等待结束计时（图文固定等待、视频含平台处理），只是吞吐下限
+            stats['estimated'] = True
+        if self.min_rate_bytes_per_s is not None:
+            stats['limit_kbps'] = round(self.min_rate_bytes_per_s * 8 / 1000, 1)
+        if self.publish_at is not None:
+            stats['priority'] = round(self.weight(self.started_at), 2)
+        return stats
+
+
+class BandwidthManager:
+    """全局上行预算，按权重分给正在上传的页面（进程内共享，多账号宿主的工作线程共用）"""
+
+    def __init__(self, config: dict):
+        self.settings = config.get('bandwidth', {})
+        self.budget_bytes_per_s = int(self.settings.get('upload_kbps', 0) * 1000 / 8)
+        self.enabled = bool(self.settings.get('enable', False)) and self.budget_bytes_per_s > 0
+        self._leases: List[UploadLease] = []
+        self._lock = threading.Lock()
+
+    def start(self, page, job: Dict[str, Any], paths: List[str]) -> UploadLease:
+        """开始一次上传（在选择文件之前调用，让首个请求就按份额限速）"""
+        size_bytes = sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+        lease = UploadLease(self, page, job.get('title', ''), size_bytes,
+                            parse_publish_at(job.get('publish_at', job.get('_publish_at'))))
+        with self._lock:
+            self._leases.append(lease)
+        # 页面关闭（出错、重试）时自动释放份额
+        page.on('close', lambda _: self.release(lease))
+        lease.apply()
+        return lease
+
+    def release(self, lease: UploadLease):
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+
+    def rate_for(self, lease: UploadLease) -> int:
+        """按权重分配全局预算（每个页面不低于 bandwidth.min_kbps，总和超出时按比例压缩）"""
+        now = time.time()
+        with self._lock:
+            leases = list(self._leases) or [lease]
+        weights = {id(item): item.weight(now) for item in leases}
+        total = sum(weights.values())
+        share = self.budget_bytes_per_s * weights.get(id(lease), 1.0) / total
+        floor = int(self.settings.get('min_kbps', 256) * 1000 / 8)
+        if floor * len(leases) > self.budget_bytes_per_s:
+            floor = self.budget_bytes_per_s // len(leases)
+        return max(floor, int(share))
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._leases)
+
+
+_managers: Dict[str, BandwidthManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_bandwidth_manager(config: dict) -> BandwidthManager:
+    """进程内共享的带宽管理器（按 bandwidth 配置区分，配置相同的调用方共用预算）"""
+    key = json.dumps(config.get('bandwidth', {}), sort_keys=True)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = BandwidthManager(config)
+        return _managers[key]
+
+
+def format_upload_stats(stats: Dict[str, Any]) -> str:
+    """上传吞吐的一行摘要"""
+    text = f"{stats['bytes'] / 1024 / 1024:.1f}MB / {stats['seconds']}s = {stats['kbps'] / 1000:.2f}Mbps"
+    if stats.get('estimated'):
+        text += "（估算）"
+    if 'limit_kbps' in stats:
+        text += f"（限速 {stats['limit_kbps'] / 1000:.2f}Mbps）"
+    return text
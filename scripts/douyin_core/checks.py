@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+素材校验
+不依赖浏览器（不导入 Playwright / Pillow），命令行的 validate 子命令和发布流程共用
+"""
+
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from .media_probe import ProbeCache, probe_video, check_video_info
+
+# JPEG 中携带尺寸的 SOF 标记
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def inspect_images(images: List[str], config: dict) -> Tuple[Optional[List[str]], Optional[str]]:
+    """校验图片数量和文件，返回 (实际使用的图片列表, None) 或 (None, 错误信息)"""
+    max_images = config['post'].get('max_images', 9)
+    min_images = config['post'].get('min_images', 2)
+
+    if len(images) < min_images:
+        return None, f"图片数量不足，至少需要 {min_images} 张"
+
+    for img in images[:max_images]:
+        if not os.path.exists(img):
+            return None, f"图片文件不存在：{img}"
+
+    return images[:max_images], None
+
+
+def check_images(images: List[str], config: dict) -> Optional[List[str]]:
+    """校验图片数量和文件，返回实际使用的图片列表；不通过返回 None"""
+    used, error = inspect_images(images, config)
+    if error:
+        print(f"❌ {error}")
+        return None
+    if len(used) < len(images):
+        print(f"⚠️  图片数量超过限制，将只使用前 {len(used)} 张")
+    return used
+
+
+def read_image_header(path: str) -> Optional[Tuple[str, int, int]]:
+    """
+    只读文件头解析图片格式和尺寸（JPEG / PNG / WebP / GIF），无需 Pillow
+
+    Returns:
+        (格式, 宽, 高)；无法识别或文件头损坏时返回 None
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(64)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', head[16:24])
+                return 'png', width, height
+
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                width, height = struct.unpack('<HH', head[6:10])
+                return 'gif', width, height
+
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+                    width, height = struct.unpack('<HH', head[26:30])
+                    return 'webp', width & 0x3FFF, height & 0x3FFF
+                if chunk == b'VP8L' and head[20] == 0x2F:
+                    b0, b1, b2, b3 = head[21:25]
+                    return 'webp', (b0 | (b1 & 0x3F) << 8) + 1, ((b1 >> 6) | b2 << 2 | (b3 & 0x0F) << 10) + 1
+                if chunk == b'VP8X':
+                    width = int.from_bytes(head[24:27], 'little') + 1
+                    height = int.from_bytes(head[27:30], 'little') + 1
+                    return 'webp', width, height
+                return None
+
+            if head[:2] == b'\xff\xd8':
+                f.seek(2)
+                while True:
+                    byte = f.read(1)
+                    while byte and byte != b'\xff':
+                        byte = f.read(1)
+                    while byte == b'\xff':
+                        byte = f.read(1)
+                    if not byte:
+                        return None
+                    marker = byte[0]
+                    if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                        continue
+                    length_bytes = f.read(2)
+                    if len(length_bytes) < 2:
+                        return None
+                    length = struct.unpack('>H', length_bytes)[0]
+                    if marker in JPEG_SOF_MARKERS:
+                        sof = f.read(5)
+                        if len(sof) < 5:
+                            return None
+                        height, width = struct.unpack('>HH', sof[1:5])
+                        return 'jpeg', width, height
+                    f.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error, IndexError, ValueError):
+        return None
+    return None
+
+
+def image_truncated(path: str, fmt: str) -> bool:
+    """检查 JPEG / PNG 是否缺少结束标记（下载或拷贝中断的文件）"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(path) - 64))
+            tail = f.read()
+    except OSError:
+        return True
+    if fmt == 'jpeg':
+        return b'\xff\xd9' not in tail
+    if fmt == 'png':
+        return b'IEND' not in tail
+    return False
+
+
+def inspect_video(video_path: str, config: dict,
+                  cache: Optional[ProbeCache] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    检查视频文件（格式、大小，以及探测出的时长和编码），不打印、不写缓存文件
+
+    Returns:
+        (探测信息或 None, 错误信息或 None)；未开启探测或无法解析时信息为 None
+    """
+    if not os.path.exists(video_path):
+        return None, f"视频文件不存在：{video_path}"
+
+    ext = os.path.splitext(video_path)[1].lower().lstrip('.')
+    supported_formats = config['video'].get('supported_formats', ['mp4', 'mov', 'avi'])
+    if ext not in supported_formats:
+        return None, f"不支持的视频格式：{ext}（支持：{', '.join(supported_formats)}）"
+
+    file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
+    max_size_mb = config['video'].get('max_size_mb', 500)
+    if file_size_mb > max_size_mb:
+        return None, f"视频文件过大：{file_size_mb:.1f}MB（最大：{max_size_mb}MB）"
+
+    # 探测时长 / 编码 / 分辨率，避免上传完成后才被平台拒绝
+    if not config['video'].get('probe', True):
+        return None, None
+    if cache is None:
+        cache = ProbeCache(config['video'].get('probe_cache_file'))
+    info = probe_video(video_path, config, cache)
+    if info is not None:
+        valid, message = check_video_info(info, config)
+        if not valid:
+            return info, message
+    return info, None
+
+
+def validate_video(video_path: str, config: dict, cache: Optional[ProbeCache] = None) -> tuple:
+    """验证视频文件（格式、大小，以及 ffprobe 探测出的时长和编码）"""
+    if cache is None and config['video'].get('probe', True):
+        cache = ProbeCache(config['video'].get('probe_cache_file'))
+    info, error = inspect_video(video_path, config, cache)
+    if cache is not None:
+        cache.save()
+    if error:
+        return False, error
+
+    if info is None and config['video'].get('probe', True):
+        print("⚠️  无法解析视频元数据（未安装 ffprobe 且非 MP4/MOV），跳过时长和编码检查")
+    elif info is not None:
+        print(f"✓ 视频信息：{info['width']}x{info['height']} {info['video_codec']} "
+              f"{info['duration_s']}s {info['bitrate_kbps']}kbps")
+    return True, "验证通过"
+
+
+def job_kind(job: Dict[str, Any]) -> str:
+    """任务的媒体类型（显式 kind 优先，否则有 video 字段即视频）"""
+    return job.get('kind') or ('video' if job.get('video') else 'image')
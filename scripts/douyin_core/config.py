@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+配置加载
+所有发布入口共用一份默认配置，用户配置递归覆盖
+"""
+
+import copy
+import json
+import os
+from pathlib import Path
+
+# 项目根目录（scripts/ 的上级），缓存、记录库等相对路径以它为基准
+PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+DEFAULT_CONFIG = {
+    "account": {"cookie_file": "cookies.json"},
+    # 多账号：名称 -> 账号配置（如 {"cookie_file": "cookies_a.json"}），任务用 'account' 字段指定
+    "accounts": {},
+    "browser": {
+        "headless": True,
+        # 启动档位：dense / balanced / debug（见 douyin_core.session.LAUNCH_PROFILES），profiles 中可覆盖或新增
+        "profile": "balanced",
+        "profiles": {},
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    },
+    "behavior": {
+        "min_delay_ms": 800,
+        "max_delay_ms": 3000,
+        "scroll_before_post": True,
+        "random_mouse_move": True,
+        "screenshot_on_error": True,
+        "screenshot": {
+            "format": "jpeg",
+            "quality": 70,
+            "scope": "viewport",
+            "ring_size": 8,
+            "keep_success": False,
+            "max_total_mb": 200,
+            "max_age_days": 7
+        }
+    },
+    "post": {
+        "default_visible": "public",
+        "max_images": 9,
+        "min_images": 2,
+        "retry_times": 3,
+        "retry_delay_s": 5,
+        "min_gap_s": 300
+    },
+    "topics": {
+        # 曾匹配到平台建议项的话题索引，已知话题不再等建议下拉
+        "index_file": ".cache/topic_index.json",
+        "max_entries": 2000,
+        "suggest_timeout_ms": 1500,
+        "known_settle_ms": 150,
+        "between_ms": [150, 400]
+    },
+    "video": {
+        "max_size_mb": 500,
+        "max_duration_s": 300,
+        "supported_formats": ["mp4", "mov", "avi", "mkv", "webm"],
+        "supported_codecs": ["h264", "hevc", "vp8", "vp9", "av1", "mpeg4"],
+        "probe": True,
+        "probe_cache_file": ".cache/media_probe.json",
+        "probe_workers": 4,
+        "ffprobe_bin": "ffprobe",
+        "prep": {
+            "enable": False,
+            "transcode": False,
+            "target_bitrate_kbps": 6000,
+            "max_short_side": 1080
+        },
+        "auto_cover": {
+            "enable": False,
+            "samples": 12
+        },
+        "allow_cover_custom": True,
+        "allow_bgm": True
+    },
+    "validation": {
+        # stop=有任何一条不通过就整批不发；quarantine=隔离不通过的行，其余照常发布
+        "policy": "stop",
+        "workers": 8,
+        "max_title_len": 55,
+        "max_topics": 5,
+        "min_image_side": 200,
+        # header=只读文件头（快，无需 Pillow）；full=用 Pillow 完整解码
+        "image_decode": "header",
+        # error / warn / off
+        "duplicates": "error",
+        "quarantine_file": "quarantine.jsonl"
+    },
+    "text": {
+        # 敏感词表（每行一个词，# 为注释），相对路径以项目根目录为基准
+        "word_lists": ["assets/sensitive_words.txt"],
+        # warn=只警告（默认，内置词表含"最佳""顶级"等常用词）；block=记为校验不通过
+        "action": "warn",
+        "max_title_emoji": 5,
+        "max_topic_len": 20
+    },
+    "dedupe": {
+        # 与最近发过的图片（所有账号）及同批图片做感知哈希比较；需要 numpy / Pillow
+        "enable": True,
+        # warn=只警告；block=记为校验不通过
+        "action": "warn",
+        # pHash / dHash 汉明距离阈值（64 位），两者都不超过才算相似
+        "max_distance": 10,
+        "dhash_max_distance": 14,
+        "window_days": 90,
+        "workers": 4
+    },
+    "manifest": {
+        # JSONL / CSV 清单每次读入并校验的行数
+        "chunk_size": 20
+    },
+    "ledger": {
+        # 发布记录库（SQLite，只追加），相对路径以项目根目录为基准
+        "enable": True,
+        "file": "data/publish_ledger.db"
+    },
+    "host": {
+        # 多账号共用一个浏览器：工作线程数、上下文总数上限（超出时淘汰最久未用的）、
+        # 空闲淘汰时间、单个上下文 JS 堆上限（MB，超过后下次租用重建）
+        "workers": 4,
+        "max_contexts": 8,
+        "idle_evict_s": 600,
+        "evict_check_s": 30,
+        "max_context_heap_mb": 512
+    },
+    "standby": {
+        # 热备发布页：每个账号上下文保留一个已加载并确认登录的发布页，新任务直接领取（openclaw serve 模式默认开启）；
+        # 超过 max_age_s 重新加载，领取时最多等 verify_timeout_ms 加载完成
+        "enable": False,
+        "max_age_s": 600,
+        "verify_timeout_ms": 15000
+    },
+    "network": {
+        # 每条发布的网络指标（CDP Network 事件，写入结果的 'network'）；
+        # categories 覆盖 URL 分类规则 [[类别, [URL 片段, ...]], ...]（见 douyin_core.network_metrics）
+        "enable": True,
+        "categories": None
+    },
+    "bandwidth": {
+        # 上行带宽分配：enable 时把 upload_kbps 的全局预算按权重分给同时上传的页面（CDP 限速），
+        # 离 publish_at 越近权重越高（priority_horizon_s 内线性升到 max_priority），每个页面不低于 min_kbps
+        "enable": False,
+        "upload_kbps": 0,
+        "min_kbps": 256,
+        "max_priority": 4,
+        "priority_horizon_s": 3600,
+        "rebalance_s": 2
+    },
+    "display": {
+        # 有界面浏览器用的 Xvfb 虚拟显示池（见 display_pool.py）：最多同时几个、分辨率、空闲多久关闭；
+        # 已设置 DISPLAY 时默认用当前显示，force_xvfb 为 True 时也改用虚拟显示
+        "size": 4,
+        "screen": "1920x1080x24",
+        "idle_timeout_s": 300,
+        "force_xvfb": False
+    },
+    "keepalive": {
+        # 会话保活（见 session_keepalive.py）：会话剩余不足 refresh_before_s 或 Cookie 超过 refresh_every_s 未更新时
+        # 访问 check_url 续期并写回 Cookie；刷新后仍不足 alert_before_s 或已失效时告警（webhook 可选）
+        "interval_s": 21600,
+        "refresh_before_s": 604800,
+        "refresh_every_s": 86400,
+        "alert_before_s": 259200,
+        "check_url": "https://creator.douyin.com/creator-micro/home",
+        "webhook": ""
+    },
+    "memory": {
+        # 每条任务结束后采样内存（写入结果的 'memory'），超过阈值（MB）时在任务之间回收浏览器；
+        # recycle_every > 0 时每发布这么多条固定回收一次；tracemalloc 差异用 kill -USR1 <pid> 按需输出
+        "enable": True,
+        "python_rss_mb": 1024,
+        "browser_rss_mb": 1536,
+        "recycle_every": 0,
+        "tracemalloc": False,
+        "snapshot_dir": "traces/memory"
+    },
+    "tracing": {
+        "enable": False,
+        "dir": "traces",
+        "max_files": 20,
+        "max_total_mb": 200
+    },
+    "anti_detect": {
+        "enable": True,
+        "random_viewport": True,
+        "hide_webdriver": True
+    }
+}
+
+
+def deep_merge(base: dict, override: dict) -> dict:
+    """深度合并字典"""
+    result = base.copy()
+    for key, value in override.items():
+        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = deep_merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def load_config(config_path: str = "assets/config.json") -> dict:
+    """加载配置文件（递归合并默认配置，返回独立副本，可随意修改）"""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = deep_merge(config, json.load(f))
+    return config
+
+
+def resolve_cookie_file(config: dict, script_dir: str = '.') -> str:
+    """Cookie 文件路径（相对路径以项目根目录，即 scripts/ 的上级为基准）"""
+    cookie_file = config['account'].get('cookie_file', 'cookies.json')
+    if not os.path.isabs(cookie_file):
+        cookie_file = os.path.join(script_dir, '..', cookie_file)
+    return cookie_file
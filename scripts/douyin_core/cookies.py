@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Cookie 读写与登录状态
+读写走 douyin_core.storage（加锁原子写入、历史版本、按 mtime 缓存读取）
+只用标准库，status 等命令无需导入 Playwright
+"""
+
+import os
+import time
+from typing import Any, Dict, List
+
+from .storage import list_versions, read_json, restore_version, retire, write_json
+
+# 每个 Cookie 文件保留的历史版本数（<目录>/.history/，用于回滚）
+COOKIE_HISTORY = 5
+
+
+def load_cookies(cookie_file: str) -> list:
+    """从文件加载 Cookie（按 mtime 缓存）；文件损坏时退回最近一个完好的历史版本"""
+    try:
+        return read_json(cookie_file, [])
+    except ValueError as e:
+        for version in list_versions(cookie_file):
+            try:
+                cookies = read_json(version, [])
+            except (OSError, ValueError):
+                continue
+            print(f"⚠️  Cookie 文件损坏（{e}），使用历史版本：{os.path.basename(version)}")
+            return cookies
+        raise
+
+
+def save_cookies(cookies: list, cookie_file: str):
+    """保存 Cookie 到文件（加锁原子替换，旧版本存入历史）"""
+    write_json(cookie_file, cookies, history=COOKIE_HISTORY)
+    print(f"✅ Cookie 已保存：{cookie_file}")
+
+
+def cookie_versions(cookie_file: str) -> List[Dict[str, Any]]:
+    """Cookie 历史版本，最新的在前：[{'path', 'saved_at', 'cookies'}]"""
+    versions = []
+    for path in list_versions(cookie_file):
+        try:
+            count = len(read_json(path, []))
+        except (OSError, ValueError):
+            count = None
+        versions.append({'path': path, 'saved_at': int(os.path.getmtime(path)), 'cookies': count})
+    return versions
+
+
+def rollback_cookies(cookie_file: str, steps: int = 1) -> str:
+    """
+    回滚到第 steps 个历史版本（1 为上一个），当前版本也存入历史
+
+    Returns:
+        使用的历史版本路径
+    """
+    versions = list_versions(cookie_file)
+    if not 1 <= steps <= len(versions):
+        raise ValueError(f"没有第 {steps} 个历史版本（共 {len(versions)} 个）")
+    restore_version(cookie_file, versions[steps - 1], history=COOKIE_HISTORY)
+    return versions[steps - 1]
+
+
+def discard_cookies(cookie_file: str):
+    """重新登录前删除 Cookie 文件（存入历史，登录失败可回滚）"""
+    retire(cookie_file, COOKIE_HISTORY)
+
+
+def cookie_status(cookie_file: str) -> Dict[str, Any]:
+    """
+    读取 Cookie 文件判断登录状态（不打开浏览器）
+
+    Returns:
+        {'logged_in', 'cookie_file', 'cookies', 'expires_in_s', 'saved_at'}
+        expires_in_s 为最早过期的持久 Cookie 剩余秒数（没有持久 Cookie 时为 None）
+    """
+    status = {'logged_in': False, 'cookie_file': cookie_file, 'cookies': 0,
+              'expires_in_s': None, 'saved_at': None}
+    try:
+        cookies = load_cookies(cookie_file)
+    except (OSError, ValueError):
+        return status
+    if not cookies:
+        return status
+
+    now = time.time()
+    expiries = [c['expires'] for c in cookies if isinstance(c.get('expires'), (int, float)) and c['expires'] > 0]
+    status['cookies'] = len(cookies)
+    status['saved_at'] = int(os.path.getmtime(cookie_file))
+    if expiries:
+        status['expires_in_s'] = int(min(expiries) - now)
+    # 所有持久 Cookie 都已过期视为未登录
+    status['logged_in'] = not expiries or max(expiries) > now
+    return status
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+本地封面生成
+从视频中均匀抽帧，用 NumPy 向量化计算清晰度 / 曝光 / 对比度打分，
+选出最佳帧导出为 JPEG，按视频内容哈希缓存，供 --cover 使用
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖：未安装时跳过自动封面
+    np = None
+
+from .config import PROJECT_DIR
+from .media_probe import ProbeCache, probe_video
+from .video_prep import content_hash
+
+DEFAULT_COVER_CONFIG = {
+    "enable": False,
+    "ffmpeg_bin": "ffmpeg",
+    "samples": 12,
+    "scoring_width": 320,
+    "workers": 2,
+    "cache_dir": ".cache/covers",
+    "jpeg_quality": 2,
+    # 打分权重：清晰度 / 曝光 / 对比度
+    "weights": [0.6, 0.25, 0.15]
+}
+
+
+def get_cover_config(config: dict) -> dict:
+    """读取 video.auto_cover 配置（补齐默认值）"""
+    cover_config = dict(DEFAULT_COVER_CONFIG)
+    cover_config.update(config.get('video', {}).get('auto_cover', {}))
+    return cover_config
+
+
+def sample_timestamps(duration_s: float, samples: int) -> List[float]:
+    """在 5%~95% 区间均匀取样，避开片头黑场和片尾"""
+    if samples <= 1:
+        return [duration_s / 2]
+    step = 0.9 / (samples - 1)
+    return [round(duration_s * (0.05 + step * i), 3) for i in range(samples)]
+
+
+def extract_gray_frame(video_path: str, timestamp: float, width: int, height: int,
+                       ffmpeg_bin: str = 'ffmpeg') -> Optional[bytes]:
+    """抽取指定时间点的缩略灰度帧（rawvideo）"""
+    cmd = [ffmpeg_bin, '-hide_banner', '-loglevel', 'error', '-ss', str(timestamp), '-i', video_path,
+           '-frames:v', '1', '-vf', f'scale={width}:{height}', '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=30, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0 or len(proc.stdout) != width * height:
+        return None
+    return proc.stdout
+
+
+def score_frames(frames, weights: List[float]):
+    """
+    对一组灰度帧打分（整批向量化计算）
+
+    Args:
+        frames: 形状为 (N, H, W) 的 uint8 数组
+        weights: [清晰度, 曝光, 对比度] 权重
+
+    Returns:
+        长度为 N 的得分数组
+    """
+    data = frames.astype(np.float32)
+
+    # 拉普拉斯方差：越大越清晰
+    laplacian = (4 * data[:, 1:-1, 1:-1] - data[:, :-2, 1:-1] - data[:, 2:, 1:-1]
+                 - data[:, 1:-1, :-2] - data[:, 1:-1, 2:])
+    sharpness = laplacian.reshape(len(data), -1).var(axis=1)
+    sharpness = sharpness / max(float(sharpness.max()), 1e-6)
+
+    # 平均亮度越接近中灰越好
+    brightness = data.reshape(len(data), -1).mean(axis=1) / 255.0
+    exposure = 1.0 - np.clip(np.abs(brightness - 0.5) / 0.5, 0.0, 1.0)
+
+    contrast = np.clip(data.reshape(len(data), -1).std(axis=1) / 128.0, 0.0, 1.0)
+
+    scores = weights[0] * sharpness + weights[1] * exposure + weights[2] * contrast
+    # 近乎全黑 / 全白的帧直接淘汰
+    scores[(brightness < 0.08) | (brightness > 0.92)] = 0.0
+    return scores
+
+
+def generate_cover(video_path: str, config: dict, cache: Optional[ProbeCache] = None) -> Optional[str]:
+    """
+    为视频生成最佳封面
+
+    Returns:
+        封面 JPEG 路径；缺少 ffmpeg / NumPy 或抽帧失败时返回 None
+    """
+    cover_config = get_cover_config(config)
+    ffmpeg_bin = cover_config['ffmpeg_bin']
+
+    if np is None:
+        print("⚠️  未安装 numpy，跳过自动封面")
+        return None
+    if not shutil.which(ffmpeg_bin):
+        print(f"⚠️  未找到 {ffmpeg_bin}，跳过自动封面")
+        return None
+
+    cache_dir = cover_config['cache_dir']
+    if not os.path.isabs(cache_dir):
+        cache_dir = str(PROJECT_DIR / cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    cover_path = os.path.join(cache_dir, f"{content_hash(video_path)[:24]}.jpg")
+    if os.path.exists(cover_path):
+        return cover_path
+
+    if cache is None:
+        cache = ProbeCache(config.get('video', {}).get('probe_cache_file'))
+    info = probe_video(video_path, config, cache)
+    if not info or not info.get('duration_s') or not info.get('width') or not info.get('height'):
+        print(f"⚠️  无法读取视频信息，跳过自动封面：{os.path.basename(video_path)}")
+        return None
+
+    width = cover_config['scoring_width']
+    height = max(2, int(round(width * info['height'] / info['width'] / 2)) * 2)
+    timestamps = sample_timestamps(info['duration_s'], cover_config['samples'])
+
+    frames, frame_times = [], []
+    for timestamp in timestamps:
+        raw = extract_gray_frame(video_path, timestamp, width, height, ffmpeg_bin)
+        if raw is not None:
+            frames.append(np.frombuffer(raw, dtype=np.uint8).reshape(height, width))
+            frame_times.append(timestamp)
+
+    if not frames:
+        print(f"⚠️  抽帧失败，跳过自动封面：{os.path.basename(video_path)}")
+        return None
+
+    scores = score_frames(np.stack(frames), cover_config['weights'])
+    best_time = frame_times[int(scores.argmax())]
+
+    # 以原始分辨率导出选中的帧
+    tmp_path = cover_path + f'.{os.getpid()}.tmp.jpg'
+    cmd = [ffmpeg_bin, '-hide_banner', '-loglevel', 'error', '-y', '-ss', str(best_time), '-i', video_path,
+           '-frames:v', '1', '-q:v', str(cover_config['jpeg_quality']), tmp_path]
+    proc = subprocess.run(cmd, capture_output=True, check=False)
+    if proc.returncode != 0 or not os.path.exists(tmp_path):
+        print(f"⚠️  封面导出失败：{os.path.basename(video_path)}")
+        return None
+    os.replace(tmp_path, cover_path)
+
+    print(f"✅ 自动封面：{os.path.basename(video_path)} @ {best_time}s（得分 {float(scores.max()):.2f}）")
+    return cover_path
+
+
+def generate_covers(video_paths: List[str], config: dict, max_workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """并行为一批视频生成封面（在发布任务开始前调用）"""
+    cover_config = get_cover_config(config)
+    cache = ProbeCache(config.get('video', {}).get('probe_cache_file'))
+    max_workers = max_workers or cover_config['workers']
+
+    unique_paths = list(dict.fromkeys(video_paths))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        covers = dict(zip(unique_paths, executor.map(lambda p: generate_cover(p, config, cache), unique_paths)))
+
+    cache.save()
+    return covers
+
+
+def main():
+    """命令行：为视频生成封面"""
+    parser = argparse.ArgumentParser(description='从视频中自动挑选封面帧')
+    parser.add_argument('videos', nargs='+', help='视频文件路径')
+    parser.add_argument('--samples', type=int, help='抽样帧数')
+    parser.add_argument('--workers', type=int, help='并行数')
+    args = parser.parse_args()
+
+    cover = {}
+    if args.samples:
+        cover['samples'] = args.samples
+    covers = generate_covers(args.videos, {'video': {'auto_cover': cover}}, args.workers)
+
+    for video, cover_path in covers.items():
+        print(f"{video} -> {cover_path or '失败'}")
+    sys.exit(0 if all(covers.values()) else 1)
+
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+近似重复图片检测
+发布成功的图片感知哈希记在发布记录库（image_hashes 表）；预校验时把最近 dedupe.window_days
+天内发过的图片（所有账号）建成 BK 树，按汉明距离查询本批每张图，批内也互相比较，
+按 dedupe.action 警告或阻止。哈希计算见 image_hash.py（需要 NumPy / Pillow，缺失时跳过）
+"""
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .ledger import resolve_ledger_file
+
+
+if hasattr(int, 'bit_count'):
+    def hamming(a: int, b: int) -> int:
+        """两个 64 位哈希的汉明距离"""
+        return (a ^ b).bit_count()
+else:  # Python < 3.10
+    def hamming(a: int, b: int) -> int:
+        """两个 64 位哈希的汉明距离"""
+        return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    BK 树：按汉明距离组织的度量树，半径查询只访问 |d(node) - d| <= radius 的子树，
+    几万个哈希中查近邻只需比较其中一小部分
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, value: Any):
+        """插入一个哈希及其附带信息"""
+        self._size += 1
+        if self._root is None:
+            self._root = [key, value, {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> List[Tuple[int, int, Any]]:
+        """返回距离不超过 radius 的 (距离, 哈希, 附带信息)，按距离升序"""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node[0])
+            if distance <= radius:
+                found.append((distance, node[0], node[1]))
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(found, key=lambda item: item[0])
+
+
+def iter_posted_hashes(config: dict, since: float) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """读取记录库中 since 之后发布成功的图片哈希：(phash, dhash, {'title', 'account', 'posted_at'})"""
+    path = resolve_ledger_file(config)
+    if not os.path.exists(path):
+        return
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        rows = conn.execute('SELECT phash, dhash, title, account, posted_at FROM image_hashes'
+                            ' WHERE posted_at >= ?', (since,))
+        for phash, dhash, title, account, posted_at in rows:
+            yield int(phash, 16), int(dhash, 16), {'title': title, 'account': account, 'posted_at': posted_at}
+    except sqlite3.OperationalError:
+        # 旧记录库还没有 image_hashes 表
+        return
+    finally:
+        conn.close()
+
+
+def _ago(timestamp: float) -> str:
+    days = (time.time() - timestamp) / 86400
+    return f"{days:.0f} 天前" if days >= 1 else f"{days * 24:.0f} 小时前"
+
+
+class NearDuplicateIndex:
+    """
+    预校验用的近似重复索引：已发布图片（首次使用时从记录库加载）+ 本批已检查过的图片
+
+    同一个实例可跨多次 check 使用（流式清单逐块校验时，块与块之间也能互相比较）
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.settings = config.get('dedupe', {})
+        self.posted: Optional[BKTree] = None
+        self.batch = BKTree()
+
+    def _load_posted(self) -> BKTree:
+        tree = BKTree()
+        since = time.time() - self.settings.get('window_days', 90) * 86400
+        for phash, dhash, info in iter_posted_hashes(self.config, since):
+            tree.add(phash, dict(info, dhash=dhash))
+        return tree
+
+    def check(self, rows: List[Dict[str, Any]]):
+        """
+        给通过前面检查的图文行补充近似重复的警告 / 错误，并把哈希写入 row['image_hashes']
+        [(path, phash_hex, dhash_hex)]，供发布成功后记录
+        """
+        if not self.settings.get('enable', True):
+            return
+        paths = [asset['path'] for row in rows if not row['errors'] and row['kind'] == 'image'
+                 for asset in row['assets']]
+        if not paths:
+            return
+
+        from . import image_hash
+        if not image_hash.available():
+            print("⚠️  未安装 numpy / Pillow，跳过近似重复图片检测")
+            return
+        hashes = image_hash.hash_images(paths, self.settings.get('workers', 4))
+        if self.posted is None:
+            self.posted = self._load_posted()
+
+        radius = self.settings.get('max_distance', 10)
+        dhash_radius = self.settings.get('dhash_max_distance', 14)
+        block = self.settings.get('action', 'warn') == 'block'
+
+        for row in rows:
+            if row['errors'] or row['kind'] != 'image':
+                continue
+            row['image_hashes'] = []
+            for number, asset in enumerate(row['assets'], 1):
+                value = hashes.get(asset['path'])
+                if value is None:
+                    continue
+                phash, dhash = value
+                row['image_hashes'].append((asset['path'], f"{phash:016x}", f"{dhash:016x}"))
+
+                messages = []
+                for distance, _, info in self.posted.search(phash, radius):
+                    if hamming(dhash, info['dhash']) <= dhash_radius:
+                        messages.append(f"第 {number} 张与{_ago(info['posted_at'])}"
+                                        f"[{info['account']}]发布的《{info['title']}》相似（距离 {distance}）")
+                        break
+                for distance, _, info in self.batch.search(phash, radius):
+                    if info['index'] != row['index'] and hamming(dhash, info['dhash']) <= dhash_radius:
+                        messages.append(f"第 {number} 张与第 {info['index']} 行第 {info['number']} 张相似"
+                                        f"（距离 {distance}）")
+                        break
+                (row['errors'] if block else row['warnings']).extend(messages)
+                self.batch.add(phash, {'index': row['index'], 'number': number, 'dhash': dhash})
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Xvfb 虚拟显示池
+服务器上跑有界面（headless=False）的浏览器（扫码登录、debug 启动档位）时，按需启动 Xvfb，
+租给一个浏览器用，用完归还复用；多个有界面的会话可以同时各用一个显示，不用手动设置 DISPLAY
+
+已设置 DISPLAY（桌面环境）时直接用当前显示，窗口可见（扫码登录要看到二维码窗口）；
+只有没有 DISPLAY、或 display.force_xvfb 为 True 时才启动 Xvfb
+
+- 显示号由 Xvfb 自己挑空闲的（-displayfd），多个进程各自的显示池不会冲突
+- 租出前做健康检查（进程存活且 X socket 可连接），不健康的关闭重开
+- 空闲超过 display.idle_timeout_s 的显示在下次租用 / 归还时关闭，进程退出时全部关闭
+- 没有安装 Xvfb 时退回当前环境的 DISPLAY
+
+用法：
+    with get_display_pool(config).lease() as display:
+        browser = p.chromium.launch(headless=False, **display_launch_options(display))
+
+    python scripts/display_pool.py --check     # 启动一个显示并做健康检查
+"""
+
+import argparse
+import atexit
+import os
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DISPLAY_CONFIG = {
+    "size": 4,
+    "screen": "1920x1080x24",
+    "start_timeout_s": 10,
+    "lease_timeout_s": 120,
+    "idle_timeout_s": 300,
+    "force_xvfb": False
+}
+
+
+def get_display_config(config: dict) -> dict:
+    """读取 display 配置（补齐默认值）"""
+    display_config = dict(DEFAULT_DISPLAY_CONFIG)
+    display_config.update(config.get('display', {}))
+    return display_config
+
+
+def display_launch_options(display: Optional[str]) -> Dict[str, Any]:
+    """chromium.launch 的额外参数：让这个浏览器进程使用指定显示（None 时沿用当前环境）"""
+    if not display:
+        return {}
+    return {'env': dict(os.environ, DISPLAY=display)}
+
+
+class Display:
+    """一个 Xvfb 进程"""
+
+    def __init__(self, screen: str, start_timeout_s: float):
+        xvfb = shutil.which('Xvfb')
+        if xvfb is None:
+            raise FileNotFoundError('未找到 Xvfb')
+        read_fd, write_fd = os.pipe()
+        try:
+            self.proc = subprocess.Popen(
+                [xvfb, '-displayfd', str(write_fd), '-screen', '0', screen, '-nolisten', 'tcp'],
+                pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            os.close(write_fd)
+            write_fd = -1
+            self.number = self._read_display_number(read_fd, start_timeout_s)
+        except Exception:
+            if write_fd >= 0:
+                os.close(write_fd)
+            if hasattr(self, 'proc'):
+                self.proc.kill()
+            raise
+        finally:
+            os.close(read_fd)
+        self.name = f':{self.number}'
+        self.leases = 0
+        self.last_used = time.time()
+
+    def _read_display_number(self, fd: int, timeout_s: float) -> int:
+        """Xvfb 就绪后把显示号写到 -displayfd 指定的管道"""
+        deadline = time.time() + timeout_s
+        data = b''
+        while not data.endswith(b'\n'):
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError(f'Xvfb {timeout_s:.0f}s 内未就绪')
+            chunk = os.read(fd, 16)
+            if not chunk:
+                raise RuntimeError(f'Xvfb 启动失败（退出码 {self.proc.poll()}）')
+            data += chunk
+        return int(data.strip())
+
+    def healthy(self) -> bool:
+        """进程存活且 X socket 可连接"""
+        if self.proc.poll() is not None:
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(1)
+                sock.connect(f'/tmp/.X11-unix/X{self.number}')
+            return True
+        except OSError:
+            return False
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+class DisplayPool:
+    """Xvfb 显示池：最多 display.size 个显示，租用 / 归还 / 复用 / 健康检查 / 空闲回收"""
+
+    def __init__(self, config: dict):
+        self.settings = get_display_config(config)
+        self.available = shutil.which('Xvfb') is not None and sys.platform.startswith('linux')
+        self._idle: List[Display] = []
+        self._busy: List[Display] = []
+        self._starting = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _reap_idle(self):
+        """关闭空闲过久或已不健康的显示（持锁调用）"""
+        now = time.time()
+        keep = []
+        for display in self._idle:
+            if now - display.last_used > self.settings['idle_timeout_s'] or not display.healthy():
+                display.close()
+            else:
+                keep.append(display)
+        self._idle = keep
+
+    def acquire(self) -> Display:
+        """租一个显示：优先复用空闲的，未满时新开，满了等待归还"""
+        deadline = time.time() + self.settings['lease_timeout_s']
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError('显示池已关闭')
+                self._reap_idle()
+                if self._idle:
+                    display = self._idle.pop()
+                    display.leases += 1
+                    self._busy.append(display)
+                    return display
+                if len(self._busy) + self._starting < self.settings['size']:
+                    self._starting += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.settings['lease_timeout_s']}s 内没有空闲的虚拟显示")
+                self._cond.wait(remaining)
+
+        # 在锁外启动 Xvfb，多个会话可同时启动各自的显示
+        try:
+            display = Display(self.settings['screen'], self.settings['start_timeout_s'])
+        finally:
+            with self._cond:
+                self._starting -= 1
+                self._cond.notify()
+        print(f"🖥️  启动虚拟显示 {display.name}")
+        with self._cond:
+            display.leases += 1
+            self._busy.append(display)
+        return display
+
+    def release(self, display: Display):
+        """归还显示：健康的放回空闲列表复用"""
+        with self._cond:
+            self._busy.remove(display)
+            display.last_used = time.time()
+            if not self._closed and display.healthy():
+                self._idle.append(display)
+            else:
+                display.close()
+            self._reap_idle()
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        """
+        租用一个显示，产出 DISPLAY 值（如 ':99'）；已有 DISPLAY 且未设置 force_xvfb、或没有 Xvfb 时
+        产出当前环境的 DISPLAY（可能为 None）
+        """
+        ambient = os.environ.get('DISPLAY')
+        if not self.available or (ambient and not self.settings['force_xvfb']):
+            if not ambient:
+                print("⚠️  未安装 Xvfb 且没有 DISPLAY，有界面的浏览器可能无法启动（apt install xvfb）")
+            yield ambient
+            return
+        display = self.acquire()
+        try:
+            yield display.name
+        finally:
+            self.release(display)
+
+    def close(self):
+        """关闭所有显示（租用中的在归还时关闭）"""
+        with self._cond:
+            self._closed = True
+            for display in self._idle:
+                display.close()
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {'idle': [d.name for d in self._idle], 'busy': [d.name for d in self._busy],
+                    'leases': sum(d.leases for d in self._idle + self._busy)}
+
+
+_pool: Optional[DisplayPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_display_pool(config: dict) -> DisplayPool:
+    """进程内共享的显示池（进程退出时关闭所有显示）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DisplayPool(config)
+            atexit.register(_pool.close)
+        return _pool
+
+
+def main():
+    """启动一个显示做健康检查"""
+    parser = argparse.ArgumentParser(description='Xvfb 虚拟显示池')
+    parser.add_argument('--check', action='store_true', help='启动一个显示并做健康检查')
+    args = parser.parse_args()
+
+    # 已有 DISPLAY 时也启动 Xvfb 检查
+    pool = get_display_pool({'display': {'force_xvfb': True}})
+    if not pool.available:
+        print("❌ 未找到 Xvfb（apt install xvfb）")
+        sys.exit(1)
+    if args.check:
+        started = time.time()
+        with pool.lease() as display:
+            print(f"✅ 虚拟显示 {display} 可用（{(time.time() - started) * 1000:.0f}ms）")
+    pool.close()
+
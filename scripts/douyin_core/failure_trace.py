@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+失败现场追踪
+整个浏览器上下文持续开启 Playwright tracing（DOM 快照，不截图），
+每次发布一个 chunk：成功则丢弃，失败才写成 trace.zip（流水线此时不预取下一帖，chunk 与任务一一对应）；
+traces/ 目录按文件数和总大小滚动淘汰最旧的记录
+
+查看：playwright show-trace traces/<文件名>.zip
+"""
+
+import os
+import re
+import time
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_TRACING_CONFIG = {
+    "enable": False,
+    "dir": "traces",
+    "snapshots": True,
+    "max_files": 20,
+    "max_total_mb": 200
+}
+
+
+def get_tracing_config(config: dict) -> dict:
+    """读取 tracing 配置（补齐默认值）"""
+    tracing_config = dict(DEFAULT_TRACING_CONFIG)
+    tracing_config.update(config.get('tracing', {}))
+    return tracing_config
+
+
+def prune_traces(trace_dir: str, max_files: int = 20, max_total_mb: float = 200) -> int:
+    """按文件数和总大小淘汰最旧的 trace，返回删除数量"""
+    if not os.path.isdir(trace_dir):
+        return 0
+
+    traces = []
+    for entry in os.scandir(trace_dir):
+        if entry.is_file() and entry.name.endswith('.zip'):
+            st = entry.stat()
+            traces.append((st.st_mtime, st.st_size, entry.path))
+    traces.sort()
+
+    total = sum(size for _, size, _ in traces)
+    budget = max_total_mb * 1024 * 1024 if max_total_mb else None
+    removed = 0
+    for _, size, path in traces:
+        too_many = max_files and len(traces) - removed > max_files
+        too_big = budget is not None and total > budget
+        if not (too_many or too_big):
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class FailureTracer:
+    """按发布任务分 chunk 的 tracing，只保留失败的 chunk"""
+
+    def __init__(self, context, config: dict):
+        self.context = context
+        self.settings = get_tracing_config(config)
+        self.enabled = bool(self.settings['enable'])
+        self._started = False
+        self._chunk_name: Optional[str] = None
+        self._chunk_started_at = 0.0
+
+    def start(self):
+        """开启上下文级 tracing（不截图，只记录 DOM 快照和操作）"""
+        if not self.enabled or self._started:
+            return
+        try:
+            self.context.tracing.start(snapshots=self.settings['snapshots'], screenshots=False, sources=False)
+            self._started = True
+        except Exception as e:
+            print(f"⚠️  tracing 启动失败：{e}")
+            self.enabled = False
+
+    def begin(self, name: str):
+        """开始一个任务的 chunk"""
+        if not self.enabled:
+            return
+        self.start()
+        if self._chunk_name is not None:
+            self.end(failed=False)
+        try:
+            self.context.tracing.start_chunk(title=name)
+            self._chunk_name = name
+            self._chunk_started_at = time.time()
+        except Exception as e:
+            print(f"⚠️  tracing chunk 启动失败：{e}")
+
+    def end(self, failed: bool) -> Optional[str]:
+        """结束当前 chunk：失败时写盘并返回路径，成功时直接丢弃"""
+        if not self.enabled or self._chunk_name is None:
+            return None
+
+        name, self._chunk_name = self._chunk_name, None
+        trace_dir = self.settings['dir']
+        path = None
+        try:
+            if failed:
+                os.makedirs(trace_dir, exist_ok=True)
+                safe_name = re.sub(r'[^\w\-]+', '_', name)[:40]
+                path = os.path.join(trace_dir, f"{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+                self.context.tracing.stop_chunk(path=path)
+                print(f"🧾 失败现场 trace 已保存：{path}（playwright show-trace {path}）")
+                prune_traces(trace_dir, self.settings['max_files'], self.settings['max_total_mb'])
+            else:
+                self.context.tracing.stop_chunk()
+        except Exception as e:
+            print(f"⚠️  tracing chunk 结束失败：{e}")
+        return path
+
+    def stop(self):
+        """关闭 tracing（在关闭浏览器前调用）"""
+        if not self._started:
+            return
+        if self._chunk_name is not None:
+            self.end(failed=False)
+        try:
+            self.context.tracing.stop()
+        except Exception:
+            pass
+        self._started = False
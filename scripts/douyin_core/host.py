@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+多账号浏览器宿主
+整个宿主只启动一个 Chromium 进程，每个账号一个独立的 BrowserContext（Cookie / 存储互相隔离），
+多个账号在工作线程中并行发布，不再每个账号各起一个浏览器（每个 300~500MB）。
+
+Playwright 同步 API 的对象只能在创建它的线程里使用，所以每个工作线程通过 CDP 各自连接
+同一个 Chromium，账号固定分配给某个工作线程，上下文在该线程内复用、统计内存和淘汰：
+- 空闲超过 host.idle_evict_s 的上下文关闭
+- 每个工作线程的上下文超过上限时关闭最久未用的
+- 租用结束时 JS 堆超过 host.max_context_heap_mb 的上下文关闭（下次租用重建）
+"""
+
+import hashlib
+import json
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from .memory_watchdog import find_pids_by_arg, install_signal_handler, process_tree_rss_mb
+from .ledger import account_name
+from .session import headed_display, launch_browser, new_context
+from .standby import find_standby, get_standby
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def context_heap_mb(context) -> float:
+    """上下文中所有页面的 JS 堆已用大小之和（MB）"""
+    total = 0
+    for page in context.pages:
+        try:
+            cdp = context.new_cdp_session(page)
+            total += cdp.send('Runtime.getHeapUsage')['usedSize']
+            cdp.detach()
+        except Exception:
+            continue
+    return round(total / 1024 / 1024, 1)
+
+
+class Tenant:
+    """一个账号在宿主中的上下文及其统计"""
+
+    def __init__(self, account: str, context, cookie_digest: str):
+        self.account = account
+        self.context = context
+        self.cookie_digest = cookie_digest
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.leases = 0
+        self.busy = False
+        self.heap_mb = 0.0
+        self.peak_heap_mb = 0.0
+        # 上下文被关闭（内存看门狗回收、崩溃）后下次租用重建
+        self.closed = False
+        context.on('close', lambda _: setattr(self, 'closed', True))
+
+    def sample_memory(self) -> float:
+        """采样当前 JS 堆（在所属工作线程中调用）"""
+        self.heap_mb = context_heap_mb(self.context)
+        self.peak_heap_mb = max(self.peak_heap_mb, self.heap_mb)
+        return self.heap_mb
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {'account': self.account, 'age_s': round(now - self.created_at, 1),
+                'idle_s': 0.0 if self.busy else round(now - self.last_used, 1), 'leases': self.leases,
+                'pages': len(self.context.pages), 'heap_mb': self.heap_mb, 'peak_heap_mb': self.peak_heap_mb}
+
+
+class _Worker(threading.Thread):
+    """工作线程：持有一条到共享 Chromium 的 CDP 连接和分配给它的账号上下文"""
+
+    def __init__(self, host: 'BrowserHost', index: int):
+        super().__init__(name=f'browser-host-{index}', daemon=True)
+        self.host = host
+        self.index = index
+        self.tasks: 'queue.Queue' = queue.Queue()
+        self.tenants: Dict[str, Tenant] = {}
+        self.browser = None
+        self.evicted = 0
+        self.error: Optional[BaseException] = None
+        self._stats: List[Dict[str, Any]] = []
+        self._closed = False
+        self._closed_lock = threading.Lock()
+
+    def run(self):
+        # 连接共享 Chromium 失败或循环异常退出时，已排队和之后提交的任务都以异常结束，不会一直挂起
+        try:
+            with sync_playwright() as p:
+                self.browser = p.chromium.connect_over_cdp(self.host.endpoint)
+                try:
+                    self._serve()
+                finally:
+                    for account in list(self.tenants):
+                        self._close(account)
+                    try:
+                        self.browser.close()  # CDP 连接只断开，不会关闭共享的 Chromium
+                    except Exception:
+                        pass
+        except Exception as e:
+            self.error = e
+            print(f"❌ 宿主工作线程 {self.index} 异常退出：{e}")
+        finally:
+            self._fail_pending()
+
+    def _serve(self):
+        settings = self.host.settings
+        while True:
+            try:
+                item = self.tasks.get(timeout=settings.get('evict_check_s', 30))
+            except queue.Empty:
+                self._evict()
+                continue
+            if item is None:
+                break
+            func, future = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func())
+                except BaseException as e:
+                    future.set_exception(e)
+            self._evict()
+
+    def failure(self) -> BaseException:
+        """线程已退出时提交的任务收到的异常"""
+        if self.error is not None:
+            return RuntimeError(f"宿主工作线程 {self.index} 无法使用共享浏览器：{self.error}")
+        return RuntimeError(f"宿主工作线程 {self.index} 已停止")
+
+    def put(self, func: Callable[[], Any], future: Future) -> bool:
+        """排队一个任务；线程已退出时返回 False"""
+        with self._closed_lock:
+            if self._closed:
+                return False
+            self.tasks.put((func, future))
+            return True
+
+    def _fail_pending(self):
+        with self._closed_lock:
+            self._closed = True
+        while True:
+            try:
+                item = self.tasks.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(self.failure())
+
+    def _close(self, account: str, reason: str = ''):
+        tenant = self.tenants.pop(account)
+        try:
+            tenant.context.close()
+        except Exception:
+            pass
+        if reason:
+            self.evicted += 1
+            print(f"♻️  关闭账号上下文 [{account}]：{reason}")
+
+    def _evict(self):
+        """按空闲时间和数量上限淘汰上下文（只在本线程中调用）"""
+        settings = self.host.settings
+        now = time.time()
+        idle_limit = settings.get('idle_evict_s', 600)
+        for account, tenant in list(self.tenants.items()):
+            if not tenant.busy and now - tenant.last_used > idle_limit:
+                self._close(account, f"空闲 {now - tenant.last_used:.0f}s")
+
+        limit = self.host.contexts_per_worker
+        idle = sorted((t for t in self.tenants.values() if not t.busy), key=lambda t: t.last_used)
+        while len(self.tenants) > limit and idle:
+            self._close(idle.pop(0).account, f"超过每线程 {limit} 个上下文")
+        # 空闲时维护热备发布页（重开关闭的、重新加载过期的）
+        for tenant in self.tenants.values():
+            standby = None if tenant.busy else find_standby(tenant.context)
+            if standby is not None:
+                standby.tick()
+        self._stats = [tenant.stats() for tenant in self.tenants.values()]
+
+    @contextmanager
+    def lease(self, config: dict, cookies: list):
+        """
+        租用账号上下文：首次创建并加载 Cookie，之后复用；Cookie 文件变化时重新加载
+        standby.enable 时归还后为该账号预加载下一个发布页
+        """
+        account = account_name(config)
+        digest = hashlib.sha1(json.dumps(cookies, sort_keys=True).encode()).hexdigest()
+        tenant = self.tenants.get(account)
+        if tenant is not None and tenant.closed:
+            self.tenants.pop(account)
+            tenant = None
+        if tenant is None:
+            tenant = Tenant(account, new_context(self.browser, config), '')
+            self.tenants[account] = tenant
+            print(f"🧩 新建账号上下文 [{account}]（共享浏览器，线程 {self.index}）")
+        if tenant.cookie_digest != digest:
+            tenant.context.add_cookies(cookies)
+            tenant.cookie_digest = digest
+
+        tenant.busy = True
+        tenant.leases += 1
+        try:
+            yield self.browser, tenant.context
+        finally:
+            tenant.busy = False
+            tenant.last_used = time.time()
+            max_heap = self.host.settings.get('max_context_heap_mb', 512)
+            if tenant.closed:
+                self.tenants.pop(account, None)
+            elif tenant.sample_memory() > max_heap > 0:
+                self._close(account, f"JS 堆 {tenant.heap_mb}MB 超过 {max_heap}MB")
+            elif config.get('standby', {}).get('enable'):
+                get_standby(tenant.context, config).warm()
+            self._stats = [t.stats() for t in self.tenants.values()]
+
+
+class BrowserHost:
+    """
+    多账号浏览器宿主
+
+    用法：
+        with BrowserHost(config) as host:
+            future = host.submit('账号A', lambda: publish_batch(cfg_a, jobs_a, session=host.session))
+            future.result()
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.settings = config.get('host', {})
+        self.workers_count = max(1, self.settings.get('workers', 4))
+        max_contexts = max(1, self.settings.get('max_contexts', 8))
+        self.contexts_per_worker = max(1, -(-max_contexts // self.workers_count))
+        self.endpoint: Optional[str] = None
+        self._port: Optional[int] = None
+        self._playwright = None
+        self._browser = None
+        self._display = None
+        self._workers: List[_Worker] = []
+        self._assignment: Dict[str, _Worker] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self):
+        """启动共享 Chromium（开启本地 CDP 端口供工作线程连接）和工作线程"""
+        self._port = _free_port()
+        print(f"🌐 启动共享浏览器（{self.workers_count} 个工作线程）...")
+        # 看门狗在工作线程中创建，SIGUSR1 处理只能在这里（主线程）安装
+        install_signal_handler(self.config)
+        try:
+            self._playwright = sync_playwright().start()
+            # 有界面档位：整个宿主的生命周期内占用一个虚拟显示
+            display = headed_display(self.config)
+            display_name = display.__enter__()
+            self._display = display
+            self._browser = launch_browser(self._playwright, self.config,
+                                           [f'--remote-debugging-port={self._port}',
+                                            '--remote-debugging-address=127.0.0.1'],
+                                           display=display_name)
+            self.endpoint = f'http://127.0.0.1:{self._port}'
+            for index in range(self.workers_count):
+                worker = _Worker(self, index)
+                worker.start()
+                self._workers.append(worker)
+        except BaseException:
+            # 启动中途失败（如找不到 Chromium）时释放已占用的显示和 Playwright，__exit__ 不会被调用
+            self.stop()
+            raise
+        return self
+
+    def stop(self):
+        """等工作线程处理完已提交的任务，关闭所有上下文和浏览器"""
+        for worker in self._workers:
+            worker.tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+        if self._display is not None:
+            self._display.__exit__(None, None, None)
+            self._display = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _worker_for(self, account: str) -> _Worker:
+        """账号固定分配给一个工作线程（首次出现时选分配账号最少的）"""
+        with self._lock:
+            if account not in self._assignment:
+                load = {worker: 0 for worker in self._workers}
+                for assigned in self._assignment.values():
+                    load[assigned] += 1
+                self._assignment[account] = min(self._workers, key=lambda worker: (load[worker], worker.index))
+            return self._assignment[account]
+
+    def submit(self, account: str, func: Callable[[], Any]) -> Future:
+        """在账号所属的工作线程中执行 func；func 内用 host.session 取该账号的上下文"""
+        worker = self._worker_for(account)
+        future: Future = Future()
+
+        def run():
+            self._local.worker = worker
+            return func()
+
+        if not worker.put(run, future):
+            future.set_exception(worker.failure())
+        return future
+
+    def session(self, config: dict, cookies: list):
+        """与 browser_session 同签名的上下文管理器，产出 (browser, 账号上下文)；只能在 submit 的任务中调用"""
+        worker = getattr(self._local, 'worker', None)
+        if worker is None or worker is not threading.current_thread():
+            raise RuntimeError('host.session 只能在 host.submit 提交的任务中使用')
+        return worker.lease(config, cookies)
+
+    def stats(self) -> Dict[str, Any]:
+        """宿主内存统计：浏览器进程树 RSS、各账号上下文（最近一次采样）"""
+        tenants = [dict(stat, worker=worker.index) for worker in self._workers for stat in worker._stats]
+        pids = find_pids_by_arg(f'--remote-debugging-port={self._port}') if self._port else []
+        root = [pid for pid in pids if pid not in set(self._child_pids(pids))]
+        return {
+            'browser_rss_mb': process_tree_rss_mb(root),
+            'contexts': len(tenants),
+            'evicted': sum(worker.evicted for worker in self._workers),
+            'tenants': tenants
+        }
+
+    @staticmethod
+    def _child_pids(pids: List[int]) -> List[int]:
+        """pids 中父进程也在 pids 里的（带同样参数的子进程）"""
+        children = []
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/stat', 'r') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) in pids:
+                        children.append(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+        return children
+
+    def print_stats(self):
+        stats = self.stats()
+        rss = f"{stats['browser_rss_mb']}MB" if stats['browser_rss_mb'] is not None else '未知'
+        print(f"\n🧮 共享浏览器 RSS {rss}，{stats['contexts']} 个账号上下文，已淘汰 {stats['evicted']} 个")
+        for tenant in stats['tenants']:
+            print(f"  [{tenant['account']}] 线程 {tenant['worker']}：租用 {tenant['leases']} 次，"
+                  f"JS 堆 {tenant['heap_mb']}MB（峰值 {tenant['peak_heap_mb']}MB），空闲 {tenant['idle_s']}s")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+发布记录
+每条发布结果追加写入 SQLite（只增不改），按账号、时间、状态、内容指纹建索引，
+可直接查询失败率、耗时、某组素材是否发布过，无需翻日志；
+发布成功的图片感知哈希记入 image_hashes 表，供近似重复检测（douyin_core.dedupe）
+只用标准库
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import PROJECT_DIR
+from .checks import job_kind
+from .validation import content_fingerprint
+
+# 发布步骤顺序（validation / login 在启动浏览器前）
+STEPS = ('validation', 'login', 'prepare', 'compose', 'submit', 'confirm')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publish_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    fingerprint TEXT,
+    work_id TEXT,
+    status TEXT NOT NULL,
+    failed_step TEXT,
+    error_class TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    wall_s REAL NOT NULL,
+    timings TEXT NOT NULL,
+    job TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_account ON publish_results (account, finished_at);
+CREATE INDEX IF NOT EXISTS idx_results_finished ON publish_results (finished_at);
+CREATE INDEX IF NOT EXISTS idx_results_status ON publish_results (status, finished_at);
+CREATE INDEX IF NOT EXISTS idx_results_fingerprint ON publish_results (fingerprint);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_id INTEGER NOT NULL REFERENCES publish_results (id),
+    account TEXT NOT NULL,
+    title TEXT NOT NULL,
+    path TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    dhash TEXT NOT NULL,
+    posted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_image_hashes_posted ON image_hashes (posted_at);
+CREATE TRIGGER IF NOT EXISTS publish_results_no_update BEFORE UPDATE ON publish_results
+BEGIN SELECT RAISE(ABORT, 'publish_results is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS publish_results_no_delete BEFORE DELETE ON publish_results
+BEGIN SELECT RAISE(ABORT, 'publish_results is append-only'); END;
+"""
+
+
+def account_name(config: dict) -> str:
+    """账号标识：account.name，未配置时用 Cookie 文件名"""
+    account = config.get('account', {})
+    name = account.get('name')
+    if name:
+        return name
+    return os.path.splitext(os.path.basename(account.get('cookie_file', 'cookies.json')))[0]
+
+
+def job_assets(job: Dict[str, Any]) -> List[str]:
+    """任务的素材文件（决定内容指纹）：视频任务为视频文件，图文为图片"""
+    if job_kind(job) == 'video':
+        return [job['video']] if job.get('video') else []
+    return list(job.get('images') or [])
+
+
+def job_fingerprint(job: Dict[str, Any]) -> Optional[str]:
+    """任务内容指纹；素材缺失时为 None"""
+    paths = job_assets(job)
+    if not paths or not all(os.path.exists(path) for path in paths):
+        return None
+    return content_fingerprint(paths)
+
+
+def resolve_ledger_file(config: dict) -> str:
+    """记录库路径（相对路径以项目根目录为基准）"""
+    path = config.get('ledger', {}).get('file', 'data/publish_ledger.db')
+    if not os.path.isabs(path):
+        path = str(PROJECT_DIR / path)
+    return path
+
+
+def parse_since(value: str) -> float:
+    """
+    时间范围起点：'7d' / '24h' / '30m' 为相对现在；'week' 本周一零点；'today' 今天零点；
+    也接受 YYYY-MM-DD
+    """
+    now = time.time()
+    value = value.strip().lower()
+    if value in ('today', 'week'):
+        local = time.localtime(now)
+        midnight = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+        return midnight - (local.tm_wday * 86400 if value == 'week' else 0)
+    units = {'d': 86400, 'h': 3600, 'm': 60}
+    if value[-1:] in units and value[:-1].replace('.', '', 1).isdigit():
+        return now - float(value[:-1]) * units[value[-1]]
+    return time.mktime(time.strptime(value, '%Y-%m-%d'))
+
+
+class ResultsLedger:
+    """发布结果记录库（只追加）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, account: str, job: Dict[str, Any], result: Dict[str, Any]) -> int:
+        """追加一条结果，返回记录 id"""
+        finished_at = time.time()
+        if result['success']:
+            status = 'success'
+        elif result.get('submitted'):
+            status = 'unconfirmed'
+        else:
+            status = 'failed'
+
+        failed_step = result.get('failed_stage')
+        if status != 'success' and not failed_step and not result.get('attempts'):
+            failed_step = 'validation'
+        job_fields = {k: v for k, v in job.items() if not k.startswith('_')}
+        fingerprint = job.get('_fingerprint') or job_fingerprint(job)
+
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO publish_results (account, kind, title, fingerprint, work_id, status, failed_step,'
+                ' error_class, error, attempts, started_at, finished_at, wall_s, timings, job)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (account, job_kind(job), result['title'], fingerprint, job.get('_work_id'), status,
+                 failed_step, result.get('error_class'), result.get('error'), result.get('attempts', 0),
+                 finished_at - result.get('wall_s', 0.0), finished_at, result.get('wall_s', 0.0),
+                 json.dumps(result.get('timings', {})), json.dumps(job_fields, ensure_ascii=False)))
+            if status == 'success' and job.get('_image_hashes'):
+                self._conn.executemany(
+                    'INSERT INTO image_hashes (result_id, account, title, path, phash, dhash, posted_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(cursor.lastrowid, account, result['title'], path, phash, dhash, finished_at)
+                     for path, phash, dhash in job['_image_hashes']])
+        return cursor.lastrowid
+
+    # ============ 查询 ============
+    def _where(self, since: Optional[float], account: Optional[str], extra: str = ''):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('finished_at >= ?')
+            params.append(since)
+        if account:
+            clauses.append('account = ?')
+            params.append(account)
+        if extra:
+            clauses.append(extra)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def recent(self, limit: int = 20, since: Optional[float] = None,
+               account: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最近的记录（新的在前）"""
+        where, params = self._where(since, account, 'status = ?' if status else '')
+        if status:
+            params.append(status)
+        rows = self._conn.execute(
+            'SELECT id, account, kind, title, work_id, status, failed_step, error_class, error, attempts,'
+            ' finished_at, wall_s, timings FROM publish_results' + where + ' ORDER BY finished_at DESC LIMIT ?',
+            params + [limit]).fetchall()
+        return [dict(row, timings=json.loads(row['timings'])) for row in rows]
+
+    def failure_rate(self, by: str = 'step', since: Optional[float] = None,
+                     account: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        失败率
+
+        by='step'：每一步的 到达数 / 失败数 / 失败率（到达数 = 总数 - 之前步骤的失败数）；
+        by='account' / 'kind' / 'day' / 'error_class'：按该维度分组的 总数 / 失败数 / 失败率
+        """
+        where, params = self._where(since, account)
+        if by == 'step':
+            total = self._conn.execute('SELECT COUNT(*) FROM publish_results' + where, params).fetchone()[0]
+            failures = dict(self._conn.execute(
+                'SELECT failed_step, COUNT(*) FROM publish_results' + where
+                + (' AND' if where else ' WHERE') + " status != 'success' GROUP BY failed_step", params).fetchall())
+            stats, reached = [], total
+            for step in STEPS:
+                failed = failures.get(step, 0)
+                if reached or failed:
+                    stats.append({'step': step, 'reached': reached, 'failed': failed,
+                                  'rate': round(failed / reached, 4) if reached else 0.0})
+                reached -= failed
+            return stats
+
+        columns = {'account': 'account', 'kind': 'kind', 'error_class': 'error_class',
+                   'day': "date(finished_at, 'unixepoch', 'localtime')"}
+        if by not in columns:
+            raise ValueError(f"不支持的分组：{by}")
+        rows = self._conn.execute(
+            f"SELECT {columns[by]} AS grp, COUNT(*) AS total,"
+            f" SUM(status != 'success') AS failed, AVG(wall_s) AS avg_wall_s"
+            f" FROM publish_results{where} GROUP BY grp ORDER BY grp", params).fetchall()
+        return [{by: row['grp'], 'total': row['total'], 'failed': row['failed'],
+                 'rate': round(row['failed'] / row['total'], 4), 'avg_wall_s': round(row['avg_wall_s'], 2)}
+                for row in rows]
+
+    def find_by_fingerprint(self, fingerprint: str, status: Optional[str] = 'success') -> List[Dict[str, Any]]:
+        """按内容指纹查找记录（默认只看发布成功的）"""
+        sql = 'SELECT id, account, title, work_id, status, finished_at FROM publish_results WHERE fingerprint = ?'
+        params: List[Any] = [fingerprint]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        return [dict(row) for row in self._conn.execute(sql + ' ORDER BY finished_at DESC', params).fetchall()]
+
+
+def open_ledger(config: dict) -> Optional[ResultsLedger]:
+    """按配置打开记录库；ledger.enable=False 或打开失败时返回 None（不影响发布）"""
+    if not config.get('ledger', {}).get('enable', True):
+        return None
+    try:
+        return ResultsLedger(resolve_ledger_file(config))
+    except sqlite3.Error as e:
+        print(f"⚠️  发布记录库不可用：{e}")
+        return None
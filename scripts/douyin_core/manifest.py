@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+批量发布清单
+支持三种格式，素材相对路径都以清单所在目录为基准：
+- .json   JSON 数组，一次读入
+- .jsonl  每行一个 JSON 对象，逐行流式读取
+- .csv    首行为表头，列表字段（images / topics）用 | 分隔，逐行流式读取
+
+流式读取记录每行的字节偏移，消费进度写入清单旁的 .progress 文件，中断后可从断点续发
+"""
+
+import csv
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .storage import write_json
+
+# 需要按清单目录解析的路径字段
+PATH_FIELDS = ('video', 'cover')
+PATH_LIST_FIELDS = ('images',)
+
+# CSV 中的列表字段及分隔符
+CSV_LIST_FIELDS = ('images', 'topics')
+CSV_LIST_SEPARATOR = '|'
+
+# 计算进度摘要时每次读取的字节数
+PROGRESS_HASH_CHUNK = 1024 * 1024
+
+STREAM_FORMATS = ('.jsonl', '.csv')
+
+
+def resolve_paths(job: Dict[str, Any], base_dir: str) -> Dict[str, Any]:
+    """把任务中的素材相对路径解析为绝对路径"""
+    for key in PATH_FIELDS:
+        if job.get(key) and not os.path.isabs(job[key]):
+            job[key] = os.path.join(base_dir, job[key])
+    for key in PATH_LIST_FIELDS:
+        if job.get(key):
+            job[key] = [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in job[key]]
+    return job
+
+
+def is_stream_manifest(manifest_path: str) -> bool:
+    """是否为可流式读取的清单（JSONL / CSV）"""
+    return os.path.splitext(manifest_path)[1].lower() in STREAM_FORMATS
+
+
+def _csv_job(header: List[str], values: List[str]) -> Dict[str, Any]:
+    """CSV 一行转任务：空单元格忽略，列表字段按 | 拆分（也接受 JSON 数组）"""
+    job: Dict[str, Any] = {}
+    for key, value in zip(header, values):
+        value = value.strip()
+        if not key or not value:
+            continue
+        if key in CSV_LIST_FIELDS:
+            if value.startswith('['):
+                job[key] = json.loads(value)
+            else:
+                job[key] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        else:
+            job[key] = value
+    return job
+
+
+def _read_record(f, is_csv: bool) -> bytes:
+    """读取一条记录的原始字节；CSV 引号内的换行会继续读下一行"""
+    record = f.readline()
+    if is_csv:
+        while record and record.count(b'"') % 2 == 1:
+            line = f.readline()
+            if not line:
+                break
+            record += line
+    return record
+
+
+def iter_manifest(manifest_path: str, start_offset: int = 0) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    逐行读取 JSONL / CSV 清单，不整体载入内存
+
+    Args:
+        manifest_path: 清单路径
+        start_offset: 从该字节偏移开始读（续发用；CSV 表头总是从文件头读取）
+
+    Yields:
+        (offset, next_offset, job, error)：offset 为该行起始字节偏移，
+        next_offset 为读完该行后的偏移（记录进度用）；解析失败时 job 为 None、error 为原因
+    """
+    manifest_path = os.path.abspath(manifest_path)
+    base_dir = os.path.dirname(manifest_path)
+    is_csv = manifest_path.lower().endswith('.csv')
+
+    with open(manifest_path, 'rb') as f:
+        header: List[str] = []
+        if is_csv:
+            header_line = _read_record(f, True).decode('utf-8-sig')
+            header = [name.strip() for name in next(csv.reader([header_line]), [])]
+            start_offset = max(start_offset, f.tell())
+        f.seek(start_offset)
+
+        while True:
+            offset = f.tell()
+            record = _read_record(f, is_csv)
+            if not record:
+                return
+            next_offset = f.tell()
+            text = record.decode('utf-8-sig' if offset == 0 else 'utf-8', errors='replace').strip()
+            if not text:
+                continue
+
+            try:
+                if is_csv:
+                    job = _csv_job(header, next(csv.reader([text])))
+                else:
+                    job = json.loads(text)
+                    if not isinstance(job, dict):
+                        raise ValueError('每行应为 JSON 对象')
+            except (ValueError, csv.Error) as e:
+                yield offset, next_offset, None, f"无法解析：{e}"
+                continue
+            yield offset, next_offset, resolve_paths(job, base_dir), None
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """
+    读取清单（全部载入内存；大清单请用 iter_manifest 或 douyin_core.publish.publish_stream）
+
+    每项字段：图文 title, images, topics, visible；视频 title, video, cover, topics, visible, bgm
+    """
+    if is_stream_manifest(manifest_path):
+        jobs = []
+        for offset, _, job, error in iter_manifest(manifest_path):
+            if error:
+                raise ValueError(f"{manifest_path} 偏移 {offset}：{error}")
+            jobs.append(job)
+        return jobs
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        jobs = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    return [resolve_paths(job, base_dir) for job in jobs]
+
+
+class ManifestProgress:
+    """
+    流式清单的消费进度（清单旁的 <清单>.progress 文件）
+
+    记录已处理到的字节偏移、行数和偏移之前全部内容的摘要；清单被改小（偏移超出文件大小）、
+    或偏移之前任何一处内容变了（已处理的行被改动，偏移可能落在行中间）时视为新清单从头开始；
+    只在末尾追加新行不影响续发
+    摘要增量计算：续发时校验读一遍已处理的部分，之后每次提交只读新处理的行
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.path = self.manifest_path + '.progress'
+        self.offset = 0
+        self.rows = 0
+        self._hasher = hashlib.sha1()
+        self._hashed = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                offset = int(state.get('offset', 0))
+                if offset > os.path.getsize(self.manifest_path):
+                    print("⚠️  清单比上次记录的进度短，视为新清单从头开始")
+                elif 'prefix_sha1' in state and state['prefix_sha1'] != self._prefix_digest(offset):
+                    print("⚠️  清单在上次进度之前的内容已改动，视为新清单从头开始（已发布的行请先从清单中删除）")
+                else:
+                    self.offset = offset
+                    self.rows = int(state.get('rows', 0))
+            except (OSError, ValueError):
+                pass
+
+    def _prefix_digest(self, offset: int) -> str:
+        """清单开头到偏移处的 SHA1（接着上次算到的位置继续读，偏移回退时从头重算）"""
+        if offset < self._hashed:
+            self._hasher, self._hashed = hashlib.sha1(), 0
+        with open(self.manifest_path, 'rb') as f:
+            f.seek(self._hashed)
+            while self._hashed < offset:
+                chunk = f.read(min(PROGRESS_HASH_CHUNK, offset - self._hashed))
+                if not chunk:
+                    break
+                self._hasher.update(chunk)
+                self._hashed += len(chunk)
+        return self._hasher.hexdigest()
+
+    def commit(self, offset: int, rows: int):
+        """记录进度（加锁原子写入，中途被杀也不会留下半截文件）"""
+        self.offset, self.rows = offset, rows
+        write_json(self.path, {'offset': offset, 'rows': rows,
+                               'size': os.path.getsize(self.manifest_path),
+                               'prefix_sha1': self._prefix_digest(offset),
+                               'updated_at': int(time.time())})
+
+    def reset(self):
+        """丢弃进度，从头读取"""
+        self.offset, self.rows = 0, 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
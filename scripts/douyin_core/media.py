@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+媒体处理器
+每种媒体（图文 / 视频）一个处理器，负责：
+- check    启动浏览器前的校验与预处理（整批一次完成）
+- prepare  打开发布页并开始上传素材
+- compose  等待上传/处理完成，填写全部信息（不点击发布）
+发布流程只和处理器接口打交道，新增媒体类型只需注册新的处理器
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from playwright.sync_api import Page
+
+from .media_probe import ProbeCache, probe_batch
+from .screenshots import take_screenshot
+from .bandwidth import format_upload_stats, get_bandwidth_manager
+from .checks import check_images, validate_video
+from .session import random_delay
+from .steps import open_publish_page, fill_title, add_topics, set_visibility, simulate_human, find_first_visible
+
+IMAGE_UPLOAD_SELECTORS = [
+    'input[type="file"]',
+    'button:has-text("上传"), button:has-text("选择图片")',
+    '[class*="upload"], [class*="Upload"]',
+    'div[role="button"]:has-text("图片")'
+]
+IMAGE_UPLOAD_TRIGGER = 'button:has-text("上传"), button:has-text("选择图片"), [class*="upload-btn"]'
+
+VIDEO_UPLOAD_SELECTORS = [
+    'input[type="file"][accept*="video"]',
+    'input[type="file"]',
+    'button:has-text("上传视频"), button:has-text("选择视频")',
+    '[class*="upload"], [class*="Upload"]'
+]
+VIDEO_UPLOAD_TRIGGER = 'button:has-text("上传视频"), button:has-text("选择视频"), [class*="upload-btn"]'
+
+VIDEO_TAB_SELECTORS = [
+    'button:has-text("视频"), tab:has-text("视频")',
+    '[role="tab"]:has-text("视频")',
+    '[class*="video-tab"], [class*="VideoTab"]'
+]
+
+# 图片上传后至少等待的秒数（流水线模式下从开始上传算起）
+IMAGE_UPLOAD_WAIT_S = 5.0
+
+
+# ============ 通用 ============
+def upload_files(page: Page, config: dict, files, selectors: List[str], trigger_selector: str) -> bool:
+    """找到文件输入框并选择文件（上传本身在页面后台进行）"""
+    file_input = find_first_visible(page, selectors, timeout_ms=3000, verbose=True)
+
+    if file_input is not None and file_input.input_enabled():
+        file_input.set_input_files(files)
+        return True
+
+    # 尝试点击上传按钮触发文件输入框
+    try:
+        upload_btn = page.locator(trigger_selector).first
+        if upload_btn.is_visible(timeout=5000):
+            upload_btn.click()
+            random_delay(500, 1000)
+            file_input = page.locator('input[type="file"]').first
+            if file_input.is_visible(timeout=5000):
+                file_input.set_input_files(files)
+                return True
+    except Exception as e:
+        print(f"❌ 上传失败：{e}")
+
+    print("❌ 未找到上传入口")
+    if config['behavior'].get('screenshot_on_error', True):
+        take_screenshot(page, "upload_failed")
+    return False
+
+
+# ============ 图文 ============
+def upload_images(page: Page, config: dict, images: List[str]) -> bool:
+    """选择图片开始上传"""
+    print("🖼️  上传图文...")
+    if not upload_files(page, config, images, IMAGE_UPLOAD_SELECTORS, IMAGE_UPLOAD_TRIGGER):
+        return False
+    print(f"✅ 已上传 {len(images)} 张图片")
+    return True
+
+
+# ============ 视频 ============
+def switch_to_video_tab(page: Page, config: dict):
+    """切换到视频发布模式"""
+    print("🎬 切换到视频发布模式...")
+    video_tab = find_first_visible(page, VIDEO_TAB_SELECTORS, timeout_ms=3000, verbose=True)
+    if video_tab is not None:
+        video_tab.click()
+        random_delay(config['behavior'].get('min_delay_ms', 800), config['behavior'].get('max_delay_ms', 3000))
+        print("✅ 已切换到视频发布")
+
+
+def upload_video(page: Page, config: dict, video_path: str) -> bool:
+    """选择视频文件开始上传"""
+    print("📹 上传视频...")
+    if not upload_files(page, config, video_path, VIDEO_UPLOAD_SELECTORS, VIDEO_UPLOAD_TRIGGER):
+        return False
+    print(f"✅ 视频已上传：{os.path.basename(video_path)}")
+    return True
+
+
+def wait_video_processing(page: Page, timeout_ms: int = 40000, lease=None) -> float:
+    """轮询等待视频预览出现，返回实际等待秒数（lease：上传限速份额，等待期间按新份额调整）"""
+    print("⏳ 等待视频处理...")
+    processing_started = time.time()
+    deadline = processing_started + timeout_ms / 1000
+    tick_ms = 2000 if lease is not None else timeout_ms
+    video_preview = page.locator('video, [class*="video-preview"], [class*="VideoPreview"]').first
+    while True:
+        if lease is not None:
+            lease.apply()
+        remaining_ms = (deadline - time.time()) * 1000
+        try:
+            video_preview.wait_for(state='visible', timeout=max(1, min(tick_ms, remaining_ms)))
+            print(f"✅ 视频处理完成（{time.time() - processing_started:.1f}s）")
+            break
+        except Exception:
+            if time.time() >= deadline:
+                print("⚠️  视频可能还在处理中")
+                break
+    return time.time() - processing_started
+
+
+def set_cover(page: Page, config: dict, cover_path: Optional[str]):
+    """上传自定义封面"""
+    if not cover_path or not config['video'].get('allow_cover_custom', True):
+        return
+    print("🖼️  设置自定义封面...")
+    try:
+        cover_btn = page.locator('button:has-text("封面"), [class*="cover"], [class*="Cover"]').first
+        if not cover_btn.is_visible(timeout=5000):
+            return
+        cover_btn.click()
+        random_delay(500, 1000)
+
+        cover_upload = page.locator('button:has-text("上传封面"), input[type="file"][accept*="image"]').first
+        if cover_upload.is_visible(timeout=5000):
+            if cover_upload.input_enabled():
+                cover_upload.set_input_files(cover_path)
+            else:
+                cover_upload.click()
+                random_delay(500, 1000)
+                cover_input = page.locator('input[type="file"]').first
+                if cover_input.is_visible(timeout=3000):
+                    cover_input.set_input_files(cover_path)
+            print(f"✅ 封面已上传：{os.path.basename(cover_path)}")
+
+        random_delay(1000, 2000)
+        confirm_cover = page.locator('button:has-text("确定"), button:has-text("确认")').first
+        if confirm_cover.is_visible(timeout=3000):
+            confirm_cover.click()
+            print("✅ 封面已确认")
+    except Exception as e:
+        print(f"⚠️  封面设置失败：{e}")
+
+
+def add_bgm(page: Page, config: dict, bgm_title: Optional[str]):
+    """搜索并添加背景音乐（选第一首结果）"""
+    if not bgm_title or not config['video'].get('allow_bgm', True):
+        return
+    print("🎵 添加背景音乐...")
+    try:
+        music_btn = page.locator('button:has-text("添加音乐"), button:has-text("选择音乐"), [class*="music"]').first
+        if not music_btn.is_visible(timeout=5000):
+            return
+        music_btn.click()
+        random_delay(1000, 2000)
+
+        music_search = page.locator('input[placeholder*="搜索音乐"], input[placeholder*="搜索歌曲"]').first
+        if music_search.is_visible(timeout=3000):
+            music_search.click()
+            random_delay(500, 1000)
+            music_search.type(bgm_title)
+            time.sleep(1)
+
+            music_result = page.locator('[class*="music-item"], [class*="song-item"]').first
+            if music_result.is_visible(timeout=3000):
+                music_result.click()
+                print(f"✅ BGM 已添加：{bgm_title}")
+
+            close_btn = page.locator('button:has-text("关闭"), [class*="close"]').first
+            if close_btn.is_visible(timeout=3000):
+                close_btn.click()
+    except Exception as e:
+        print(f"⚠️  BGM 添加失败：{e}")
+
+
+# ============ 处理器 ============
+class MediaHandler:
+    """媒体处理器基类"""
+
+    kind = ''
+    # 点击发布后至少等待多久再检测结果
+    confirm_delay_s = 5.0
+    # 流水线中何时开始准备下一帖（见 pipeline_executor.run_pipeline）
+    prefetch_after = 'submit'
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    def check(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """校验 / 预处理整批任务，返回可发布的任务副本"""
+        raise NotImplementedError
+
+    def open_page(self, page: Page) -> bool:
+        """打开对应的发布页"""
+        return open_publish_page(page, self.config)
+
+    def upload(self, page: Page, job: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def prepare(self, page: Page, job: Dict[str, Any]) -> bool:
+        """打开发布页并开始上传"""
+        return self.open_page(page) and self.upload(page, job)
+
+    def start_upload(self, page: Page, job: Dict[str, Any], paths: List[str]):
+        """选择文件前领取上传带宽份额（见 douyin_core.bandwidth），记在 job['_upload_lease']"""
+        job['_upload_lease'] = get_bandwidth_manager(self.config).start(page, job, paths)
+        return job['_upload_lease']
+
+    @staticmethod
+    def finish_upload(job: Dict[str, Any]):
+        """
+        上传完成：释放份额，吞吐统计记在 job['_upload']（随结果输出）；
+        挂了网络指标时上传完成时间取最后一个上传请求的结束时间，否则以此刻估算
+        """
+        lease = job.pop('_upload_lease', None)
+        if lease is not None:
+            metrics = job.get('_network')
+            completed_at = metrics.wait_upload_completed(lease.page, lease.started_at) if metrics is not None else None
+            job['_upload'] = lease.finish(completed_at)
+            print(f"📶 上传 {format_upload_stats(job['_upload'])}")
+
+    def compose(self, page: Page, job: Dict[str, Any]) -> bool:
+        """等待上传完成并填写信息（不点击发布）"""
+        raise NotImplementedError
+
+
+class ImageHandler(MediaHandler):
+    """图文"""
+
+    kind = 'image'
+
+    def check(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ready = []
+        for job in jobs:
+            images = check_images(job.get('images', []), self.config)
+            if images is None:
+                print(f"❌ {job.get('title', '无标题')}：图片校验失败")
+                continue
+            ready.append(dict(job, images=images))
+        return ready
+
+    def upload(self, page: Page, job: Dict[str, Any]) -> bool:
+        self.start_upload(page, job, job['images'])
+        if not upload_images(page, self.config, job['images']):
+            return False
+        job['_uploaded_at'] = time.time()
+        return True
+
+    def compose(self, page: Page, job: Dict[str, Any]) -> bool:
+        # 流水线模式下上传早已开始，只补足剩余时间
+        print("⏳ 等待上传完成...")
+        upload_wait = IMAGE_UPLOAD_WAIT_S
+        if job.get('_uploaded_at') is not None:
+            upload_wait = max(0.0, upload_wait - (time.time() - job['_uploaded_at']))
+        lease = job.get('_upload_lease')
+        if lease is not None:
+            lease.wait(upload_wait)
+        else:
+            time.sleep(upload_wait)
+        self.finish_upload(job)
+
+        fill_title(page, self.config, job.get('title') or '')
+        random_delay(500, 1000)
+        add_topics(page, self.config, job.get('topics'))
+        set_visibility(page, self.config, job.get('visible', 'public'))
+        simulate_human(page, self.config)
+        return True
+
+
+class VideoHandler(MediaHandler):
+    """视频"""
+
+    kind = 'video'
+    confirm_delay_s = 8.0
+    # 下一条视频在当前视频上传后即开始上传，与平台处理等待重叠
+    prefetch_after = 'prepare'
+
+    def check(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并行探测校验、生成封面、预处理"""
+        config = self.config
+        cache = ProbeCache(config['video'].get('probe_cache_file'))
+        if len(jobs) > 1:
+            print(f"🔍 并行探测 {len(jobs)} 个视频...")
+            probe_batch([job.get('video', '') for job in jobs], config, cache)
+
+        ready = []
+        for job in jobs:
+            valid, message = validate_video(job.get('video', ''), config, cache)
+            if not valid:
+                print(f"❌ {job.get('title', '无标题')}：{message}")
+                continue
+            ready.append(dict(job))
+        if not ready:
+            return ready
+
+        if config['video'].get('auto_cover', {}).get('enable', False):
+            need_cover = [job['video'] for job in ready if not job.get('cover')]
+            if need_cover:
+                from .cover_gen import generate_covers
+                print(f"🖼️  生成 {len(need_cover)} 个封面...")
+                covers = generate_covers(need_cover, config)
+                for job in ready:
+                    if not job.get('cover'):
+                        job['cover'] = covers.get(job['video'])
+
+        # 预处理结果按内容哈希缓存，重试时直接命中
+        if config['video'].get('prep', {}).get('enable', False):
+            from .video_prep import prepare_batch, print_prep_report
+            print(f"🎞️  预处理 {len(ready)} 个视频...")
+            reports = prepare_batch([job['video'] for job in ready], config)
+            for job in ready:
+                report = reports[job['video']]
+                print_prep_report(report)
+                job['video'] = report['output']
+
+        return ready
+
+    def open_page(self, page: Page) -> bool:
+        if not open_publish_page(page, self.config):
+            return False
+        switch_to_video_tab(page, self.config)
+        return True
+
+    def upload(self, page: Page, job: Dict[str, Any]) -> bool:
+        self.start_upload(page, job, [job['video']])
+        return upload_video(page, self.config, job['video'])
+
+    def compose(self, page: Page, job: Dict[str, Any]) -> bool:
+        wait_video_processing(page, lease=job.get('_upload_lease'))
+        self.finish_upload(job)
+        set_cover(page, self.config, job.get('cover'))
+        fill_title(page, self.config, job.get('title') or '')
+        random_delay(500, 1000)
+        add_topics(page, self.config, job.get('topics'))
+        add_bgm(page, self.config, job.get('bgm'))
+        set_visibility(page, self.config, job.get('visible', 'public'))
+        simulate_human(page, self.config)
+        return True
+
+
+HANDLERS = {
+    'image': ImageHandler,
+    'video': VideoHandler
+}
+
+
+def get_handler(config: dict, kind: str) -> MediaHandler:
+    """按媒体类型创建处理器"""
+    if kind not in HANDLERS:
+        raise ValueError(f"不支持的媒体类型：{kind}（支持：{', '.join(HANDLERS)}）")
+    return HANDLERS[kind](config)
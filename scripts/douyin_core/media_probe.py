@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+视频元数据探测
+优先使用 ffprobe，缺失时回退到纯 Python 的 MP4/MOV box 解析；
+结果按 路径 + 大小 + mtime 缓存到磁盘，支持批量并行探测
+"""
+
+import argparse
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .config import PROJECT_DIR
+from .storage import write_json
+
+DEFAULT_CACHE_FILE = '.cache/media_probe.json'
+
+# MP4 sample entry fourcc -> ffprobe 风格的编码名
+FOURCC_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264',
+    'hvc1': 'hevc', 'hev1': 'hevc',
+    'vp08': 'vp8', 'vp09': 'vp9', 'av01': 'av1',
+    'mp4v': 'mpeg4', 'jpeg': 'mjpeg', 'apcn': 'prores', 'apch': 'prores',
+    'mp4a': 'aac', 'ac-3': 'ac3', 'ec-3': 'eac3', 'Opus': 'opus',
+    '.mp3': 'mp3', 'lpcm': 'pcm', 'sowt': 'pcm', 'twos': 'pcm',
+}
+
+# 需要递归进入的容器 box
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts'}
+
+
+def resolve_cache_file(cache_file: Optional[str] = None) -> str:
+    """缓存文件路径（相对路径以项目根目录为基准）"""
+    cache_file = cache_file or DEFAULT_CACHE_FILE
+    if not os.path.isabs(cache_file):
+        cache_file = str(PROJECT_DIR / cache_file)
+    return cache_file
+
+
+class ProbeCache:
+    """探测结果磁盘缓存，键为 绝对路径|大小|mtime_ns"""
+
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = resolve_cache_file(cache_file)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    @staticmethod
+    def key_for(path: str) -> str:
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def get(self, path: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(self.key_for(path))
+
+    def put(self, path: str, info: dict):
+        key = self.key_for(path)
+        prefix = key.rsplit('|', 2)[0] + '|'
+        with self._lock:
+            # 同一路径的旧版本直接淘汰，避免缓存无限增长
+            for stale in [k for k in self._entries if k.startswith(prefix) and k != key]:
+                del self._entries[stale]
+            self._entries[key] = info
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            write_json(self.cache_file, self._entries)
+            self._dirty = False
+
+
+# ============ ffprobe ============
+def probe_with_ffprobe(path: str, ffprobe_bin: str = 'ffprobe', timeout_s: int = 30) -> Optional[dict]:
+    """调用 ffprobe 读取时长、分辨率、编码与码率"""
+    if not shutil.which(ffprobe_bin):
+        return None
+
+    cmd = [ffprobe_bin, '-v', 'error', '-print_format', 'json',
+           '-show_format', '-show_streams', path]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=timeout_s, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+
+    try:
+        data = json.loads(proc.stdout.decode('utf-8', errors='replace'))
+    except ValueError:
+        return None
+
+    fmt = data.get('format', {})
+    info = _empty_info(path, 'ffprobe')
+    info['format'] = fmt.get('format_name')
+    info['duration_s'] = _to_float(fmt.get('duration'))
+    bit_rate = _to_float(fmt.get('bit_rate'))
+    if bit_rate:
+        info['bitrate_kbps'] = round(bit_rate / 1000, 1)
+
+    for stream in data.get('streams', []):
+        codec_type = stream.get('codec_type')
+        if codec_type == 'video' and info['video_codec'] is None:
+            if stream.get('disposition', {}).get('attached_pic'):
+                continue
+            info['video_codec'] = stream.get('codec_name')
+            info['width'] = stream.get('width')
+            info['height'] = stream.get('height')
+            info['fps'] = _parse_rate(stream.get('avg_frame_rate'))
+            if info['duration_s'] is None:
+                info['duration_s'] = _to_float(stream.get('duration'))
+        elif codec_type == 'audio' and info['audio_codec'] is None:
+            info['audio_codec'] = stream.get('codec_name')
+
+    return _finalize(info)
+
+
+# ============ MP4/MOV box 解析 ============
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None):
+    """遍历内存中的 box，产出 (类型, 载荷起点, 载荷终点)"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _read_top_level_boxes(f, file_size: int):
+    """只读取顶层 box 头，跳过 mdat 等大块数据"""
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header[:8])
+        header_len = 8
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_len = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_len:
+            return
+        yield box_type, pos, header_len, size
+        pos += size
+
+
+def _parse_trak(data: bytes, start: int, end: int) -> dict:
+    track = {'handler': None, 'codec': None, 'width': None, 'height': None,
+             'duration': None, 'timescale': None}
+
+    def walk(s: int, e: int):
+        for box_type, ps, pe in _iter_boxes(data, s, e):
+            if box_type in CONTAINER_BOXES:
+                walk(ps, pe)
+            elif box_type == b'tkhd':
+                # 宽高位于 box 末尾 8 字节（16.16 定点数）
+                width, height = struct.unpack('>II', data[pe - 8:pe])
+                track['width'] = width >> 16
+                track['height'] = height >> 16
+            elif box_type == b'mdhd':
+                version = data[ps]
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', data[ps + 20:ps + 32])
+                else:
+                    timescale, duration = struct.unpack('>II', data[ps + 12:ps + 20])
+                track['timescale'] = timescale
+                track['duration'] = duration
+            elif box_type == b'hdlr':
+                track['handler'] = data[ps + 8:ps + 12].decode('latin-1')
+            elif box_type == b'stsd':
+                if pe - ps >= 16:
+                    fourcc = data[ps + 12:ps + 16].decode('latin-1')
+                    track['codec'] = FOURCC_CODECS.get(fourcc, fourcc.strip())
+
+    walk(start, end)
+    return track
+
+
+def probe_mp4_boxes(path: str) -> Optional[dict]:
+    """纯 Python 解析 MP4/MOV（ISO BMFF）的 moov 元数据"""
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            moov = None
+            moov_offset = mdat_offset = None
+            major_brand = None
+            for box_type, offset, header_len, size in _read_top_level_boxes(f, file_size):
+                if box_type == b'ftyp':
+                    f.seek(offset + header_len)
+                    major_brand = f.read(4).decode('latin-1').strip()
+                elif box_type == b'moov':
+                    moov_offset = offset
+                    f.seek(offset + header_len)
+                    moov = f.read(size - header_len)
+                elif box_type == b'mdat' and mdat_offset is None:
+                    mdat_offset = offset
+    except (OSError, struct.error):
+        return None
+
+    if not moov:
+        return None
+
+    info = _empty_info(path, 'mp4box')
+    info['format'] = major_brand
+    info['faststart'] = (mdat_offset is None or (moov_offset is not None and moov_offset < mdat_offset))
+
+    try:
+        for box_type, ps, pe in _iter_boxes(moov):
+            if box_type == b'mvhd':
+                version = moov[ps]
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', moov[ps + 20:ps + 32])
+                else:
+                    timescale, duration = struct.unpack('>II', moov[ps + 12:ps + 20])
+                if timescale:
+                    info['duration_s'] = round(duration / timescale, 3)
+            elif box_type == b'trak':
+                track = _parse_trak(moov, ps, pe)
+                if track['handler'] == 'vide' and info['video_codec'] is None:
+                    info['video_codec'] = track['codec']
+                    info['width'] = track['width']
+                    info['height'] = track['height']
+                    if info['duration_s'] is None and track['timescale']:
+                        info['duration_s'] = round(track['duration'] / track['timescale'], 3)
+                elif track['handler'] == 'soun' and info['audio_codec'] is None:
+                    info['audio_codec'] = track['codec']
+    except (struct.error, IndexError):
+        return None
+
+    return _finalize(info)
+
+
+# ============ 对外接口 ============
+def probe_video(path: str, config: Optional[dict] = None, cache: Optional[ProbeCache] = None) -> Optional[dict]:
+    """
+    探测单个视频的元数据（带缓存）
+
+    Args:
+        path: 视频路径
+        config: 完整配置（读取 video.ffprobe_bin）
+        cache: 探测缓存，None 时不使用缓存
+
+    Returns:
+        元数据字典；两种方式都无法解析时返回 None
+    """
+    if cache is not None:
+        cached = cache.get(path)
+        if cached is not None:
+            return cached
+
+    video_config = (config or {}).get('video', {})
+    ffprobe_bin = video_config.get('ffprobe_bin', 'ffprobe')
+
+    info = probe_with_ffprobe(path, ffprobe_bin)
+    if info is None:
+        info = probe_mp4_boxes(path)
+    elif info.get('faststart') is None:
+        # ffprobe 不报告 moov 位置，补一次轻量的顶层 box 扫描
+        box_info = probe_mp4_boxes(path)
+        if box_info:
+            info['faststart'] = box_info['faststart']
+
+    if info is not None and cache is not None:
+        cache.put(path, info)
+    return info
+
+
+def probe_batch(paths: List[str], config: Optional[dict] = None,
+                cache: Optional[ProbeCache] = None, max_workers: Optional[int] = None) -> Dict[str, Optional[dict]]:
+    """
+    并行探测一批视频（在启动浏览器前调用）
+
+    Returns:
+        {路径: 元数据或 None}
+    """
+    video_config = (config or {}).get('video', {})
+    if cache is None:
+        cache = ProbeCache(video_config.get('probe_cache_file'))
+    max_workers = max_workers or video_config.get('probe_workers', 4)
+
+    unique_paths = list(dict.fromkeys(p for p in paths if os.path.exists(p)))
+    results: Dict[str, Optional[dict]] = {p: None for p in paths}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for path, info in zip(unique_paths, executor.map(lambda p: probe_video(p, config, cache), unique_paths)):
+            results[path] = info
+
+    cache.save()
+    return results
+
+
+def check_video_info(info: dict, config: dict) -> tuple:
+    """按配置检查探测结果（时长 / 编码 / 分辨率）"""
+    video_config = config.get('video', {})
+
+    max_duration = video_config.get('max_duration_s')
+    duration = info.get('duration_s')
+    if max_duration and duration and duration > max_duration:
+        return False, f"视频时长过长：{duration:.1f}s（最大：{max_duration}s）"
+
+    min_duration = video_config.get('min_duration_s')
+    if min_duration and duration is not None and duration < min_duration:
+        return False, f"视频时长过短：{duration:.1f}s（最小：{min_duration}s）"
+
+    codecs = video_config.get('supported_codecs')
+    codec = info.get('video_codec')
+    if codecs and codec and codec not in codecs:
+        return False, f"不支持的视频编码：{codec}（支持：{', '.join(codecs)}）"
+
+    if info.get('video_codec') is None:
+        return False, "未检测到视频轨道"
+
+    min_side = video_config.get('min_resolution')
+    width, height = info.get('width'), info.get('height')
+    if min_side and width and height and min(width, height) < min_side:
+        return False, f"视频分辨率过低：{width}x{height}（短边至少 {min_side}px）"
+
+    return True, "验证通过"
+
+
+def _empty_info(path: str, source: str) -> dict:
+    return {
+        'path': os.path.abspath(path),
+        'size_bytes': os.path.getsize(path),
+        'source': source,
+        'format': None,
+        'duration_s': None,
+        'width': None,
+        'height': None,
+        'fps': None,
+        'video_codec': None,
+        'audio_codec': None,
+        'bitrate_kbps': None,
+        'faststart': None,
+    }
+
+
+def _finalize(info: dict) -> dict:
+    if info['bitrate_kbps'] is None and info['duration_s']:
+        info['bitrate_kbps'] = round(info['size_bytes'] * 8 / info['duration_s'] / 1000, 1)
+    return info
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return round(float(value), 3)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rate(rate: Optional[str]) -> Optional[float]:
+    if not rate or '/' not in rate:
+        return _to_float(rate)
+    num, den = rate.split('/', 1)
+    try:
+        return round(float(num) / float(den), 3) if float(den) else None
+    except ValueError:
+        return None
+
+
+def main():
+    """命令行：探测视频并输出 JSON"""
+    parser = argparse.ArgumentParser(description='视频元数据探测（ffprobe / MP4 box 解析）')
+    parser.add_argument('videos', nargs='+', help='视频文件路径')
+    parser.add_argument('--workers', type=int, default=4, help='并行探测数')
+    parser.add_argument('--no-cache', action='store_true', help='不读写磁盘缓存')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ProbeCache()
+    if cache is None:
+        results = {p: probe_video(p) for p in args.videos}
+    else:
+        results = probe_batch(args.videos, cache=cache, max_workers=args.workers)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    sys.exit(0 if all(results.values()) else 1)
+
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+内存看门狗
+长时间批量发布 / 定时守护运行时，每条任务结束后采样本进程和浏览器子进程（Chromium、Playwright 驱动）的 RSS，
+写入任务结果的 'memory'；超过阈值时在任务之间回收浏览器上下文（见 publish._publish_ready），
+避免页面、上下文、截图缓冲泄漏把小内存机器拖到 OOM
+
+按需 tracemalloc：memory.tracemalloc 开启时启动即记录基线；运行中 kill -USR1 <pid>
+会在下一条任务结束时把与基线的差异（分配最多的代码行）写入 memory.snapshot_dir，
+未开启时第一次 USR1 开始记录基线，第二次输出差异；信号处理只能在主线程安装，
+看门狗在工作线程中创建时（多账号宿主）由入口在主线程调用 install_signal_handler（BrowserHost.start 已调用）
+
+RSS 通过 Linux /proc 读取，其他系统只有本进程的峰值 RSS
+"""
+
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MEMORY_CONFIG = {
+    "enable": True,
+    "python_rss_mb": 1024,
+    "browser_rss_mb": 1536,
+    "recycle_every": 0,
+    "tracemalloc": False,
+    "tracemalloc_frames": 10,
+    "snapshot_dir": "traces/memory",
+    "snapshot_top": 25
+}
+
+
+def get_memory_config(config: dict) -> dict:
+    """读取 memory 配置（补齐默认值）"""
+    memory_config = dict(DEFAULT_MEMORY_CONFIG)
+    memory_config.update(config.get('memory', {}))
+    return memory_config
+
+
+def _page_mb(pages: int) -> float:
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1)
+
+
+def _read_proc_table():
+    """/proc 中所有进程的 (父进程表, RSS 页数表)"""
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # comm 字段可能含空格，从最后一个 ')' 之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{entry}/statm', 'r') as f:
+                rss_pages[int(entry)] = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children, rss_pages
+
+
+def process_tree_rss_mb(root_pids: List[int], include_roots: bool = True) -> Optional[float]:
+    """进程及其全部子进程的 RSS 之和（MB，Linux /proc）；无法读取时返回 None"""
+    if not root_pids or not os.path.isdir('/proc'):
+        return None
+    children, rss_pages = _read_proc_table()
+    total, seen = 0, set()
+    stack = list(root_pids) if include_roots else [c for pid in root_pids for c in children.get(pid, [])]
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return _page_mb(total)
+
+
+def find_pids_by_arg(fragment: str) -> List[int]:
+    """命令行包含 fragment 的进程（Linux /proc；其他系统返回空列表）"""
+    pids = []
+    if not os.path.isdir('/proc'):
+        return pids
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                if fragment.encode() in f.read():
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return pids
+
+
+def python_rss_mb() -> Optional[float]:
+    """本进程当前 RSS（MB）；没有 /proc 时退回峰值 RSS"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return _page_mb(int(f.read().split()[1]))
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KB
+        return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+    except (ImportError, OSError):
+        return None
+
+
+class MemoryWatchdog:
+    """采样内存、判断是否需要回收浏览器，按需输出 tracemalloc 差异"""
+
+    def __init__(self, config: dict):
+        self.settings = get_memory_config(config)
+        self.enabled = bool(self.settings['enable'])
+        self.jobs_since_recycle = 0
+        self.recycles = 0
+        self.peak: Dict[str, float] = {'python_rss_mb': 0.0, 'browser_rss_mb': 0.0}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_requested = threading.Event()
+
+        if self.enabled and self.settings['tracemalloc']:
+            self._start_tracemalloc()
+        _watchdogs.add(self)
+        if self.enabled and not install_signal_handler(config) and hasattr(signal, 'SIGUSR1'):
+            _warn_signal_unavailable()
+
+    def _start_tracemalloc(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings['tracemalloc_frames'])
+        self._baseline = tracemalloc.take_snapshot()
+
+    def request_snapshot(self):
+        """请求在下一条任务结束时输出 tracemalloc 差异（信号处理函数中调用，只设标记）"""
+        self._snapshot_requested.set()
+
+    def sample(self) -> Dict[str, Any]:
+        """采样本进程 RSS 和浏览器子进程树 RSS（MB）"""
+        stats = {
+            'python_rss_mb': python_rss_mb(),
+            'browser_rss_mb': process_tree_rss_mb([os.getpid()], include_roots=False)
+        }
+        if tracemalloc.is_tracing():
+            stats['traced_mb'] = round(tracemalloc.get_traced_memory()[0] / 1024 / 1024, 1)
+        for key in self.peak:
+            if stats[key] is not None:
+                self.peak[key] = max(self.peak[key], stats[key])
+        return stats
+
+    def after_job(self) -> Dict[str, Any]:
+        """
+        任务结束后调用：采样、按需输出 tracemalloc 差异、判断是否回收
+        （多账号宿主的工作线程共用一个看门狗，回收判断只看返回值，不在实例上留状态）
+
+        Returns:
+            写入任务结果的内存统计；需要回收时带 'recycle' 原因
+        """
+        if not self.enabled:
+            return {}
+        stats = self.sample()
+        self.jobs_since_recycle += 1
+
+        if self._snapshot_requested.is_set():
+            self._snapshot_requested.clear()
+            path = self.snapshot_diff()
+            if path:
+                stats['snapshot'] = path
+
+        settings = self.settings
+        reason = None
+        python_rss, browser_rss = stats['python_rss_mb'], stats['browser_rss_mb']
+        if settings['browser_rss_mb'] and browser_rss is not None and browser_rss > settings['browser_rss_mb']:
+            reason = f"浏览器 RSS {browser_rss}MB 超过 {settings['browser_rss_mb']}MB"
+        elif settings['python_rss_mb'] and python_rss is not None and python_rss > settings['python_rss_mb']:
+            # 先 gc，仍超限再回收浏览器，释放驱动连接上积压的页面 / 截图等对象
+            gc.collect()
+            python_rss = stats['python_rss_mb'] = python_rss_mb()
+            if python_rss is not None and python_rss > settings['python_rss_mb']:
+                reason = f"Python RSS {python_rss}MB 超过 {settings['python_rss_mb']}MB"
+        if reason is None and settings['recycle_every'] and self.jobs_since_recycle >= settings['recycle_every']:
+            reason = f"已连续发布 {self.jobs_since_recycle} 条"
+        if reason:
+            stats['recycle'] = reason
+        return stats
+
+    def recycled(self, reason: str):
+        """调用方完成回收后调用（计数清零）"""
+        self.jobs_since_recycle = 0
+        self.recycles += 1
+        print(f"♻️  回收浏览器上下文：{reason}")
+
+    def snapshot_diff(self) -> Optional[str]:
+        """写出当前与基线的 tracemalloc 差异，返回文件路径；尚未开始记录时开始记录并返回 None"""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            self._start_tracemalloc()
+            print("🔬 tracemalloc 已开始记录，再次请求时输出差异")
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        top = snapshot.compare_to(self._baseline, 'lineno')[:self.settings['snapshot_top']]
+
+        snapshot_dir = self.settings['snapshot_dir']
+        os.makedirs(snapshot_dir, exist_ok=True)
+        path = os.path.join(snapshot_dir, f"tracemalloc_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        current, peak = tracemalloc.get_traced_memory()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# {time.strftime('%Y-%m-%d %H:%M:%S')} traced={current / 1024 / 1024:.1f}MB"
+                    f" peak={peak / 1024 / 1024:.1f}MB\n")
+            for stat in top:
+                f.write(f"{stat}\n")
+        print(f"🔬 tracemalloc 差异已保存：{path}")
+        return path
+
+
+_watchdog: Optional[MemoryWatchdog] = None
+_watchdog_lock = threading.Lock()
+_watchdogs: 'weakref.WeakSet' = weakref.WeakSet()
+_signal_installed = False
+_signal_warned = False
+
+
+def _on_usr1(signum, frame):
+    # 信号处理函数中只设标记，差异在下一条任务结束时输出
+    for watchdog in list(_watchdogs):
+        watchdog.request_snapshot()
+
+
+def install_signal_handler(config: dict) -> bool:
+    """
+    安装 SIGUSR1 处理：请求进程内所有看门狗在下一条任务结束时输出 tracemalloc 差异
+    只能在主线程安装；memory.enable 关闭、Windows（没有 SIGUSR1）或不在主线程时返回 False（已安装过返回 True）
+    """
+    global _signal_installed
+    if _signal_installed:
+        return True
+    if not get_memory_config(config)['enable'] or not hasattr(signal, 'SIGUSR1') \
+            or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGUSR1, _on_usr1)
+    _signal_installed = True
+    return True
+
+
+def _warn_signal_unavailable():
+    global _signal_warned
+    if not _signal_warned:
+        _signal_warned = True
+        print("⚠️  看门狗不在主线程创建，kill -USR1 不可用（入口需在主线程调用 install_signal_handler）")
+
+
+def get_watchdog(config: dict) -> MemoryWatchdog:
+    """进程内共享的看门狗（守护进程多批发布之间累计回收计数和峰值）"""
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = MemoryWatchdog(config)
+        return _watchdog
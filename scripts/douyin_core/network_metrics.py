@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+每条发布的网络指标
+每个发布页开一个 CDP 会话订阅 Network 事件，按 URL 类别汇总请求数、下行 / 上行字节、
+首字节时间（TTFB）和请求体发送耗时（上传），结果写入任务结果的 'network'，
+失败保存的 trace.zip 中也附带一份 network.json，用来找出发布流程中的 I/O 热点
+
+类别按顺序判定：页面文档记为 document → network.categories 中的 URL 片段规则 → 非抖音域名记为 third_party →
+大请求体的 POST / PUT 记为 upload → 资源类型（static / media）→ other
+"""
+
+import json
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# (类别, URL 片段)，先匹配先得
+DEFAULT_CATEGORIES = [
+    ['upload', ['tos-', '.tos.', 'vod.', 'imagex', 'UploadInner', '/upload/v1/']],
+    ['api', ['/web/api/', '/aweme/', '/janus/', '/passport/']],
+    ['telemetry', ['/monitor_browser', '/slardar', 'mcs.', '/collect', 'log-sdk', '/webid']]
+]
+
+# 抖音 / 字节系域名，其余记为第三方
+FIRST_PARTY_DOMAINS = ('douyin.com', 'douyinpic.com', 'douyinstatic.com', 'douyinvod.com', 'bytedance.com',
+                       'byteimg.com', 'bytescm.com', 'snssdk.com', 'zjcdn.com', 'bytetos.com', 'pstatp.com',
+                       'amemv.com', 'ibytedtos.com', 'volces.com')
+
+RESOURCE_CATEGORIES = {
+    'Script': 'static', 'Stylesheet': 'static', 'Font': 'static',
+    'Image': 'media', 'Media': 'media'
+}
+
+# 请求体超过这个大小的 POST / PUT 视为上传
+UPLOAD_BODY_BYTES = 256 * 1024
+
+# 上传界面已完成但仍有未结束的上传请求时，最多等待这么久
+UPLOAD_FINISH_TIMEOUT_MS = 10000
+
+
+def _is_first_party(url: str) -> bool:
+    host = urlsplit(url).hostname or ''
+    return any(host == domain or host.endswith('.' + domain) for domain in FIRST_PARTY_DOMAINS)
+
+
+def _content_length(headers: Dict[str, Any]) -> int:
+    for key, value in (headers or {}).items():
+        if key.lower() == 'content-length':
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
+class NetworkMetrics:
+    """一个页面的网络指标（CDP 事件在页面所属线程中回调）"""
+
+    def __init__(self, page, config: dict):
+        self.categories = config.get('network', {}).get('categories') or DEFAULT_CATEGORIES
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._cdp = page.context.new_cdp_session(page)
+        for event, handler in (('Network.requestWillBeSent', self._on_request),
+                               ('Network.requestWillBeSentExtraInfo', self._on_request_extra),
+                               ('Network.responseReceived', self._on_response),
+                               ('Network.loadingFinished', self._on_finished),
+                               ('Network.loadingFailed', self._on_failed)):
+            self._cdp.on(event, handler)
+        self._cdp.send('Network.enable')
+
+    def categorize(self, url: str, method: str, body_bytes: int, resource_type: str) -> str:
+        if resource_type == 'Document':
+            return 'document'
+        for category, patterns in self.categories:
+            if any(pattern in url for pattern in patterns):
+                return category
+        if url.startswith('http') and not _is_first_party(url):
+            return 'third_party'
+        if method in ('POST', 'PUT') and body_bytes >= UPLOAD_BODY_BYTES:
+            return 'upload'
+        return RESOURCE_CATEGORIES.get(resource_type, 'other')
+
+    def _entry(self, request_id: str) -> Dict[str, Any]:
+        return self._requests.setdefault(request_id, {'url': '', 'method': 'GET', 'type': '', 'bytes_out': 0,
+                                                      'bytes_in': 0, 'ttfb_ms': None, 'send_ms': None,
+                                                      'failed': False, 'wall_time': None, 'started_ts': None,
+                                                      'finished_ts': None})
+
+    def _on_request(self, event: Dict[str, Any]):
+        request = event['request']
+        with self._lock:
+            entry = self._entry(event['requestId'])
+            entry.update(url=request['url'], method=request['method'], type=event.get('type', ''))
+            # wallTime 为墙钟时间，timestamp 为单调时钟（与 loadingFinished 的 timestamp 同一基准）
+            if entry['wall_time'] is None:
+                entry.update(wall_time=event.get('wallTime'), started_ts=event.get('timestamp'))
+            body = len(request.get('postData') or '')
+            entry['bytes_out'] = max(entry['bytes_out'], body, _content_length(request.get('headers')))
+
+    def _on_request_extra(self, event: Dict[str, Any]):
+        # 实际发出的请求头（含 Content-Length，大请求体不会内联在 requestWillBeSent 中）
+        with self._lock:
+            entry = self._entry(event['requestId'])
+            entry['bytes_out'] = max(entry['bytes_out'], _content_length(event.get('headers')))
+
+    def _on_response(self, event: Dict[str, Any]):
+        timing = event['response'].get('timing')
+        if not timing:
+            return
+        with self._lock:
+            entry = self._entry(event['requestId'])
+            if timing.get('sendEnd', -1) >= 0:
+                entry['send_ms'] = max(0.0, timing['sendEnd'] - timing['sendStart'])
+                entry['ttfb_ms'] = max(0.0, timing['receiveHeadersEnd'] - timing['sendEnd'])
+
+    def _on_finished(self, event: Dict[str, Any]):
+        with self._lock:
+            entry = self._entry(event['requestId'])
+            entry['bytes_in'] = event.get('encodedDataLength', 0)
+            entry['finished_ts'] = event.get('timestamp')
+
+    def _on_failed(self, event: Dict[str, Any]):
+        with self._lock:
+            self._entry(event['requestId'])['failed'] = True
+
+    def _upload_state(self, since: float) -> Tuple[bool, List[float]]:
+        """since 之后发起的上传类请求：(是否还有未结束的, 已结束请求的完成时刻)"""
+        with self._lock:
+            requests = list(self._requests.values())
+        pending, completed = False, []
+        for item in requests:
+            if not item['url'] or item['wall_time'] is None or item['wall_time'] < since:
+                continue
+            if self.categorize(item['url'], item['method'], item['bytes_out'], item['type']) != 'upload':
+                continue
+            if item['failed']:
+                continue
+            if item['finished_ts'] is None or item['started_ts'] is None:
+                pending = True
+                continue
+            completed.append(item['wall_time'] + item['finished_ts'] - item['started_ts'])
+        return pending, completed
+
+    def upload_completed_at(self, since: float) -> Optional[float]:
+        """
+        since 之后发起的上传类请求全部结束的时刻（墙钟时间）；没有上传请求、仍有未结束的或缺少时间戳时返回 None
+        （只看已回调的 CDP 事件，需要等最新状态时用 wait_upload_completed）
+        """
+        pending, completed = self._upload_state(since)
+        return max(completed) if completed and not pending else None
+
+    def _sync(self):
+        # CDP 消息按发出顺序到达：本会话上的命令返回时，之前发出的 Network 事件都已回调
+        self._cdp.send('Runtime.evaluate', {'expression': '0', 'returnByValue': True})
+
+    def wait_upload_completed(self, page, since: float,
+                              timeout_ms: float = UPLOAD_FINISH_TIMEOUT_MS) -> Optional[float]:
+        """
+        处理完积压的 CDP 事件后返回 upload_completed_at(since)；仍有未结束的上传请求时
+        等页面的 requestfinished 事件再检查，最多 timeout_ms（超时后按 upload_completed_at 返回 None）
+        """
+        deadline = time.time() + timeout_ms / 1000
+        try:
+            while True:
+                self._sync()
+                pending, _ = self._upload_state(since)
+                remaining_ms = (deadline - time.time()) * 1000
+                if not pending or remaining_ms <= 0:
+                    break
+                page.wait_for_event('requestfinished', timeout=remaining_ms)
+        except Exception:
+            pass  # 页面已关闭或等待超时，按已收到的事件计算
+        return self.upload_completed_at(since)
+
+    def summary(self) -> Dict[str, Any]:
+        """按类别汇总：{'total': {...}, 'categories': {类别: {...}}}"""
+        with self._lock:
+            requests = list(self._requests.values())
+
+        def aggregate(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+            ttfbs = sorted(item['ttfb_ms'] for item in items if item['ttfb_ms'] is not None)
+            stats = {
+                'requests': len(items),
+                'failed': sum(item['failed'] for item in items),
+                'bytes_in': sum(item['bytes_in'] for item in items),
+                'bytes_out': sum(item['bytes_out'] for item in items)
+            }
+            if ttfbs:
+                stats['ttfb_ms_median'] = round(ttfbs[len(ttfbs) // 2], 1)
+                stats['ttfb_ms_max'] = round(ttfbs[-1], 1)
+            send_ms = [item['send_ms'] for item in items if item['send_ms'] is not None and item['bytes_out']]
+            if send_ms:
+                stats['send_ms_total'] = round(sum(send_ms), 1)
+            return stats
+
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for item in requests:
+            if not item['url']:
+                continue
+            category = self.categorize(item['url'], item['method'], item['bytes_out'], item['type'])
+            by_category.setdefault(category, []).append(item)
+        return {
+            'total': aggregate([item for items in by_category.values() for item in items]),
+            'categories': {category: aggregate(items) for category, items in sorted(by_category.items())}
+        }
+
+    def detach(self):
+        try:
+            self._cdp.detach()
+        except Exception:
+            pass
+
+
+def attach_network_metrics(page, job: Dict[str, Any], config: dict) -> Optional[NetworkMetrics]:
+    """给发布页挂上网络指标（network.enable 关闭或 CDP 不可用时返回 None），记在 job['_network']"""
+    if not config.get('network', {}).get('enable', True):
+        return None
+    try:
+        metrics = NetworkMetrics(page, config)
+    except Exception as e:
+        print(f"⚠️  网络指标不可用：{e}")
+        return None
+    job['_network'] = metrics
+    return metrics
+
+
+def add_to_trace(trace_path: str, summary: Dict[str, Any]):
+    """把网络指标作为 network.json 附加到已保存的 trace.zip（playwright show-trace 会忽略它）"""
+    try:
+        with zipfile.ZipFile(trace_path, 'a') as archive:
+            archive.writestr('network.json', json.dumps(summary, ensure_ascii=False, indent=2))
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"⚠️  网络指标写入 trace 失败：{e}")
+
+
+def format_network_summary(summary: Dict[str, Any]) -> str:
+    """网络指标的一行摘要"""
+    total = summary['total']
+    text = (f"{total['requests']} 个请求，下行 {total['bytes_in'] / 1024 / 1024:.1f}MB，"
+            f"上行 {total['bytes_out'] / 1024 / 1024:.1f}MB")
+    upload = summary['categories'].get('upload')
+    if upload and upload.get('send_ms_total'):
+        text += f"，上传请求 {upload['send_ms_total'] / 1000:.1f}s"
+    third_party = summary['categories'].get('third_party')
+    if third_party:
+        text += f"，第三方 {third_party['requests']} 个"
+    return text
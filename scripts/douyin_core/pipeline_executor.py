@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+流水线发布执行器
+在同一个浏览器上下文中用多个标签页重叠发布阶段：
+当前帖子处于发布等待（或平台处理等待）时，下一帖已在新标签页打开发布页并开始上传，
+同时遵守账号的最小发布间隔，单帖耗时由最慢阶段决定而不是各阶段之和
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 阶段函数签名：(page, job) -> bool
+#   prepare  打开发布页并开始上传素材
+#   compose  等待上传/处理完成，填写标题、话题等（不点击发布）
+#   submit   点击发布按钮
+#   confirm  检测发布结果
+STAGES = ('prepare', 'compose', 'submit', 'confirm')
+
+
+def run_pipeline(
+    context,
+    jobs: List[Dict[str, Any]],
+    stages: Dict[str, Callable],
+    min_gap_s: float = 0,
+    confirm_delay_s: float = 5,
+    prefetch_after: str = 'submit',
+    retry_times: int = 0,
+    retry_delay_s: float = 5,
+    on_error: Optional[Callable] = None,
+    label: Optional[Callable[[Dict[str, Any]], str]] = None,
+    tracer=None,
+    on_result: Optional[Callable] = None,
+    watchdog=None,
+    new_page: Optional[Callable] = None
+) -> List[Dict[str, Any]]:
+    """
+    流水线执行一批发布任务
+
+    Args:
+        context: Playwright BrowserContext（已加载 Cookie）
+        jobs: 任务列表
+        stages: {'prepare', 'compose', 'submit', 'confirm'} -> 阶段函数
+        min_gap_s: 两次点击发布之间的最小间隔（秒）
+        confirm_delay_s: 点击发布后至少等待多久再检测结果
+        prefetch_after: 何时开始准备下一帖：'prepare'（当前帖上传后，适合视频处理等待）
+                        或 'submit'（当前帖点击发布后）
+        retry_times: 未点击发布前失败时的重试次数（已点击发布的不会重试，避免重复发布）
+        retry_delay_s: 重试间隔
+        on_error: 出错回调 (page, job, exception)
+        label: 任务显示名称，默认取 job['_label']，没有时取标题
+        tracer: 可选 FailureTracer，每次尝试一个 chunk，失败才保存；tracing 开启时不预取下一帖
+                （一个上下文同一时刻只有一个 chunk，预取的页面操作会混进当前任务的 chunk），
+                每条任务的 prepare 都在自己的 chunk 内执行
+        on_result: 每个任务结束后的回调 (job, result)，用于即时记录进度
+        watchdog: 可选 MemoryWatchdog，每个任务结束后采样内存写入 result['memory']；
+                  需要回收浏览器时在任务之间提前返回已完成的结果，由调用方换新上下文发布其余任务
+        new_page: 可选的新页面工厂（如领取热备发布页），默认 context.new_page
+
+    Returns:
+        每个任务的结果 {'title', 'success', 'submitted', 'attempts', 'timings', 'wall_s'}，
+        失败时 'failed_stage' 为最后一次尝试停在的阶段，出异常时另有 'error_class' / 'error'，
+        保存了失败现场时另有 'trace'（trace.zip 路径）；
+        看门狗要求回收时结果可能少于 jobs
+    """
+    label = label or (lambda job: job.get('_label') or job.get('title', ''))
+    results = []
+    last_submit_at = None
+    next_prepared = None
+
+    new_page = new_page or context.new_page
+
+    def can_prefetch() -> bool:
+        return tracer is None or not tracer.enabled
+
+    def prepare(job):
+        page = new_page()
+        started = time.time()
+        error = None
+        try:
+            ok = stages['prepare'](page, job)
+        except Exception as e:
+            print(f"❌ {label(job)} 准备阶段出错：{e}")
+            if on_error:
+                on_error(page, job, e)
+            ok, error = False, e
+        return page, ok, time.time() - started, error
+
+    for i, job in enumerate(jobs):
+        next_job = jobs[i + 1] if i + 1 < len(jobs) else None
+        title = label(job)
+        print(f"\n{'='*50}")
+        print(f"发布 {i+1}/{len(jobs)}: {title}")
+        print(f"{'='*50}\n")
+
+        job_started = time.time()
+        current, next_prepared = next_prepared, None
+        result = {'title': title, 'success': False, 'submitted': False, 'attempts': 0, 'timings': {}}
+
+        for attempt in range(1, retry_times + 2):
+            result['attempts'] = attempt
+            if tracer is not None:
+                tracer.begin(f"{title}_{attempt}")
+            page, ok, prepare_s, error = current if current is not None else prepare(job)
+            current = None
+            timings = {'prepare': round(prepare_s, 2)}
+            stage = 'prepare'
+
+            try:
+                if ok:
+                    if next_job and prefetch_after == 'prepare' and next_prepared is None and can_prefetch():
+                        next_prepared = prepare(next_job)
+
+                    stage = 'compose'
+                    started = time.time()
+                    ok = stages['compose'](page, job)
+                    timings['compose'] = round(time.time() - started, 2)
+
+                if ok:
+                    # 账号最小发布间隔
+                    gap_wait = 0.0
+                    if last_submit_at is not None and min_gap_s:
+                        gap_wait = max(0.0, last_submit_at + min_gap_s - time.time())
+                        if gap_wait:
+                            print(f"⏳ 距上次发布不足 {min_gap_s:.0f}s，等待 {gap_wait:.0f}s...")
+                            time.sleep(gap_wait)
+                    timings['gap_wait'] = round(gap_wait, 2)
+
+                    stage = 'submit'
+                    started = time.time()
+                    ok = stages['submit'](page, job)
+                    submitted_at = time.time()
+                    timings['submit'] = round(submitted_at - started, 2)
+
+                if ok:
+                    result['submitted'] = True
+                    last_submit_at = submitted_at
+
+                    # 发布等待期间准备下一帖
+                    if next_job and next_prepared is None and can_prefetch():
+                        next_prepared = prepare(next_job)
+
+                    remaining = confirm_delay_s - (time.time() - submitted_at)
+                    if remaining > 0:
+                        time.sleep(remaining)
+                    stage = 'confirm'
+                    started = time.time()
+                    result['success'] = stages['confirm'](page, job)
+                    timings['confirm'] = round(time.time() - started, 2)
+            except Exception as e:
+                print(f"❌ {title} 出错：{e}")
+                if on_error:
+                    on_error(page, job, e)
+                error = e
+            finally:
+                try:
+                    page.close()
+                except Exception:
+                    pass
+
+            result['timings'] = timings
+            result['failed_stage'] = None if result['success'] else stage
+            result['error_class'] = type(error).__name__ if error is not None and not result['success'] else None
+            result['error'] = str(error) if result['error_class'] else None
+            if tracer is not None:
+                trace_path = tracer.end(failed=not result['success'])
+                if trace_path:
+                    result['trace'] = trace_path
+            if result['success'] or result['submitted'] or attempt > retry_times:
+                break
+            print(f"🔄 {attempt}/{retry_times} 重试：{title}")
+            time.sleep(retry_delay_s)
+
+        result['wall_s'] = round(time.time() - job_started, 2)
+        if watchdog is not None:
+            memory = watchdog.after_job()
+            if memory:
+                result['memory'] = memory
+        results.append(result)
+        if on_result:
+            on_result(job, result)
+
+        # 回收前丢弃已预加载的下一帖（尚未点击发布），由调用方在新上下文中重新准备
+        if next_job and result.get('memory', {}).get('recycle'):
+            break
+
+    if tracer is not None:
+        tracer.stop()
+
+    # 流水线未用上的预加载页面
+    if next_prepared is not None:
+        try:
+            next_prepared[0].close()
+        except Exception:
+            pass
+
+    return results
+
+
+def print_pipeline_summary(results: List[Dict[str, Any]]):
+    """打印各任务的阶段耗时"""
+    print("\n📊 阶段耗时（秒）：")
+    for result in results:
+        timings = result['timings']
+        stage_text = ' '.join(f"{name}={timings[name]}"
+                              for name in ('prepare', 'compose', 'gap_wait', 'submit', 'confirm') if name in timings)
+        status = '✅' if result['success'] else '❌'
+        upload = result.get('upload')
+        if upload:
+            stage_text += f" | 上传 {upload['kbps'] / 1000:.2f}Mbps"
+        memory = result.get('memory')
+        if memory and memory.get('python_rss_mb') is not None:
+            stage_text += f" | 内存 Python {memory['python_rss_mb']}MB"
+            if memory.get('browser_rss_mb') is not None:
+                stage_text += f" 浏览器 {memory['browser_rss_mb']}MB"
+        print(f"{status} {result['title']}：总 {result['wall_s']}s | {stage_text}")
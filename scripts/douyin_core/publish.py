@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+发布流程
+单条和批量发布走同一条步骤流水线：
+媒体处理器校验 / 预处理 → 启动浏览器加载 Cookie → prepare → compose → submit → confirm
+JSONL / CSV 大清单由 publish_stream 分块流式读取，逐条记录进度，可断点续发
+多账号任务由 publish_accounts 在一个共享浏览器中按账号并行发布（见 douyin_core.host）
+"""
+
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .pipeline_executor import run_pipeline
+from .failure_trace import FailureTracer
+from .memory_watchdog import get_watchdog
+from .screenshots import take_screenshot
+from .config import deep_merge, resolve_cookie_file
+from .checks import job_kind
+from .media import get_handler
+from .cookies import load_cookies
+from .dedupe import NearDuplicateIndex
+from .ledger import account_name, open_ledger
+from .manifest import iter_manifest, ManifestProgress
+from .network_metrics import add_to_trace, attach_network_metrics, format_network_summary
+from .session import browser_session
+from .standby import get_standby
+from .validation import validate_batch, print_validation_report, apply_policy
+from .steps import click_publish, check_publish_result, watch_work_id
+
+
+def _failed_result(title: str, error: str, step: str = 'validation',
+                   error_class: str = 'ValidationError') -> Dict[str, Any]:
+    """未进入流水线的任务结果（预校验未通过、未登录等）"""
+    return {'title': title, 'success': False, 'submitted': False, 'attempts': 0, 'timings': {}, 'wall_s': 0.0,
+            'failed_stage': step, 'error_class': error_class, 'error': error}
+
+
+def check_jobs(config: dict, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按媒体类型分组交给处理器校验 / 预处理，保持原顺序返回通过的任务"""
+    by_kind: Dict[str, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        by_kind.setdefault(job_kind(job), []).append(job)
+
+    passed = []
+    for kind, kind_jobs in by_kind.items():
+        passed.extend(get_handler(config, kind).check(kind_jobs))
+    return sorted(passed, key=lambda job: job['_index'])
+
+
+def run_jobs(
+    context,
+    config: dict,
+    jobs: List[Dict[str, Any]],
+    min_gap_s: float = 0,
+    on_result: Optional[Callable] = None,
+    watchdog=None
+) -> List[Dict[str, Any]]:
+    """
+    在已加载 Cookie 的浏览器上下文中流水线发布已校验的任务（on_result / watchdog 见 run_pipeline）
+    standby.enable 时每条优先领取上下文的热备发布页（见 douyin_core.standby）
+    """
+    handlers = {kind: get_handler(config, kind) for kind in {job_kind(job) for job in jobs}}
+
+    def handler_for(job):
+        return handlers[job_kind(job)]
+
+    def on_error(page, job, error: Exception):
+        if config['behavior'].get('screenshot_on_error', True):
+            try:
+                take_screenshot(page, "exception_error")
+            except Exception:
+                pass
+
+    def prepare(page, job):
+        # 每次尝试的新页面重新挂网络指标，结果中只保留最后一次尝试的
+        previous = job.pop('_network', None)
+        if previous is not None:
+            previous.detach()
+        attach_network_metrics(page, job, config)
+        return handler_for(job).prepare(page, job)
+
+    def submit(page, job):
+        watch_work_id(page, job)
+        return click_publish(page, config)
+
+    def finished(job, result):
+        # 上传吞吐（见 douyin_core.bandwidth）和网络指标随结果输出，网络指标同时附加到失败现场 trace
+        if job.get('_upload'):
+            result['upload'] = job['_upload']
+        metrics = job.pop('_network', None)
+        if metrics is not None:
+            result['network'] = metrics.summary()
+            metrics.detach()
+            print(f"🌐 网络：{format_network_summary(result['network'])}")
+            if result.get('trace'):
+                add_to_trace(result['trace'], result['network'])
+        if on_result:
+            on_result(job, result)
+
+    # 批次中有视频时按视频的节奏：上传后即预取下一条，与平台处理等待重叠
+    confirm_delay_s = max(handler.confirm_delay_s for handler in handlers.values())
+    prefetch_after = 'prepare' if any(h.prefetch_after == 'prepare' for h in handlers.values()) else 'submit'
+
+    return run_pipeline(
+        context,
+        jobs,
+        stages={
+            'prepare': prepare,
+            'compose': lambda page, job: handler_for(job).compose(page, job),
+            'submit': submit,
+            'confirm': lambda page, job: check_publish_result(page)
+        },
+        min_gap_s=min_gap_s,
+        confirm_delay_s=confirm_delay_s,
+        prefetch_after=prefetch_after,
+        retry_times=config['post'].get('retry_times', 3),
+        retry_delay_s=config['post'].get('retry_delay_s', 5),
+        on_error=on_error,
+        tracer=FailureTracer(context, config),
+        on_result=finished,
+        watchdog=watchdog,
+        new_page=get_standby(context, config).new_page if config.get('standby', {}).get('enable') else None
+    )
+
+
+def publish_batch(
+    config: dict,
+    jobs: List[Dict[str, Any]],
+    script_dir: str = '.',
+    min_gap_s: Optional[float] = None,
+    pipelined: bool = True,
+    validate: bool = True,
+    on_result: Optional[Callable] = None,
+    session: Optional[Callable] = None
+) -> List[Dict[str, Any]]:
+    """
+    发布一批任务（图文 / 视频可混合）
+
+    Args:
+        config: 完整配置
+        jobs: 任务列表，图文 {'title', 'images', 'topics', 'visible'}，
+              视频 {'title', 'video', 'cover', 'topics', 'visible', 'bgm'}
+        script_dir: scripts/ 目录（用于定位 Cookie 文件）
+        min_gap_s: 两次点击发布之间的最小间隔，默认 post.min_gap_s
+        pipelined: True 共用一个浏览器上下文流水线发布；False 每条独立启动浏览器
+        validate: False 时跳过预校验（调用方已校验，如 publish_stream）
+        on_result: 每条结束后的回调 (job, result)，job 带 '_index'；未进入流水线的任务在最后回调
+        session: 产出 (browser, context) 的上下文管理器工厂 (config, cookies)，默认 browser_session
+                 （每次启动独立浏览器）；多账号宿主传入 host.session
+
+    每条结果（含预校验未通过的）都追加写入发布记录库（见 douyin_core.ledger）
+
+    Returns:
+        与 jobs 顺序一致的结果 {'title', 'success', 'submitted', 'attempts', 'timings', 'wall_s'}，
+        未进入流水线的任务附带 'failed_stage' / 'error'（预校验策略见 validation.policy）
+    """
+    if min_gap_s is None:
+        min_gap_s = config['post'].get('min_gap_s', 0)
+
+    # 显示名称另存在 '_label'，标题保持原样（空标题交给预校验拦下，不会把占位名填进标题框）
+    jobs = [dict(job, _label=job.get('_label') or job.get('title') or f'post_{i}', _index=i)
+            for i, job in enumerate(jobs)]
+    results = [_failed_result(job['_label'], '校验未通过') for job in jobs]
+
+    # 启动浏览器前并行预校验整批，按策略整批终止或隔离不通过的行
+    publishable = set(range(len(jobs)))
+    if validate:
+        report = validate_batch(config, jobs)
+        print_validation_report(report)
+        for row in report['rows']:
+            jobs[row['index']]['_fingerprint'] = row['fingerprint']
+            jobs[row['index']]['_image_hashes'] = row.get('image_hashes')
+            if not row['ok']:
+                results[row['index']]['error'] = '；'.join(row['errors'])
+        publishable = set(apply_policy(config, jobs, report))
+        for i in set(range(len(jobs))) - publishable:
+            if report['rows'][i]['ok']:
+                results[i]['error'] = '同批有未通过预校验的任务，整批终止'
+
+    ledger = open_ledger(config)
+    account = account_name(config)
+
+    def finished(job, result):
+        if ledger is not None:
+            ledger.record(account, job, result)
+        if on_result:
+            on_result(job, result)
+
+    try:
+        ready = check_jobs(config, [job for job in jobs if job['_index'] in publishable])
+        if ready:
+            _publish_ready(config, ready, results, script_dir, min_gap_s, pipelined, finished, session)
+        else:
+            print("❌ 没有可发布的内容")
+
+        for job, result in zip(jobs, results):
+            if not result['attempts']:
+                finished(job, result)
+    finally:
+        if ledger is not None:
+            ledger.close()
+    return results
+
+
+def _publish_ready(config: dict, ready: List[Dict[str, Any]], results: List[Dict[str, Any]],
+                   script_dir: str, min_gap_s: float, pipelined: bool, on_result: Callable,
+                   session: Optional[Callable] = None):
+    """加载 Cookie 后发布已通过校验的任务，结果按 '_index' 写回 results"""
+    session = session or browser_session
+    cookies = load_cookies(resolve_cookie_file(config, script_dir))
+    if not cookies:
+        print("❌ 未找到 Cookie，请先运行 login.py 登录")
+        for job in ready:
+            results[job['_index']] = _failed_result(job['_label'], '未登录', 'login', 'NotLoggedIn')
+        return
+
+    watchdog = get_watchdog(config)
+
+    def run_session(jobs: List[Dict[str, Any]], gap_s: float) -> List[Dict[str, Any]]:
+        with session(config, cookies) as (browser, context):
+            session_results = run_jobs(context, config, jobs, gap_s, on_result, watchdog)
+            # 内存超限：关闭上下文（browser_session 随后关闭整个浏览器，多账号宿主下次租用时重建）
+            if session_results and session_results[-1].get('memory', {}).get('recycle'):
+                watchdog.recycled(session_results[-1]['memory']['recycle'])
+                try:
+                    context.close()
+                except Exception:
+                    pass
+        return session_results
+
+    if pipelined:
+        remaining = ready
+        while remaining:
+            done = run_session(remaining, min_gap_s)
+            for job, result in zip(remaining, done):
+                results[job['_index']] = result
+            remaining = remaining[len(done):]
+            # 回收后换新浏览器继续，仍遵守最小发布间隔（以回收时刻计，偏保守）
+            if remaining and done[-1]['submitted'] and min_gap_s:
+                print(f"⏳ 等待 {min_gap_s:.0f}s 后继续发布...")
+                time.sleep(min_gap_s)
+        return
+
+    # 逐条发布：每条独立的会话
+    for i, job in enumerate(ready):
+        result = run_session([job], 0)[0]
+        results[job['_index']] = result
+        if i < len(ready) - 1 and result['success'] and min_gap_s:
+            print(f"\n⏳ 等待 {min_gap_s / 60:.0f} 分钟后发布下一条...")
+            time.sleep(min_gap_s)
+
+
+def publish(config: dict, job: Dict[str, Any], script_dir: str = '.') -> Dict[str, Any]:
+    """发布单条内容，返回结果（同 publish_batch）"""
+    return publish_batch(config, [job], script_dir)[0]
+
+
+def account_config(config: dict, name: str) -> dict:
+    """多账号配置：accounts[name] 覆盖 account，未配置 cookie_file 时用 cookies_<name>.json"""
+    account = dict(config.get('accounts', {}).get(name) or {}, name=name)
+    account.setdefault('cookie_file', f'cookies_{name}.json')
+    return deep_merge(config, {'account': account})
+
+
+def publish_accounts(
+    config: dict,
+    jobs: List[Dict[str, Any]],
+    script_dir: str = '.',
+    min_gap_s: Optional[float] = None,
+    on_result: Optional[Callable] = None
+) -> List[Dict[str, Any]]:
+    """
+    多账号批量发布：任务按 'account' 字段分组（未指定的归默认账号），所有账号共用一个 Chromium，
+    每个账号一个独立上下文，各账号在宿主的工作线程中并行走 publish_batch（账号内仍遵守 min_gap_s）
+
+    Returns:
+        与 jobs 顺序一致的结果（同 publish_batch）
+    """
+    from .host import BrowserHost
+
+    default = account_name(config)
+    groups: Dict[str, List[int]] = {}
+    for i, job in enumerate(jobs):
+        groups.setdefault(job.get('account') or default, []).append(i)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    with BrowserHost(config) as host:
+        futures = {}
+        for name, indexes in groups.items():
+            account_cfg = config if name == default else account_config(config, name)
+            group_jobs = [jobs[i] for i in indexes]
+            futures[name] = host.submit(name, lambda cfg=account_cfg, group=group_jobs: publish_batch(
+                cfg, group, script_dir, min_gap_s=min_gap_s, on_result=on_result, session=host.session))
+        for name, future in futures.items():
+            try:
+                group_results = future.result()
+            except Exception as e:
+                print(f"❌ 账号 [{name}] 发布异常：{e}")
+                group_results = [_failed_result(jobs[i].get('title') or f'post_{i}', str(e), 'prepare',
+                                                type(e).__name__) for i in groups[name]]
+            for i, result in zip(groups[name], group_results):
+                results[i] = result
+        host.print_stats()
+    return results
+
+
+def _record_rejected(config: dict, jobs_by_row: Dict[int, Dict[str, Any]], report: Dict[str, Any]):
+    """流式清单中未通过预校验的行写入发布记录库（publish_batch 只记录交给它的行）"""
+    rejected = [row for row in report['rows'] if not row['ok']]
+    ledger = open_ledger(config) if rejected else None
+    if ledger is None:
+        return
+    with ledger:
+        for row in rejected:
+            ledger.record(account_name(config), jobs_by_row[row['index']],
+                          _failed_result(row['title'], '；'.join(row['errors'])))
+
+
+def _validate_chunk(config: dict, chunk: List[tuple], first_row: int,
+                    seen: Dict[str, int], near_index) -> Dict[str, Any]:
+    """
+    校验流式清单的一块（报告行的 index 为清单中的行号）：解析失败的行直接记错，
+    块内重复由 validate_batch 标记，跨块完全重复用 seen（指纹 -> 行号）检测，
+    跨块近似重复由共用的 near_index 检测
+    """
+    jobs = [job if job is not None else {} for _, _, job, _ in chunk]
+    report = validate_batch(config, jobs, near_index=near_index, first_index=first_row)
+    mode = config.get('validation', {}).get('duplicates', 'error')
+
+    for (_, _, _, error), row in zip(chunk, report['rows']):
+        if error:
+            row['errors'] = [error]
+            row['warnings'] = []
+        fingerprint = row.get('fingerprint')
+        if fingerprint and not row['errors'] and mode != 'off':
+            if fingerprint in seen and seen[fingerprint] < first_row:
+                message = f"与第 {seen[fingerprint]} 行素材重复"
+                (row['errors'] if mode == 'error' else row['warnings']).append(message)
+            seen.setdefault(fingerprint, row['index'])
+        row['ok'] = not row['errors']
+
+    report['failed'] = sum(not row['ok'] for row in report['rows'])
+    report['passed'] = report['total'] - report['failed']
+    report['warnings'] = sum(len(row['warnings']) for row in report['rows'])
+    return report
+
+
+def publish_stream(
+    config: dict,
+    manifest_path: str,
+    script_dir: str = '.',
+    min_gap_s: Optional[float] = None,
+    resume: bool = True,
+    on_result: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """
+    流式发布 JSONL / CSV 清单：每次只读入 manifest.chunk_size 行，校验后交给 publish_batch，
+    每条发布结束即把进度写入 <清单>.progress，中断后再次运行从断点继续
+
+    Args:
+        resume: False 时丢弃已有进度从头开始
+        on_result: 每条结束后的回调 (job, result)，job 带 '_row'（清单中的行号，从 0 开始）
+
+    Returns:
+        汇总 {'manifest', 'rows', 'published', 'failed', 'quarantined', 'stopped', 'offset', 'failures'}，
+        不保留每条结果，清单再大内存占用也只与 chunk_size 有关
+    """
+    if min_gap_s is None:
+        min_gap_s = config['post'].get('min_gap_s', 0)
+    chunk_size = max(1, config.get('manifest', {}).get('chunk_size', 20))
+    policy = config.get('validation', {}).get('policy', 'stop')
+
+    progress = ManifestProgress(manifest_path)
+    if not resume:
+        progress.reset()
+    elif progress.offset:
+        print(f"⏩ 从第 {progress.rows} 行继续（偏移 {progress.offset}）")
+
+    summary = {'manifest': progress.manifest_path, 'rows': progress.rows, 'published': 0, 'failed': 0,
+               'quarantined': 0, 'stopped': False, 'offset': progress.offset, 'failures': []}
+
+    if not load_cookies(resolve_cookie_file(config, script_dir)):
+        print("❌ 未找到 Cookie，请先运行 login.py 登录")
+        summary['stopped'] = True
+        return summary
+
+    def record(job, result):
+        summary['published' if result['success'] else 'failed'] += 1
+        if not result['success']:
+            summary['failures'].append({'row': job['_row'], 'title': result['title'],
+                                        'error': result.get('error') or '发布失败'})
+        if on_result:
+            on_result(job, result)
+
+    def on_published(job, result):
+        record(job, result)
+        # 每条结束立即记录进度，中断后不会重发已提交的内容（未进入流水线的任务最后才回调，不回退进度）
+        if job['_next_offset'] > progress.offset:
+            progress.commit(job['_next_offset'], job['_row'] + 1)
+
+    entries = iter_manifest(manifest_path, progress.offset)
+    seen: Dict[str, int] = {}
+    near_index = NearDuplicateIndex(config)
+    last_chunk_submitted_at = None
+
+    while True:
+        chunk = list(itertools.islice(entries, chunk_size))
+        if not chunk:
+            break
+        first_row = progress.rows
+        report = _validate_chunk(config, chunk, first_row, seen, near_index)
+        print_validation_report(report)
+
+        # 解析失败的行在隔离文件中记录其字节偏移
+        jobs_by_row = {first_row + i: dict(job if job is not None else {'manifest_offset': offset},
+                                           _row=first_row + i, _next_offset=next_offset,
+                                           _fingerprint=row['fingerprint'],
+                                           _image_hashes=row.get('image_hashes'))
+                       for i, ((offset, next_offset, job, _), row) in enumerate(zip(chunk, report['rows']))}
+        publishable = apply_policy(config, jobs_by_row, report)
+        _record_rejected(config, jobs_by_row, report)
+        if report['failed'] and policy != 'quarantine':
+            summary['stopped'] = True
+            break
+        summary['quarantined'] += report['failed']
+
+        # 块与块之间同样遵守最小发布间隔
+        if publishable and last_chunk_submitted_at is not None and min_gap_s:
+            gap_wait = last_chunk_submitted_at + min_gap_s - time.time()
+            if gap_wait > 0:
+                print(f"⏳ 距上次发布不足 {min_gap_s:.0f}s，等待 {gap_wait:.0f}s...")
+                time.sleep(gap_wait)
+
+        ready = [jobs_by_row[row] for row in publishable]
+        results = publish_batch(config, ready, script_dir, min_gap_s=min_gap_s, validate=False,
+                                on_result=on_published)
+        if any(result['submitted'] for result in results):
+            last_chunk_submitted_at = time.time()
+        # 隔离的行随整块一起记为已处理
+        progress.commit(chunk[-1][1], first_row + len(chunk))
+
+    summary['rows'] = progress.rows
+    summary['offset'] = progress.offset
+    return summary
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+截图子系统
+- 默认只截可视区域（或指定元素），不再整页截图
+- JPEG / WebP 编码与写盘在后台线程完成，不阻塞发布流程
+- 成功流程的截图只进入所属页面的环形缓冲区，出错时才连同该页面的缓冲区一起落盘
+  （每次尝试用新页面，流水线中的预取页面、多账号宿主的其他账号互不混入）
+- 启动时按总大小和保留天数清理旧截图
+"""
+
+import atexit
+import io
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:  # 未安装 Pillow 时直接保存 PNG
+    Image = None
+
+DEFAULT_SCREENSHOT_CONFIG = {
+    "format": "jpeg",
+    "quality": 70,
+    "scope": "viewport",
+    "ring_size": 8,
+    "keep_success": False,
+    "max_total_mb": 200,
+    "max_age_days": 7
+}
+
+# 这些截图属于正常流程，只进入环形缓冲区
+ROUTINE_SHOTS = {'before_publish', 'publish_success', 'publish_processing'}
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+class ScreenshotPipeline:
+    """截图采集 + 后台编码写盘 + 失败时落盘的环形缓冲区"""
+
+    def __init__(self, save_dir: str = 'screenshots', fmt: str = 'jpeg', quality: int = 70,
+                 scope: str = 'viewport', ring_size: int = 8, keep_success: bool = False):
+        self.save_dir = save_dir
+        self.fmt = fmt.lower()
+        self.quality = quality
+        self.scope = scope
+        self.keep_success = keep_success
+        self.ring_size = max(1, ring_size)
+        # 页面 -> 该页面的环形缓冲区（页面释放后自动丢弃）
+        self._rings: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._ring_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run_worker, name='screenshot-writer', daemon=True)
+        self._worker.start()
+
+    # ---------- 采集（调用方线程） ----------
+    def capture(self, page, name: str, element=None, failure: Optional[bool] = None) -> Optional[str]:
+        """
+        截图（只在调用线程中抓取原始 PNG，编码写盘交给后台线程）
+
+        Args:
+            page: Playwright page
+            name: 截图名称
+            element: 可选 Locator，只截该元素
+            failure: 是否为失败现场；None 时按名称判断
+
+        Returns:
+            将写入的文件路径；仅进入缓冲区时返回 None
+        """
+        if failure is None:
+            failure = name not in ROUTINE_SHOTS
+
+        try:
+            if element is not None:
+                png = element.screenshot(type='png')
+            else:
+                png = page.screenshot(type='png', full_page=(self.scope == 'full'))
+        except Exception as e:
+            print(f"⚠️  截图失败 {name}：{e}")
+            return None
+
+        shot = (name, datetime.now(), png)
+        if failure:
+            self.flush(page)
+            return self._enqueue(shot)
+
+        with self._ring_lock:
+            ring = self._rings.get(page)
+            if ring is None:
+                ring = self._rings[page] = deque(maxlen=self.ring_size)
+            ring.append(shot)
+        if self.keep_success:
+            return self._enqueue(shot)
+        return None
+
+    def flush(self, page=None):
+        """把页面缓冲区中的截图落盘（出错时调用）；page 为 None 时落盘所有页面的"""
+        with self._ring_lock:
+            rings = [self._rings.pop(page, None)] if page is not None else list(self._rings.values())
+            if page is None:
+                self._rings.clear()
+        for ring in rings:
+            for shot in ring or ():
+                if not self.keep_success:
+                    self._enqueue(shot)
+
+    def reset(self, page=None):
+        """丢弃页面的缓冲区（新的一次尝试开始 / 成功结束）；page 为 None 时丢弃全部"""
+        with self._ring_lock:
+            if page is None:
+                self._rings.clear()
+            else:
+                self._rings.pop(page, None)
+
+    def close(self, timeout: float = 10):
+        """等待后台写盘完成"""
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    # ---------- 后台编码 ----------
+    def _enqueue(self, shot) -> str:
+        name, taken_at, _ = shot
+        ext = {'jpeg': 'jpg', 'webp': 'webp'}.get(self.fmt, 'png') if Image is not None else 'png'
+        path = os.path.join(self.save_dir, f"{name}_{taken_at.strftime('%Y%m%d_%H%M%S_%f')[:-3]}.{ext}")
+        self._queue.put((path, shot[2]))
+        print(f"📸 截图已排队写入：{path}")
+        return path
+
+    def _run_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, png = item
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                data = self._encode(png)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                print(f"📸 截图已保存：{path}")
+            except Exception as e:
+                print(f"⚠️  截图写入失败 {path}：{e}")
+
+    def _encode(self, png: bytes) -> bytes:
+        if Image is None or self.fmt == 'png':
+            return png
+        image = Image.open(io.BytesIO(png))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        if self.fmt == 'webp':
+            image.save(out, format='WEBP', quality=self.quality, method=4)
+        else:
+            image.save(out, format='JPEG', quality=self.quality, optimize=True)
+        return out.getvalue()
+
+
+def cleanup_screenshots(save_dir: str = 'screenshots', max_total_mb: float = 200, max_age_days: float = 7) -> int:
+    """按保留天数和总大小清理截图，返回删除的文件数"""
+    if not os.path.isdir(save_dir):
+        return 0
+
+    files = []
+    for entry in os.scandir(save_dir):
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+    files.sort()
+
+    removed = 0
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    total = sum(size for _, size, _ in files)
+    budget = max_total_mb * 1024 * 1024 if max_total_mb else None
+
+    for mtime, size, path in files:
+        expired = cutoff is not None and mtime < cutoff
+        over_budget = budget is not None and total > budget
+        if not (expired or over_budget):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+
+    return removed
+
+
+# ============ 模块级默认管线 ============
+_pipeline: Optional[ScreenshotPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def configure(config: dict, save_dir: str = 'screenshots') -> ScreenshotPipeline:
+    """按 behavior.screenshot 配置创建默认管线，并清理旧截图"""
+    global _pipeline
+    settings = dict(DEFAULT_SCREENSHOT_CONFIG)
+    settings.update(config.get('behavior', {}).get('screenshot', {}))
+
+    removed = cleanup_screenshots(save_dir, settings['max_total_mb'], settings['max_age_days'])
+    if removed:
+        print(f"🧹 已清理 {removed} 张旧截图")
+
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.close()
+        _pipeline = ScreenshotPipeline(save_dir, settings['format'], settings['quality'], settings['scope'],
+                                       settings['ring_size'], settings['keep_success'])
+    return _pipeline
+
+
+def get_pipeline(save_dir: str = 'screenshots') -> ScreenshotPipeline:
+    """获取默认管线（未配置时使用默认参数）"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = ScreenshotPipeline(save_dir)
+        return _pipeline
+
+
+def take_screenshot(page, name: str, save_dir: str = "screenshots"):
+    """截图（兼容旧接口：正常流程截图进缓冲区，错误截图连同缓冲区落盘）"""
+    get_pipeline(save_dir).capture(page, name)
+
+
+@atexit.register
+def _close_pipeline():
+    if _pipeline is not None:
+        _pipeline.close()
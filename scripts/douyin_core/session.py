@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+浏览器与会话
+启动 Chromium、创建带反检测设置的上下文、加载 Cookie，以及通用的延迟和输入模拟
+
+启动档位（browser.profile，或环境变量 DOUYIN_BROWSER_PROFILE 覆盖，不用改脚本）：
+- dense     单机多开的无头工作进程：限制渲染进程数、小磁盘缓存、限制 JS 堆、小视口
+- balanced  默认，与原有启动参数一致
+- debug     有界面、操作放慢、固定 1920x1080 视口，便于排查
+browser.profiles 中可覆盖内置档位的字段或新增档位
+"""
+
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from playwright.sync_api import sync_playwright, Page
+
+from .display_pool import display_launch_options, get_display_pool
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--disable-gpu'
+]
+
+# 档位字段：renderer_process_limit（渲染进程上限）、disk_cache_mb（磁盘缓存）、js_heap_mb（V8 老生代上限）、
+# viewport（默认视口，也决定窗口大小）、viewport_range（随机视口的 [[最小宽, 最大宽], [最小高, 最大高]]，
+# None 不随机）、args（额外启动参数）、headless / slow_mo_ms（设置后覆盖 browser.headless / 不放慢）
+LAUNCH_PROFILES = {
+    'dense': {
+        'renderer_process_limit': 2,
+        'disk_cache_mb': 16,
+        'js_heap_mb': 256,
+        'viewport': {'width': 1280, 'height': 720},
+        'viewport_range': [[1280, 1366], [720, 768]],
+        'args': [
+            '--disable-site-isolation-trials',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-extensions',
+            '--disable-features=Translate,MediaRouter,OptimizationHints',
+            '--mute-audio'
+        ]
+    },
+    'balanced': {
+        'renderer_process_limit': None,
+        'disk_cache_mb': None,
+        'js_heap_mb': None,
+        'viewport': {'width': 1920, 'height': 1080},
+        'viewport_range': [[1280, 1920], [720, 1080]],
+        'args': []
+    },
+    'debug': {
+        'renderer_process_limit': None,
+        'disk_cache_mb': None,
+        'js_heap_mb': None,
+        'viewport': {'width': 1920, 'height': 1080},
+        'viewport_range': None,
+        'args': [],
+        'headless': False,
+        'slow_mo_ms': 100
+    }
+}
+
+HIDE_WEBDRIVER_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
+
+
+def random_delay(min_ms: int, max_ms: int):
+    """随机延迟"""
+    delay = random.uniform(min_ms, max_ms) / 1000
+    time.sleep(delay)
+
+
+def type_text_slowly(page: Page, element, text: str, min_delay: int, max_delay: int):
+    """模拟真人输入"""
+    # 清空现有内容
+    element.click()
+    element.press('Control+A')
+    element.press('Delete')
+    random_delay(200, 500)
+
+    # 逐字符输入（带随机延迟）
+    for char in text:
+        element.type(char)
+        # 10% 概率停顿更长，模拟思考时间
+        if random.random() < 0.1:
+            time.sleep(random.uniform(0.3, 0.8))
+        else:
+            random_delay(min_delay, max_delay)
+
+
+def get_launch_profile(config: dict) -> dict:
+    """当前启动档位（内置档位 + browser.profiles 中的覆盖），未知档位回退到 balanced"""
+    name = os.environ.get('DOUYIN_BROWSER_PROFILE') or config['browser'].get('profile', 'balanced')
+    custom = config['browser'].get('profiles', {})
+    if name not in LAUNCH_PROFILES and name not in custom:
+        print(f"⚠️  未知的启动档位 {name}，使用 balanced")
+        name = 'balanced'
+    profile = dict(LAUNCH_PROFILES['balanced'], **LAUNCH_PROFILES.get(name, {}))
+    profile.update(custom.get(name, {}))
+    profile['name'] = name
+    return profile
+
+
+def launch_args(profile: dict) -> List[str]:
+    """档位对应的 Chromium 启动参数"""
+    args = list(BROWSER_ARGS)
+    viewport = profile['viewport']
+    args.append(f"--window-size={viewport['width']},{viewport['height']}")
+    if profile.get('renderer_process_limit'):
+        args.append(f"--renderer-process-limit={profile['renderer_process_limit']}")
+    if profile.get('disk_cache_mb'):
+        args.append(f"--disk-cache-size={int(profile['disk_cache_mb'] * 1024 * 1024)}")
+    if profile.get('js_heap_mb'):
+        args.append(f"--js-flags=--max-old-space-size={int(profile['js_heap_mb'])}")
+    return args + list(profile.get('args') or [])
+
+
+def is_headless(config: dict) -> bool:
+    """启动档位设置了 headless 时以档位为准，否则用 browser.headless"""
+    return get_launch_profile(config).get('headless', config['browser'].get('headless', True))
+
+
+@contextmanager
+def headed_display(config: dict):
+    """有界面启动时产出 DISPLAY：已有桌面显示时用当前显示，否则从虚拟显示池租一个（见 display_pool）；无头时产出 None"""
+    if is_headless(config):
+        yield None
+        return
+    with get_display_pool(config).lease() as display:
+        yield display
+
+
+def launch_browser(p, config: dict, extra_args: Optional[List[str]] = None, display: Optional[str] = None):
+    """按配置和启动档位启动 Chromium（display：有界面时使用的 DISPLAY，见 headed_display）"""
+    profile = get_launch_profile(config)
+    headless = profile.get('headless', config['browser'].get('headless', True))
+
+    browser_args = launch_args(profile) + list(extra_args or [])
+    if config['anti_detect'].get('enable', True):
+        browser_args.append('--disable-blink-features=AutomationControlled')
+
+    options = {'headless': headless, 'args': browser_args}
+    if not headless:
+        options.update(display_launch_options(display))
+    if profile.get('slow_mo_ms'):
+        options['slow_mo'] = profile['slow_mo_ms']
+    return p.chromium.launch(**options)
+
+
+def new_context(browser, config: dict):
+    """在已启动的浏览器中创建带反检测设置的上下文（独立 Cookie / 存储）"""
+    profile = get_launch_profile(config)
+    context_options = {
+        'viewport': dict(profile['viewport']),
+        'user_agent': config['browser'].get('user_agent'),
+        'locale': 'zh-CN',
+        'timezone_id': 'Asia/Shanghai'
+    }
+
+    # 随机 viewport（反检测），范围由档位决定
+    viewport_range = profile.get('viewport_range')
+    if config['anti_detect'].get('random_viewport', True) and viewport_range:
+        (min_width, max_width), (min_height, max_height) = viewport_range
+        context_options['viewport'] = {
+            'width': random.randint(min_width, max_width),
+            'height': random.randint(min_height, max_height)
+        }
+
+    context = browser.new_context(**context_options)
+
+    # 隐藏 webdriver 特征
+    if config['anti_detect'].get('hide_webdriver', True):
+        context.add_init_script(HIDE_WEBDRIVER_SCRIPT)
+
+    return context
+
+
+def create_browser_context(p, config: dict, display: Optional[str] = None):
+    """启动浏览器并创建带反检测设置的上下文"""
+    browser = launch_browser(p, config, display=display)
+    return browser, new_context(browser, config)
+
+
+@contextmanager
+def browser_session(config: dict, cookies: list):
+    """启动浏览器并加载 Cookie，产出 (browser, context)，退出时关闭浏览器"""
+    print("🌐 启动浏览器...")
+    with sync_playwright() as p, headed_display(config) as display:
+        browser, context = create_browser_context(p, config, display)
+        context.add_cookies(cookies)
+        print("✅ Cookie 已加载")
+        try:
+            yield browser, context
+        finally:
+            try:
+                browser.close()
+            except Exception:
+                pass
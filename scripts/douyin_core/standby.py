@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+热备发布页
+每个浏览器上下文（账号）在后台保留一个已打开、已确认登录的发布页：新任务直接领走，省掉
+goto(networkidle) 和登录检查；领走后立即开始预加载下一个，超过 standby.max_age_s 的热备页重新加载
+
+页面导航用 location.href 发起、不阻塞调用线程，领取时才等待加载完成并检查登录状态，
+所以预加载与调用方的其他工作（上一条的等待、空闲）重叠。热备页只在上下文所属线程中使用
+（多账号宿主在工作线程空闲时调用 tick，见 douyin_core.host）
+"""
+
+import time
+import weakref
+from typing import Optional
+
+from .steps import PUBLISH_URL, WARM_PAGES
+
+_standbys: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+
+class StandbyPage:
+    """一个上下文的热备发布页"""
+
+    def __init__(self, context, config: dict):
+        self.context = context
+        self.settings = config.get('standby', {})
+        self.page = None
+        self.loaded_at = 0.0
+        self.claims = 0
+        self.misses = 0
+
+    def _navigate(self, page):
+        """发起导航后立即返回（不等待加载）"""
+        page.evaluate('url => { window.location.href = url; }', PUBLISH_URL)
+        self.loaded_at = time.time()
+
+    def warm(self):
+        """没有热备页时新开一个并开始加载"""
+        if self.page is not None and not self.page.is_closed():
+            return
+        try:
+            self.page = self.context.new_page()
+            self._navigate(self.page)
+        except Exception as e:
+            print(f"⚠️  预加载发布页失败：{e}")
+            self._discard()
+
+    def _discard(self):
+        if self.page is not None:
+            try:
+                self.page.close()
+            except Exception:
+                pass
+        self.page = None
+
+    def tick(self):
+        """空闲时调用：热备页关闭 / 崩溃则重开，超过 max_age_s 则重新加载"""
+        if self.page is None or self.page.is_closed():
+            self.page = None
+            self.warm()
+            return
+        if time.time() - self.loaded_at > self.settings.get('max_age_s', 600):
+            try:
+                self.page.evaluate('() => { window.location.reload(); }')
+                self.loaded_at = time.time()
+            except Exception:
+                self._discard()
+                self.warm()
+
+    def claim(self):
+        """
+        领取热备页：等待加载完成并确认已登录后返回（已登记为热页面，open_publish_page 不再跳转），
+        随即预加载下一个；没有可用热备页时返回 None
+        """
+        page, self.page = self.page, None
+        ready = False
+        if page is not None and not page.is_closed() \
+                and time.time() - self.loaded_at <= self.settings.get('max_age_s', 600):
+            try:
+                page.wait_for_load_state('networkidle', timeout=self.settings.get('verify_timeout_ms', 15000))
+                url = page.url.lower()
+                ready = 'login' not in url and 'creator.douyin.com' in url
+            except Exception:
+                ready = False
+        if not ready and page is not None:
+            try:
+                page.close()
+            except Exception:
+                pass
+        self.warm()
+        if not ready:
+            self.misses += 1
+            return None
+        self.claims += 1
+        WARM_PAGES.add(page)
+        return page
+
+    def new_page(self):
+        """流水线的新页面工厂：优先领取热备页，否则新开空白页"""
+        return self.claim() or self.context.new_page()
+
+    def close(self):
+        self._discard()
+
+
+def get_standby(context, config: dict) -> StandbyPage:
+    """上下文对应的热备页管理（随上下文释放）"""
+    standby = _standbys.get(context)
+    if standby is None:
+        standby = _standbys[context] = StandbyPage(context, config)
+    return standby
+
+
+def find_standby(context) -> Optional[StandbyPage]:
+    """已创建的热备页管理（未启用时为 None）"""
+    return _standbys.get(context)
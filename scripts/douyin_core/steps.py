@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+通用页面步骤
+图文和视频发布共用：打开发布页、标题、话题、可见性、模拟真人操作、发布与结果检测
+"""
+
+import random
+import time
+import weakref
+from typing import List, Optional
+
+from playwright.sync_api import Page
+
+from .screenshots import take_screenshot
+from .session import random_delay, type_text_slowly
+from .topics import get_topic_index
+
+PUBLISH_URL = 'https://creator.douyin.com/publish'
+
+# 已加载并确认登录的热备发布页（见 douyin_core.standby），open_publish_page 直接使用
+WARM_PAGES: 'weakref.WeakSet' = weakref.WeakSet()
+
+TITLE_SELECTORS = [
+    'input[placeholder*="标题"], input[placeholder*="title"]',
+    'input[class*="title"], [class*="title"] input',
+    'input[aria-label*="标题"]'
+]
+
+TOPIC_SELECTORS = [
+    'input[placeholder*="话题"], input[placeholder*="#"]',
+    'input[aria-label*="话题"]'
+]
+
+# 话题建议下拉中的选项
+TOPIC_SUGGESTION_SELECTORS = [
+    '[class*="mention-suggest"] [class*="item"]',
+    '[class*="hashtag"] [class*="item"], [class*="topic-list"] [class*="item"]',
+    '[role="listbox"] [role="option"]'
+]
+
+PUBLISH_SELECTORS = [
+    'button:has-text("发布"), button:has-text("Publish")',
+    '[class*="publish"], [class*="submit"]',
+    'button[class*="confirm"]'
+]
+
+SUCCESS_INDICATORS = ['发布成功', '审核中', 'published', 'success', '/dashboard']
+
+# 发布接口，响应中带作品 ID
+CREATE_API_PATTERNS = ('/aweme/create', '/media/aweme/create')
+WORK_ID_KEYS = ('item_id', 'aweme_id')
+
+
+def find_first_visible(page: Page, selectors: List[str], timeout_ms: int = 2000, verbose: bool = False):
+    """按顺序尝试选择器，返回第一个可见元素，找不到返回 None"""
+    for selector in selectors:
+        try:
+            element = page.locator(selector).first
+            if element.is_visible(timeout=timeout_ms):
+                if verbose:
+                    print(f"✓ 找到元素：{selector}")
+                return element
+        except Exception:
+            continue
+    return None
+
+
+def open_publish_page(page: Page, config: dict) -> bool:
+    """打开发布页面并检查登录状态"""
+    if page in WARM_PAGES:
+        WARM_PAGES.discard(page)
+        print("📝 使用预加载的发布页（已登录）")
+        return True
+
+    min_delay = config['behavior'].get('min_delay_ms', 800)
+    max_delay = config['behavior'].get('max_delay_ms', 3000)
+
+    print("📝 打开发布页面...")
+    page.goto(PUBLISH_URL, wait_until='networkidle', timeout=30000)
+    random_delay(min_delay, max_delay)
+
+    if 'login' in page.url.lower():
+        print("❌ 未登录，请先运行 login.py")
+        if config['behavior'].get('screenshot_on_error', True):
+            take_screenshot(page, "login_required")
+        return False
+
+    print("✅ 已登录")
+    return True
+
+
+def fill_title(page: Page, config: dict, title: str) -> bool:
+    """模拟真人输入标题"""
+    print("✏️  输入标题...")
+    title_input = find_first_visible(page, TITLE_SELECTORS)
+    if title_input is None:
+        print("⚠️  未找到标题输入框")
+        return False
+
+    type_text_slowly(page, title_input, title,
+                     config['behavior'].get('min_delay_ms', 800), config['behavior'].get('max_delay_ms', 3000))
+    print(f"✅ 标题已输入：{title}")
+    return True
+
+
+def _wait_for_suggestion(page: Page, timeout_ms: int) -> Optional[str]:
+    """等待话题建议下拉出现，返回第一项文本；超时返回 None"""
+    try:
+        item = page.locator(', '.join(TOPIC_SUGGESTION_SELECTORS)).first
+        item.wait_for(state='visible', timeout=timeout_ms)
+        return item.inner_text(timeout=500).strip() or None
+    except Exception:
+        return None
+
+
+def add_topics(page: Page, config: dict, topics: Optional[List[str]]):
+    """
+    添加话题：输入框只定位、点击一次，连续输入全部话题，最后才做一次随机停顿；
+    话题索引中已有的话题只等 known_settle_ms 内出现建议项即回车，新话题等下拉出现再回车并记入索引；
+    已知话题没等到建议项（可能已被平台下线）时移出索引，按新话题等完整超时
+    """
+    if not topics:
+        return
+    settings = config.get('topics', {})
+    between_min, between_max = settings.get('between_ms', [150, 400])
+    index = get_topic_index(config)
+
+    print("🏷️  添加话题...")
+    topic_input = find_first_visible(page, TOPIC_SELECTORS)
+    if topic_input is None:
+        print("⚠️  未找到话题输入框")
+        return
+    topic_input.click()
+    random_delay(200, 500)
+
+    for topic in topics:
+        try:
+            topic_input.type(f"#{topic}", delay=random.randint(30, 80))
+            known = topic in index
+            if known and _wait_for_suggestion(page, settings.get('known_settle_ms', 150)) is None:
+                index.forget(topic)
+                known = False
+                print(f"ℹ️  已知话题 #{topic} 没有出现建议项，移出话题索引")
+            if known:
+                index.record(topic)
+                note = '（已知话题）'
+            else:
+                suggestion = _wait_for_suggestion(page, settings.get('suggest_timeout_ms', 1500))
+                if suggestion:
+                    index.record(topic, suggestion)
+                note = f"（建议：{suggestion}）" if suggestion else '（无建议项）'
+            topic_input.press('Enter')
+            print(f"✅ 话题已添加：#{topic}{note}")
+            random_delay(between_min, between_max)
+        except Exception as e:
+            print(f"⚠️  话题添加失败 {topic}: {e}")
+
+    index.save()
+    random_delay(config['behavior'].get('min_delay_ms', 800), config['behavior'].get('max_delay_ms', 3000))
+
+
+def set_visibility(page: Page, config: dict, visible: str = 'public'):
+    """设置可见性（public 为平台默认，无需操作）"""
+    if visible == 'public':
+        return
+    print(f"🔒 设置可见性：{visible}")
+    try:
+        visible_btn = page.locator('button:has-text("公开"), button:has-text("好友"), [class*="visible"]').first
+        if visible_btn.is_visible(timeout=5000):
+            visible_btn.click()
+            random_delay(config['behavior'].get('min_delay_ms', 800), config['behavior'].get('max_delay_ms', 3000))
+
+            visible_text = '好友可见' if visible == 'friends' else '私密'
+            visible_option = page.locator(
+                f'li:has-text("{visible_text}"), [role="menuitem"]:has-text("{visible_text}")').first
+            if visible_option.is_visible(timeout=5000):
+                visible_option.click()
+                print(f"✅ 可见性已设置：{visible}")
+    except Exception as e:
+        print(f"⚠️  可见性设置失败：{e}")
+
+
+def simulate_human(page: Page, config: dict):
+    """发布前随机滚动和鼠标移动"""
+    if config['behavior'].get('scroll_before_post', True):
+        print("📜 模拟真人滚动...")
+        for _ in range(random.randint(2, 4)):
+            page.evaluate(f'window.scrollBy(0, {random.randint(100, 300)})')
+            time.sleep(random.uniform(0.5, 1.5))
+        page.evaluate('window.scrollTo(0, 0)')
+        time.sleep(0.5)
+
+    if config['behavior'].get('random_mouse_move', True):
+        print("🖱️  模拟鼠标移动...")
+        for _ in range(random.randint(2, 4)):
+            page.mouse.move(random.randint(100, 800), random.randint(100, 600))
+            time.sleep(random.uniform(0.3, 0.8))
+
+
+def find_publish_button(page: Page):
+    """定位可用的发布按钮，找不到返回 None"""
+    publish_btn = find_first_visible(page, PUBLISH_SELECTORS, timeout_ms=3000, verbose=True)
+    if publish_btn is not None and publish_btn.is_enabled():
+        return publish_btn
+    return None
+
+
+def click_publish(page: Page, config: dict) -> bool:
+    """查找并点击发布按钮"""
+    print("🚀 发布...")
+    publish_btn = find_publish_button(page)
+
+    if publish_btn is not None:
+        take_screenshot(page, "before_publish")
+        publish_btn.click()
+        print("✅ 已点击发布按钮")
+        return True
+
+    print("❌ 未找到发布按钮或按钮不可用")
+    if config['behavior'].get('screenshot_on_error', True):
+        take_screenshot(page, "no_publish_button")
+    return False
+
+
+def _find_work_id(data) -> Optional[str]:
+    """在接口响应 JSON 中查找作品 ID"""
+    if isinstance(data, dict):
+        for key in WORK_ID_KEYS:
+            if data.get(key):
+                return str(data[key])
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        work_id = _find_work_id(value)
+        if work_id:
+            return work_id
+    return None
+
+
+def watch_work_id(page: Page, job: dict):
+    """监听发布接口响应，拿到作品 ID 后写入 job['_work_id']（点击发布前调用）"""
+    def on_response(response):
+        if not any(pattern in response.url for pattern in CREATE_API_PATTERNS):
+            return
+        try:
+            work_id = _find_work_id(response.json())
+        except Exception:
+            return
+        if work_id:
+            job['_work_id'] = work_id
+
+    page.on('response', on_response)
+
+
+def check_publish_result(page: Page) -> bool:
+    """检测发布结果（处理中也视为成功）"""
+    current_url = page.url.lower()
+    page_content = page.content().lower()
+
+    if any(indicator in current_url or indicator in page_content for indicator in SUCCESS_INDICATORS):
+        print("✅ 发布成功！")
+        take_screenshot(page, "publish_success")
+    else:
+        print("⏳ 发布处理中...")
+        take_screenshot(page, "publish_processing")
+    return True
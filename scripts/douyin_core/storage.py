@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+会话 / 状态文件的原子读写
+多个工作进程（批量发布、会话保活、扫码登录）会同时读写同一个 Cookie 文件，直接覆盖写时
+并发或中途被杀都会留下半截 JSON，之后每次发布都读不到 Cookie
+
+- write_json：同目录临时文件 + fsync + os.replace，读方只会看到旧版本或新版本；
+  写方之间用 <文件>.lock 上的文件锁串行化；默认紧凑 JSON
+- history > 0 时替换前把旧版本硬链接到 <目录>/.history/<文件名>.<时间戳>，保留最近 history 个，可回滚
+- read_json：按 (inode, mtime, 大小) 缓存解析结果，文件被替换后重新读取；返回副本，调用方可随意修改
+
+只用标准库
+"""
+
+import copy
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+HISTORY_DIR = '.history'
+
+_cache: Dict[str, Tuple[int, int, int, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: str):
+    """对 <path>.lock 加排他锁（跨进程；不支持文件锁的平台上退化为不加锁）"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _history_path(path: str) -> str:
+    directory, name = os.path.split(os.path.abspath(path))
+    now_ns = time.time_ns()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now_ns // 10**9))
+    return os.path.join(directory, HISTORY_DIR, f"{name}.{stamp}.{now_ns // 1000 % 10**6:06d}")
+
+
+def _archive(path: str):
+    """把当前版本放入历史目录（硬链接，不支持时复制），文件原地保持可读"""
+    target = _history_path(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(path, target)
+    except OSError:
+        shutil.copy2(path, target)
+
+
+def _prune(path: str, keep: int):
+    for old in list_versions(path)[keep:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def write_json(path: str, data: Any, history: int = 0, indent: Optional[int] = None):
+    """
+    原子写入 JSON（加锁、临时文件、fsync、替换）
+
+    Args:
+        history: 保留的历史版本数，内容有变化时旧版本先存入历史目录；0 表示不保留
+        indent: None 为紧凑格式
+    """
+    separators = (',', ':') if indent is None else None
+    payload = json.dumps(data, ensure_ascii=False, indent=indent, separators=separators).encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with file_lock(path):
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            if history > 0 and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    changed = f.read() != payload
+                if changed:
+                    _archive(path)
+                    _prune(path, history)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """
+    读取 JSON（文件不存在时返回 default）；按 inode、mtime 和大小缓存，文件未变时不重新解析
+
+    Raises:
+        ValueError: 文件内容不是有效 JSON
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return copy.deepcopy(default)
+    key = os.path.abspath(path)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[:3] == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        return copy.deepcopy(cached[3])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _cache_lock:
+        _cache[key] = (stat.st_ino, stat.st_mtime_ns, stat.st_size, data)
+    return copy.deepcopy(data)
+
+
+def list_versions(path: str) -> List[str]:
+    """历史版本路径，最新的在前"""
+    directory, name = os.path.split(os.path.abspath(path))
+    history_dir = os.path.join(directory, HISTORY_DIR)
+    if not os.path.isdir(history_dir):
+        return []
+    prefix = name + '.'
+    versions = [entry for entry in os.listdir(history_dir)
+                if entry.startswith(prefix) and entry[len(prefix):len(prefix) + 1].isdigit()]
+    return [os.path.join(history_dir, entry) for entry in sorted(versions, reverse=True)]
+
+
+def restore_version(path: str, version_path: str, history: int = 0):
+    """用历史版本替换当前文件（当前版本同样存入历史，可再回滚回来）"""
+    with open(version_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    write_json(path, data, history=history)
+
+
+def retire(path: str, history: int):
+    """删除文件前把它存入历史目录（history 为 0 时直接删除）"""
+    if not os.path.exists(path):
+        return
+    with file_lock(path):
+        if history > 0:
+            _archive(path)
+            _prune(path, history)
+        os.remove(path)
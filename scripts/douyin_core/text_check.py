@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+文案预检
+标题 / 话题在启动浏览器前检查：敏感词（Aho–Corasick 自动机，一遍扫描匹配整张词表）、
+长度、表情符号、话题数量与格式。词表编译一次后按文件 mtime 缓存，整批扫描只需毫秒级
+只用标准库
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import PROJECT_DIR
+
+# 表情符号（常见区段）
+EMOJI_RE = re.compile('[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF]')
+
+# 匹配前从文案中去掉的字符：空白、零宽字符、常见分隔标点（防止"敏 感 词"之类绕过）
+IGNORED_CHARS_RE = re.compile(r'[\s\u200b-\u200f\u2060\ufeff\ufe0f·・._\-*|/\\]+')
+
+
+def normalize_text(text: str) -> str:
+    """全角转半角、统一大小写、去掉空白和分隔符"""
+    return IGNORED_CHARS_RE.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick 多模式匹配自动机
+
+    构建：所有词插入 trie，再按 BFS 建失配指针并合并输出；匹配：对文本只扫描一遍，
+    复杂度与文本长度 + 命中数成正比，与词表大小无关
+    """
+
+    def __init__(self, words: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for word in words:
+            self._insert(word)
+        self._build()
+
+    def _insert(self, word: str):
+        node = 0
+        for char in word:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        if word not in self._output[node]:
+            self._output[node].append(word)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[str]:
+        """返回文本中出现的词（去重，按首次出现顺序）"""
+        found: Dict[str, None] = {}
+        node = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for word in output[node]:
+                found.setdefault(word)
+        return list(found)
+
+
+def resolve_word_lists(config: dict) -> List[str]:
+    """词表路径（相对路径以项目根目录为基准）"""
+    paths = config.get('text', {}).get('word_lists', [])
+    return [path if os.path.isabs(path) else str(PROJECT_DIR / path) for path in paths]
+
+
+def load_words(paths: List[str]) -> List[str]:
+    """读取词表：每行一个词，# 开头为注释；不存在的文件跳过"""
+    words = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                word = normalize_text(line.split('#', 1)[0])
+                if word:
+                    words.append(word)
+    return words
+
+
+_automaton_cache: Dict[Tuple, AhoCorasick] = {}
+_automaton_lock = threading.Lock()
+
+
+def get_automaton(config: dict) -> Optional[AhoCorasick]:
+    """编译词表（按 路径 + mtime 缓存，词表改动后自动重建）；没有词表时返回 None"""
+    paths = resolve_word_lists(config)
+    key = tuple((path, os.path.getmtime(path)) for path in paths if os.path.exists(path))
+    if not key:
+        return None
+    with _automaton_lock:
+        if key not in _automaton_cache:
+            _automaton_cache.clear()
+            _automaton_cache[key] = AhoCorasick(load_words(paths))
+        return _automaton_cache[key]
+
+
+def check_text(job: Dict[str, Any], config: dict) -> Tuple[List[str], List[str], List[str]]:
+    """
+    检查一条任务的标题和话题
+
+    Returns:
+        (errors, warnings, matched_words)；敏感词按 text.action 记为错误或警告
+    """
+    settings = config.get('text', {})
+    limits = config.get('validation', {})
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    title = job.get('title') or ''
+    topics = [str(topic) for topic in (job.get('topics') or [])]
+
+    # 标题
+    max_title_len = limits.get('max_title_len', 55)
+    if not title.strip():
+        errors.append('标题为空')
+    elif len(title) > max_title_len:
+        errors.append(f"标题过长：{len(title)} 字（最多 {max_title_len}）")
+    emoji_count = len(EMOJI_RE.findall(title))
+    if emoji_count > settings.get('max_title_emoji', 5):
+        errors.append(f"标题表情过多：{emoji_count} 个（最多 {settings.get('max_title_emoji', 5)}）")
+
+    # 话题
+    max_topics = limits.get('max_topics', 5)
+    if len(topics) > max_topics:
+        errors.append(f"话题过多：{len(topics)} 个（最多 {max_topics}）")
+    if len(set(topics)) < len(topics):
+        warnings.append('话题重复')
+    for topic in topics:
+        if not topic.strip():
+            errors.append('话题为空')
+        elif len(topic) > settings.get('max_topic_len', 20):
+            errors.append(f"话题过长：#{topic}（最多 {settings.get('max_topic_len', 20)} 字）")
+        elif topic.startswith('#') or re.search(r'\s', topic):
+            errors.append(f"话题格式错误：{topic}（不要带 # 或空格）")
+        elif EMOJI_RE.search(topic):
+            errors.append(f"话题不能包含表情：#{topic}")
+
+    # 敏感词
+    matched: List[str] = []
+    automaton = get_automaton(config)
+    if automaton is not None:
+        # 标题和各话题之间用 \0 隔开，避免跨字段拼出词
+        matched = automaton.find_all('\0'.join(normalize_text(text) for text in [title] + topics))
+        if matched:
+            message = f"包含敏感词：{'、'.join(matched)}"
+            (errors if settings.get('action', 'warn') == 'block' else warnings).append(message)
+
+    return errors, warnings, matched
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+话题索引
+记录曾在平台话题下拉中匹配到建议项的话题（次数、最近使用时间、建议项文本），
+已知话题输入后不再等待下拉出现，直接回车确认（见 steps.add_topics）
+只用标准库
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .config import PROJECT_DIR
+from .storage import write_json
+
+DEFAULT_INDEX_FILE = '.cache/topic_index.json'
+
+_indexes: Dict[str, 'TopicIndex'] = {}
+_indexes_lock = threading.Lock()
+
+
+class TopicIndex:
+    """话题 -> {'count', 'last_used', 'suggestion'}，落盘为 JSON（先写临时文件再替换）"""
+
+    def __init__(self, path: str, max_entries: int = 2000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def __contains__(self, topic: str) -> bool:
+        with self._lock:
+            return topic in self._entries
+
+    def get(self, topic: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(topic)
+
+    def record(self, topic: str, suggestion: Optional[str] = None):
+        """记录一次匹配到建议项的话题"""
+        with self._lock:
+            entry = self._entries.setdefault(topic, {'count': 0, 'last_used': 0, 'suggestion': None})
+            entry['count'] += 1
+            entry['last_used'] = int(time.time())
+            if suggestion:
+                entry['suggestion'] = suggestion
+            self._dirty = True
+
+    def forget(self, topic: str):
+        """话题不再出现建议项（如被平台下线）时移除"""
+        with self._lock:
+            if self._entries.pop(topic, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            # 超出上限时淘汰最久未用的
+            if len(self._entries) > self.max_entries:
+                keep = sorted(self._entries.items(), key=lambda item: item[1]['last_used'],
+                              reverse=True)[:self.max_entries]
+                self._entries = dict(keep)
+            write_json(self.path, self._entries)
+            self._dirty = False
+
+
+def get_topic_index(config: dict) -> TopicIndex:
+    """按配置取进程内共享的话题索引"""
+    settings = config.get('topics', {})
+    path = settings.get('index_file', DEFAULT_INDEX_FILE)
+    if not os.path.isabs(path):
+        path = str(PROJECT_DIR / path)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = TopicIndex(path, settings.get('max_entries', 2000))
+        return _indexes[path]
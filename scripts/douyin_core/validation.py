@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+批量预校验
+在启动浏览器之前并行检查整个清单：素材文件、图片能否解码及尺寸、视频探测、
+文案（长度、表情、话题、敏感词，见 text_check）、批内重复；输出一份报告，并按 validation.policy
+整批终止（stop）或隔离不通过的行（quarantine）
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import PROJECT_DIR
+from .media_probe import ProbeCache
+from .checks import inspect_video, read_image_header, image_truncated, job_kind
+from .text_check import check_text
+
+VISIBLE_VALUES = ('public', 'friends', 'private')
+
+# 指纹只读取文件首尾各 64KB
+FINGERPRINT_CHUNK = 64 * 1024
+
+
+def file_fingerprint(path: str) -> str:
+    """快速文件指纹：大小 + 首尾 64KB 的 SHA1（用于批内重复检测）"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK * 2:
+            f.seek(-FINGERPRINT_CHUNK, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+
+def content_fingerprint(paths: List[str]) -> str:
+    """一组素材的内容指纹（与顺序无关），用于批内查重和发布记录查询"""
+    digest = hashlib.sha1('|'.join(sorted(file_fingerprint(path) for path in paths)).encode())
+    return digest.hexdigest()
+
+
+def _check_image_file(path: str, settings: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """单张图片：存在、格式、完整性、尺寸、（可选）完整解码"""
+    if not os.path.exists(path):
+        return None, f"图片文件不存在：{path}"
+
+    header = read_image_header(path)
+    if header is None:
+        return None, f"无法识别的图片格式：{os.path.basename(path)}"
+    fmt, width, height = header
+    if image_truncated(path, fmt):
+        return None, f"图片文件不完整：{os.path.basename(path)}"
+
+    min_side = settings.get('min_image_side', 0)
+    if min(width, height) < min_side:
+        return None, f"图片尺寸过小：{os.path.basename(path)} {width}x{height}（短边至少 {min_side}px）"
+
+    if settings.get('image_decode') == 'full':
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        if Image is not None:
+            try:
+                with Image.open(path) as image:
+                    image.load()
+            except Exception as e:
+                return None, f"图片无法解码：{os.path.basename(path)}（{e}）"
+
+    return {'path': path, 'format': fmt, 'width': width, 'height': height}, None
+
+
+def validate_job(index: int, job: Dict[str, Any], config: dict, cache: ProbeCache) -> Dict[str, Any]:
+    """校验单条任务，返回报告行 {'index', 'title', 'kind', 'errors', 'warnings', 'assets', 'fingerprint'}"""
+    settings = config.get('validation', {})
+    kind = job_kind(job)
+    title = job.get('title') or ''
+    row = {'index': index, 'title': title or f'post_{index}', 'kind': kind,
+           'errors': [], 'warnings': [], 'assets': [], 'fingerprint': None, 'matched_words': []}
+
+    # 文案：长度、表情、话题、敏感词
+    errors, warnings, row['matched_words'] = check_text(job, config)
+    row['errors'].extend(errors)
+    row['warnings'].extend(warnings)
+    if job.get('visible', 'public') not in VISIBLE_VALUES:
+        row['errors'].append(f"可见性无效：{job.get('visible')}")
+
+    # 素材
+    files = []
+    if kind == 'video':
+        info, error = inspect_video(job.get('video') or '', config, cache)
+        if error:
+            row['errors'].append(error)
+        else:
+            files.append(job['video'])
+            row['assets'].append(info or {'path': job['video']})
+            if info is None and config['video'].get('probe', True):
+                row['warnings'].append('无法解析视频元数据，跳过时长和编码检查')
+        if job.get('cover'):
+            cover, error = _check_image_file(job['cover'], settings)
+            if error:
+                row['errors'].append(f"封面：{error}")
+            else:
+                row['assets'].append(cover)
+    else:
+        images = job.get('images') or []
+        min_images = config['post'].get('min_images', 2)
+        max_images = config['post'].get('max_images', 9)
+        if len(images) < min_images:
+            row['errors'].append(f"图片数量不足：{len(images)} 张（至少 {min_images}）")
+        if len(images) > max_images:
+            row['warnings'].append(f"图片超过 {max_images} 张，只会使用前 {max_images} 张")
+            images = images[:max_images]
+        for path in images:
+            image, error = _check_image_file(path, settings)
+            if error:
+                row['errors'].append(error)
+            else:
+                files.append(path)
+                row['assets'].append(image)
+
+    if files and not row['errors'] and settings.get('duplicates', 'error') != 'off':
+        row['fingerprint'] = content_fingerprint(files)
+    return row
+
+
+def _mark_duplicates(rows: List[Dict[str, Any]], mode: str):
+    """批内重复：素材完全相同记为错误或警告（按 mode），标题相同只警告"""
+    if mode == 'off':
+        return
+    first_by_fingerprint: Dict[str, int] = {}
+    first_by_title: Dict[str, int] = {}
+    for row in rows:
+        fingerprint = row.get('fingerprint')
+        if fingerprint:
+            if fingerprint in first_by_fingerprint:
+                message = f"与第 {first_by_fingerprint[fingerprint]} 行素材重复"
+                (row['errors'] if mode == 'error' else row['warnings']).append(message)
+            else:
+                first_by_fingerprint[fingerprint] = row['index']
+        title = row['title'].strip()
+        if title in first_by_title:
+            row['warnings'].append(f"与第 {first_by_title[title]} 行标题相同")
+        else:
+            first_by_title[title] = row['index']
+
+
+def validate_batch(
+    config: dict,
+    jobs: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    near_index=None,
+    first_index: int = 0
+) -> Dict[str, Any]:
+    """
+    并行校验整批任务
+
+    Args:
+        near_index: 近似重复索引（douyin_core.dedupe.NearDuplicateIndex），默认新建；
+                    分块校验时传入同一个实例，块与块之间也能比较
+        first_index: 第一条任务的行号（分块校验时报告中显示清单行号）
+
+    Returns:
+        {'rows': [...], 'total', 'passed', 'failed', 'warnings', 'elapsed_s'}
+    """
+    settings = config.get('validation', {})
+    started = time.time()
+    cache = ProbeCache(config['video'].get('probe_cache_file'))
+    max_workers = max_workers or settings.get('workers', 8)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        rows = list(executor.map(lambda item: validate_job(item[0], item[1], config, cache),
+                                 enumerate(jobs, first_index)))
+    cache.save()
+
+    _mark_duplicates(rows, settings.get('duplicates', 'error'))
+    if near_index is None:
+        from .dedupe import NearDuplicateIndex
+        near_index = NearDuplicateIndex(config)
+    near_index.check(rows)
+    for row in rows:
+        row['ok'] = not row['errors']
+
+    failed = sum(not row['ok'] for row in rows)
+    return {
+        'rows': rows,
+        'total': len(rows),
+        'passed': len(rows) - failed,
+        'failed': failed,
+        'warnings': sum(len(row['warnings']) for row in rows),
+        'elapsed_s': round(time.time() - started, 2)
+    }
+
+
+def print_validation_report(report: Dict[str, Any], verbose: bool = False):
+    """打印校验报告（默认只列出有问题的行）"""
+    print(f"🔍 预校验 {report['total']} 条：通过 {report['passed']}，不通过 {report['failed']}，"
+          f"警告 {report['warnings']}（{report['elapsed_s']}s）")
+    for row in report['rows']:
+        if row['ok'] and not row['warnings'] and not verbose:
+            continue
+        status = '✅' if row['ok'] else '❌'
+        print(f"{status} [{row['index']}] {row['title']}（{row['kind']}）")
+        for error in row['errors']:
+            print(f"    ❌ {error}")
+        for warning in row['warnings']:
+            print(f"    ⚠️  {warning}")
+
+
+def write_quarantine(config: dict, jobs: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> Optional[str]:
+    """把不通过的行追加写入隔离文件（JSONL，附带错误原因），返回文件路径"""
+    bad_rows = [row for row in rows if not row['ok']]
+    if not bad_rows:
+        return None
+
+    path = config.get('validation', {}).get('quarantine_file', 'quarantine.jsonl')
+    if not os.path.isabs(path):
+        path = str(PROJECT_DIR / path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    quarantined_at = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'a', encoding='utf-8') as f:
+        for row in bad_rows:
+            job = {k: v for k, v in jobs[row['index']].items() if not k.startswith('_')}
+            f.write(json.dumps({'quarantined_at': quarantined_at, 'index': row['index'],
+                                'errors': row['errors'], 'job': job}, ensure_ascii=False) + '\n')
+    return path
+
+
+def apply_policy(config: dict, jobs: List[Dict[str, Any]], report: Dict[str, Any]) -> List[int]:
+    """
+    按 validation.policy 处理校验结果
+
+    Returns:
+        可以发布的行号；stop 策略下有任何不通过则返回空列表
+    """
+    policy = config.get('validation', {}).get('policy', 'stop')
+    passed = [row['index'] for row in report['rows'] if row['ok']]
+    if not report['failed']:
+        return passed
+
+    if policy == 'quarantine':
+        path = write_quarantine(config, jobs, report['rows'])
+        print(f"🚧 已隔离 {report['failed']} 条到 {path}，其余 {len(passed)} 条继续发布")
+        return passed
+
+    print(f"🛑 {report['failed']} 条未通过预校验，整批终止（validation.policy=stop）")
+    return []
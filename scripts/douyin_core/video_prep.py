@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+视频预处理（上传前）
+本地 ffmpeg 工作池：faststart 重封装、可选按目标码率/分辨率重编码，
+输出按内容哈希缓存，并统计每个视频节省的上传字节（及按配置的上行带宽估算的上传时间）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .config import PROJECT_DIR
+from .media_probe import ProbeCache, probe_video
+
+DEFAULT_PREP_CONFIG = {
+    "enable": False,
+    "ffmpeg_bin": "ffmpeg",
+    "workers": 2,
+    "cache_dir": ".cache/video_prep",
+    "faststart": True,
+    "transcode": False,
+    "target_codec": "h264",
+    "target_bitrate_kbps": 6000,
+    "max_short_side": 1080,
+    "preset": "veryfast",
+    "audio_bitrate_kbps": 128,
+    # 本地上行带宽，只用于估算节省的上传时间（est_upload_s_saved）
+    "uplink_mbps": 20
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_prep_config(config: dict) -> dict:
+    """读取 video.prep 配置（补齐默认值）"""
+    prep_config = dict(DEFAULT_PREP_CONFIG)
+    prep_config.update(config.get('video', {}).get('prep', {}))
+    return prep_config
+
+
+def content_hash(path: str) -> str:
+    """流式计算文件内容 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan_prep(info: Optional[dict], prep_config: dict) -> Dict[str, bool]:
+    """根据探测结果决定是否需要重封装 / 重编码"""
+    plan = {'remux': False, 'transcode': False}
+    if info is None:
+        return plan
+
+    if prep_config.get('transcode'):
+        bitrate = info.get('bitrate_kbps') or 0
+        target_bitrate = prep_config['target_bitrate_kbps']
+        short_side = min(info.get('width') or 0, info.get('height') or 0)
+        if (bitrate > target_bitrate * 1.2
+                or short_side > prep_config['max_short_side']
+                or info.get('video_codec') != prep_config['target_codec']):
+            plan['transcode'] = True
+            return plan
+
+    if prep_config.get('faststart') and info.get('faststart') is False:
+        plan['remux'] = True
+    return plan
+
+
+def build_ffmpeg_cmd(src: str, dst: str, info: dict, plan: Dict[str, bool], prep_config: dict) -> List[str]:
+    """生成 ffmpeg 命令"""
+    cmd = [prep_config['ffmpeg_bin'], '-hide_banner', '-loglevel', 'error', '-y', '-i', src]
+
+    if plan['transcode']:
+        target = prep_config['target_bitrate_kbps']
+        cmd += ['-c:v', 'libx264', '-preset', prep_config['preset'],
+                '-b:v', f'{target}k', '-maxrate', f'{int(target * 1.5)}k', '-bufsize', f'{target * 2}k',
+                '-pix_fmt', 'yuv420p']
+        width, height = info.get('width') or 0, info.get('height') or 0
+        max_side = prep_config['max_short_side']
+        if min(width, height) > max_side:
+            scale = f'scale={max_side}:-2' if width <= height else f'scale=-2:{max_side}'
+            cmd += ['-vf', scale]
+        cmd += ['-c:a', 'aac', '-b:a', f"{prep_config['audio_bitrate_kbps']}k"]
+    else:
+        cmd += ['-c', 'copy']
+
+    cmd += ['-map_metadata', '0', '-movflags', '+faststart', dst]
+    return cmd
+
+
+def prepare_video(video_path: str, config: dict, cache: Optional[ProbeCache] = None) -> dict:
+    """
+    预处理单个视频
+
+    Returns:
+        报告字典，其中 output 为实际应上传的文件路径（无需处理或失败时为原文件）
+    """
+    prep_config = get_prep_config(config)
+    if cache is None:
+        cache = ProbeCache(config.get('video', {}).get('probe_cache_file'))
+    started = time.time()
+    report = {
+        'source': video_path,
+        'output': video_path,
+        'action': 'none',
+        'cached': False,
+        'bytes_before': os.path.getsize(video_path),
+        'bytes_after': os.path.getsize(video_path),
+        'bytes_saved': 0,
+        'est_upload_s_saved': 0.0,
+        'elapsed_s': 0.0,
+        'error': None
+    }
+
+    info = probe_video(video_path, config, cache)
+    plan = plan_prep(info, prep_config)
+    if not (plan['remux'] or plan['transcode']):
+        return report
+
+    ffmpeg_bin = prep_config['ffmpeg_bin']
+    if not shutil.which(ffmpeg_bin):
+        report['error'] = f'未找到 {ffmpeg_bin}，跳过预处理'
+        return report
+
+    action = 'transcode' if plan['transcode'] else 'remux'
+    # 缓存键 = 内容哈希 + 影响输出的参数
+    options_key = json.dumps([action, prep_config['target_codec'], prep_config['target_bitrate_kbps'],
+                              prep_config['max_short_side'], prep_config['preset'],
+                              prep_config['audio_bitrate_kbps']])
+    options_hash = hashlib.sha256(options_key.encode('utf-8')).hexdigest()[:8]
+
+    cache_dir = prep_config['cache_dir']
+    if not os.path.isabs(cache_dir):
+        cache_dir = str(PROJECT_DIR / cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    output = os.path.join(cache_dir, f"{content_hash(video_path)[:24]}_{options_hash}.mp4")
+
+    if os.path.exists(output):
+        report['cached'] = True
+    else:
+        # 同一视频可能被多个线程同时预处理，临时文件各自独立，最后原子替换
+        fd, tmp_output = tempfile.mkstemp(dir=cache_dir, suffix='.tmp.mp4')
+        os.close(fd)
+        cmd = build_ffmpeg_cmd(video_path, tmp_output, info, plan, prep_config)
+        proc = subprocess.run(cmd, capture_output=True, check=False)
+        if proc.returncode != 0 or not os.path.getsize(tmp_output):
+            report['error'] = proc.stderr.decode('utf-8', errors='replace').strip()[-500:] or 'ffmpeg 执行失败'
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+            report['elapsed_s'] = round(time.time() - started, 2)
+            return report
+        os.replace(tmp_output, output)
+
+    bytes_after = os.path.getsize(output)
+    if plan['transcode'] and bytes_after >= report['bytes_before']:
+        # 重编码后反而更大：放弃结果，保留原文件
+        report['error'] = '重编码后文件未变小，保留原文件'
+        report['elapsed_s'] = round(time.time() - started, 2)
+        return report
+
+    bytes_saved = report['bytes_before'] - bytes_after
+    report.update({
+        'output': output,
+        'action': action,
+        'bytes_after': bytes_after,
+        'bytes_saved': bytes_saved,
+        'est_upload_s_saved': round(bytes_saved * 8 / (prep_config['uplink_mbps'] * 1e6), 1),
+        'elapsed_s': round(time.time() - started, 2)
+    })
+    return report
+
+
+def prepare_batch(video_paths: List[str], config: dict, max_workers: Optional[int] = None) -> Dict[str, dict]:
+    """ffmpeg 工作池并行预处理一批视频"""
+    prep_config = get_prep_config(config)
+    cache = ProbeCache(config.get('video', {}).get('probe_cache_file'))
+    max_workers = max_workers or prep_config['workers']
+
+    unique_paths = list(dict.fromkeys(video_paths))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        reports = dict(zip(unique_paths, executor.map(lambda p: prepare_video(p, config, cache), unique_paths)))
+
+    cache.save()
+    return reports
+
+
+def print_prep_report(report: dict):
+    """打印单个视频的预处理结果"""
+    name = os.path.basename(report['source'])
+    if report['error']:
+        print(f"⚠️  预处理 {name}：{report['error']}")
+    elif report['action'] == 'none':
+        print(f"✓ {name} 无需预处理")
+    else:
+        source = '缓存' if report['cached'] else f"{report['elapsed_s']}s"
+        print(f"✅ {name} {report['action']}（{source}）："
+              f"节省 {report['bytes_saved'] / 1024 / 1024:.1f}MB，"
+              f"估算上传快 {report['est_upload_s_saved']}s（按 video.prep.uplink_mbps）")
+
+
+def main():
+    """命令行：预处理视频"""
+    parser = argparse.ArgumentParser(description='视频上传前预处理（faststart / 重编码）')
+    parser.add_argument('videos', nargs='+', help='视频文件路径')
+    parser.add_argument('--transcode', action='store_true', help='允许按目标码率重编码')
+    parser.add_argument('--target-bitrate', type=int, help='目标码率（kbps）')
+    parser.add_argument('--workers', type=int, help='并行 ffmpeg 数')
+    parser.add_argument('--output-json', action='store_true', help='输出 JSON 报告')
+    args = parser.parse_args()
+
+    prep = {'transcode': args.transcode}
+    if args.target_bitrate:
+        prep['target_bitrate_kbps'] = args.target_bitrate
+    config = {'video': {'prep': prep}}
+
+    reports = prepare_batch(args.videos, config, args.workers)
+    if args.output_json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        for report in reports.values():
+            print_prep_report(report)
+
+    sys.exit(0 if not any(r['error'] for r in reports.values()) else 1)
+
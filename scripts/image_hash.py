@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+图片感知哈希命令行（实现见 douyin_core.image_hash）
+
+用法：
+    python scripts/image_hash.py a.jpg b.jpg
+"""
+
+from douyin_core.image_hash import main
+
+if __name__ == '__main__':
+    main()
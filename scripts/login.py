@@ -13,6 +13,9 @@ from pathlib import Path
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
+from douyin_core.display_pool import display_launch_options, get_display_pool
+from douyin_core.cookies import load_cookies, save_cookies
+
 
 def load_config(config_path: str = "assets/config.json") -> dict:
     """加载配置文件"""
@@ -27,21 +30,6 @@ def load_config(config_path: str = "assets/config.json") -> dict:
     return default_config
 
 
-def save_cookies(cookies: list, cookie_file: str):
-    """保存 Cookie 到文件"""
-    with open(cookie_file, 'w', encoding='utf-8') as f:
-        json.dump(cookies, f, indent=2)
-    print(f"✅ Cookie 已保存：{cookie_file}")
-
-
-def load_cookies(cookie_file: str) -> list:
-    """从文件加载 Cookie"""
-    if os.path.exists(cookie_file):
-        with open(cookie_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-
 def login(config: dict, script_dir: str = '.'):
     """执行扫码登录"""
     cookie_file = config['account'].get('cookie_file', 'cookies.json')
@@ -62,7 +50,8 @@ def login(config: dict, script_dir: str = '.'):
     
     print("🌐 启动浏览器...")
     
-    with sync_playwright() as p:
+    # 服务器上没有桌面时从虚拟显示池租一个显示
+    with sync_playwright() as p, get_display_pool(config).lease() as display:
         # 启动浏览器
         browser = p.chromium.launch(
             headless=headless,
@@ -72,7 +61,8 @@ def login(config: dict, script_dir: str = '.'):
                 '--disable-dev-shm-usage',
                 '--disable-accelerated-2d-canvas',
                 '--disable-gpu'
-            ]
+            ],
+            **display_launch_options(display)
         )
         
         # 创建上下文
@@ -14,6 +14,8 @@ from datetime import datetime
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
+from douyin_core.cookies import load_cookies, save_cookies
+
 
 DEFAULT_CONFIG = {
     "account": {"cookie_file": "cookies.json"},
@@ -51,22 +53,6 @@ def load_config(config_path: str = "assets/config.json") -> dict:
     return DEFAULT_CONFIG
 
 
-def save_cookies(cookies: list, cookie_file: str):
-    """保存 Cookie 到文件"""
-    os.makedirs(os.path.dirname(cookie_file) if os.path.dirname(cookie_file) else '.', exist_ok=True)
-    with open(cookie_file, 'w', encoding='utf-8') as f:
-        json.dump(cookies, f, indent=2, ensure_ascii=False)
-    print(f"✅ Cookie 已保存：{cookie_file}")
-
-
-def load_cookies(cookie_file: str) -> list:
-    """从文件加载 Cookie"""
-    if os.path.exists(cookie_file):
-        with open(cookie_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-
 def image_to_base64(image_path: str) -> str:
     """图片转 Base64"""
     with open(image_path, 'rb') as f:
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+视频元数据探测命令行（实现见 douyin_core.media_probe）
+
+用法：
+    python scripts/media_probe.py a.mp4 b.mov --workers 8
+"""
+
+from douyin_core.media_probe import main
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,128 @@
 #!/usr/bin/env python3
 """
 OpenClaw 集成接口
-用于 OpenClaw 技能调用
+用于 OpenClaw 技能调用，发布走与命令行相同的 douyin_core 流程
+
+--action serve 为常驻模式：浏览器和各账号上下文常驻，每个账号保留一个已加载、已确认登录的
+热备发布页（standby），从标准输入逐行读取 JSON 发布请求，每条完成后向标准输出写一行 JSON 结果：
+    {"id": 1, "title": "...", "images": ["a.jpg"], "topics": ["旅行"], "account": "账号A"}
+    {"id": 1, "action": "post", "success": true, "message": "发布成功", "data": {...}}
 """
 
 import argparse
 import json
 import os
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Dict
+
+from douyin_core import load_config, resolve_cookie_file
+
+# 常驻模式请求中的素材路径字段
+_PATH_FIELDS = ('video', 'cover')
+
+
+def serve(config: dict, script_dir: str, base_dir: str):
+    """常驻模式：从标准输入读发布请求，按账号交给宿主的工作线程，完成一条输出一条"""
+    from douyin_core import deep_merge
+    from douyin_core.cookies import load_cookies
+    from douyin_core.host import BrowserHost
+    from douyin_core.ledger import account_name
+    from douyin_core.publish import account_config, publish_batch
+    from douyin_core.screenshots import configure as configure_screenshots
+
+    config = deep_merge(config, {'standby': {'enable': True}})
+    configure_screenshots(config)
+    default = account_name(config)
+    output_lock = threading.Lock()
+    # 每条请求各走一次 publish_batch，账号的最小发布间隔在这里跨请求保持（以发布结果返回的时刻计，偏保守）
+    last_submit: Dict[str, float] = {}
+    # 标准输出只写结果行，发布过程的日志改走标准错误
+    results_out, sys.stdout = sys.stdout, sys.stderr
+
+    def emit(payload: dict):
+        with output_lock:
+            results_out.write(json.dumps(payload, ensure_ascii=False) + '\n')
+            results_out.flush()
+
+    def publish_one(name: str, cfg: dict, job: dict):
+        # 在账号所属的工作线程中执行，同一账号的请求按顺序到达这里
+        min_gap_s = cfg['post'].get('min_gap_s', 0)
+        gap_wait = last_submit.get(name, 0) + min_gap_s - time.time()
+        if gap_wait > 0:
+            print(f"⏳ [{name}] 距上次发布不足 {min_gap_s:.0f}s，等待 {gap_wait:.0f}s...")
+            time.sleep(gap_wait)
+
+        def submitted(job, result):
+            if result['submitted']:
+                last_submit[name] = time.time()
 
-from douyin_post import load_config, post_douyin
+        return publish_batch(cfg, [job], script_dir, on_result=submitted, session=host.session)
+
+    def warm(cfg: dict):
+        # 进出一次账号上下文，归还时预加载该账号的热备发布页
+        with host.session(cfg, load_cookies(resolve_cookie_file(cfg, script_dir))):
+            pass
+
+    with BrowserHost(config) as host:
+        host.submit(default, lambda: warm(config))
+        print("🟢 常驻模式已就绪，等待发布请求（每行一个 JSON）")
+
+        futures = []
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                emit({'action': 'post', 'success': False, 'message': f'请求不是有效 JSON：{e}', 'data': {}})
+                continue
+            request_id = job.pop('id', None)
+            for field in _PATH_FIELDS:
+                if job.get(field):
+                    job[field] = os.path.join(base_dir, job[field])
+            if job.get('images'):
+                job['images'] = [os.path.join(base_dir, path) for path in job['images']]
+            name = job.get('account') or default
+            cfg = config if name == default else account_config(config, name)
+
+            def done(future, request_id=request_id):
+                response = {'id': request_id, 'action': 'post', 'success': False, 'message': '', 'data': {}}
+                try:
+                    post_result = future.result()[0]
+                    response['success'] = post_result['success']
+                    response['message'] = '发布成功' if post_result['success'] else (
+                        post_result.get('error') or '发布失败')
+                    response['data'] = {k: post_result[k] for k in ('attempts', 'timings', 'wall_s')
+                                        if k in post_result}
+                except Exception as e:
+                    response['message'] = str(e)
+                emit(response)
+
+            future = host.submit(name, lambda name=name, cfg=cfg, job=job: publish_one(name, cfg, job))
+            future.add_done_callback(done)
+            futures.append(future)
+
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        host.print_stats()
 
 
 def main():
     """OpenClaw 集成入口"""
     parser = argparse.ArgumentParser(description='OpenClaw 集成接口')
-    parser.add_argument('--action', required=True, choices=['post', 'login', 'status'],
-                       help='操作类型')
+    parser.add_argument('--action', required=True, choices=['post', 'login', 'status', 'serve'],
+                       help='操作类型（serve 为常驻模式，从标准输入读取发布请求）')
     parser.add_argument('--config', default='assets/config.json', help='配置文件路径')
     parser.add_argument('--title', help='图文标题')
     parser.add_argument('--images', nargs='+', help='图片文件路径')
+    parser.add_argument('--video', help='视频文件路径（与 --images 二选一）')
+    parser.add_argument('--cover', help='视频封面路径')
     parser.add_argument('--topics', nargs='+', help='话题标签')
     parser.add_argument('--visible', choices=['public', 'friends', 'private'],
                        default='public', help='可见性')
@@ -29,9 +131,19 @@ def main():
     
     args = parser.parse_args()
     
+    # 素材路径在切换目录前解析
+    images = [os.path.abspath(p) for p in args.images or []]
+    video = os.path.abspath(args.video) if args.video else None
+    cover = os.path.abspath(args.cover) if args.cover else None
+    
     # 切换脚本所在目录
+    base_dir = os.getcwd()
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
+
+    if args.action == 'serve':
+        serve(load_config(args.config), str(script_dir), base_dir)
+        return
     
     result = {
         'action': args.action,
@@ -45,33 +157,36 @@ def main():
         
         if args.action == 'login':
             from login import login
-            login(config)
+            login(config, script_dir=str(script_dir))
             result['success'] = True
             result['message'] = '登录完成'
         
         elif args.action == 'post':
-            if not args.title or not args.images:
-                result['message'] = '缺少必要参数：title, images'
+            if not args.title or not (images or video):
+                result['message'] = '缺少必要参数：title, images 或 video'
             else:
-                success = post_douyin(
-                    config=config,
-                    title=args.title,
-                    images=args.images,
-                    topics=args.topics,
-                    visible=args.visible
-                )
-                result['success'] = success
-                result['message'] = '发布成功' if success else '发布失败'
+                # 浏览器相关模块只在发布时加载，status 无需导入 Playwright
+                from douyin_core.publish import publish
+                from douyin_core.screenshots import configure as configure_screenshots
+                
+                configure_screenshots(config)
+                job = {'title': args.title, 'topics': args.topics, 'visible': args.visible}
+                if video:
+                    job.update(video=video, cover=cover)
+                else:
+                    job['images'] = images
+                post_result = publish(config, job, script_dir=str(script_dir))
+                result['success'] = post_result['success']
+                result['message'] = '发布成功' if post_result['success'] else (post_result.get('error') or '发布失败')
+                result['data'] = {k: post_result[k] for k in ('attempts', 'timings', 'wall_s')}
         
         elif args.action == 'status':
-            cookie_file = config['account'].get('cookie_file', 'cookies.json')
-            if os.path.exists(cookie_file):
-                result['success'] = True
-                result['message'] = '已登录'
-                result['data']['logged_in'] = True
-            else:
-                result['message'] = '未登录'
-                result['data']['logged_in'] = False
+            from douyin_core.cookies import cookie_status
+            
+            status = cookie_status(resolve_cookie_file(config, str(script_dir)))
+            result['success'] = status['logged_in']
+            result['message'] = '已登录' if status['logged_in'] else '未登录'
+            result['data'] = status
         
     except Exception as e:
         result['success'] = False
@@ -3,13 +3,14 @@
 抖音快速登录 - 生成登录链接，用户手机扫码
 """
 
-import json
 import os
 import time
 import qrcode
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from douyin_core.cookies import save_cookies
+
 
 def main():
     script_dir = Path(__file__).parent
@@ -99,10 +100,7 @@ def main():
             # 保存 Cookie
             cookies = context.cookies()
             if cookies:
-                cookie_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(cookie_file, 'w', encoding='utf-8') as f:
-                    json.dump(cookies, f, indent=2, ensure_ascii=False)
-                print(f"✅ Cookie 已保存：{cookie_file}")
+                save_cookies(cookies, str(cookie_file))
                 print()
                 print("🎉 登录完成！现在可以发布图文了")
             else:
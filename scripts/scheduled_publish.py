@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+定时精准发布
+两阶段：提前完成启动浏览器、上传、填写等慢操作（保持热页面或存为平台草稿），
+到点只执行"点击发布"，并报告实际发布时间与目标时间的偏差
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from douyin_core import load_config, resolve_cookie_file
+from douyin_core.checks import job_kind
+from douyin_core.media import MediaHandler, get_handler
+from douyin_core.cookies import load_cookies
+from douyin_core.ledger import account_name, open_ledger
+from douyin_core.network_metrics import add_to_trace, attach_network_metrics, format_network_summary
+from douyin_core.session import browser_session
+from douyin_core.steps import find_publish_button, check_publish_result
+from douyin_core.validation import validate_batch, print_validation_report
+from douyin_core.failure_trace import FailureTracer
+from douyin_core.screenshots import take_screenshot, configure as configure_screenshots
+
+DEFAULT_SCHEDULE_CONFIG = {
+    "mode": "hot",
+    # 提前多少秒开始第一阶段（上传 + 填写）
+    "lead_s": 300,
+    # 草稿模式下提前多少秒重新打开草稿
+    "reopen_lead_s": 60,
+    # 最后多少秒改为忙等以提高精度
+    "spin_s": 0.5
+}
+
+DRAFT_SAVE_SELECTORS = 'button:has-text("暂存离开"), button:has-text("存草稿"), button:has-text("保存草稿")'
+DRAFT_RESUME_SELECTORS = 'button:has-text("继续编辑"), [class*="draft"] button:has-text("编辑")'
+
+
+def get_schedule_config(config: dict) -> dict:
+    """读取 schedule 配置（补齐默认值）"""
+    schedule_config = dict(DEFAULT_SCHEDULE_CONFIG)
+    schedule_config.update(config.get('schedule', {}))
+    return schedule_config
+
+
+def parse_publish_time(value: str) -> datetime:
+    """解析发布时间：YYYY-MM-DD HH:MM[:SS] 或 HH:MM[:SS]（今天）"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+            return datetime.now().replace(hour=parsed.hour, minute=parsed.minute,
+                                          second=parsed.second, microsecond=0)
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析发布时间：{value}")
+
+
+def wait_until(target_ts: float, spin_s: float = 0.5, label: str = ''):
+    """等待到指定时间戳：先分段睡眠，最后 spin_s 秒忙等"""
+    remaining = target_ts - time.time()
+    if remaining > 60 and label:
+        print(f"⏳ 距{label}还有 {remaining:.0f}s...")
+    while True:
+        remaining = target_ts - time.time()
+        if remaining <= spin_s:
+            break
+        time.sleep(min(remaining - spin_s, 30))
+    while time.time() < target_ts:
+        time.sleep(0.001)
+
+
+def stage_post(page, handler: MediaHandler, post: Dict[str, Any]) -> bool:
+    """第一阶段：打开发布页、上传素材并填写全部信息（不点击发布）"""
+    return handler.prepare(page, post) and handler.compose(page, post)
+
+
+def save_draft(page) -> bool:
+    """存为平台草稿"""
+    try:
+        draft_btn = page.locator(DRAFT_SAVE_SELECTORS).first
+        if draft_btn.is_visible(timeout=5000):
+            draft_btn.click()
+            time.sleep(2)
+            print("✅ 已存为草稿")
+            return True
+    except Exception as e:
+        print(f"⚠️  存草稿失败：{e}")
+    print("❌ 未找到存草稿按钮")
+    return False
+
+
+def resume_draft(page, handler: MediaHandler) -> bool:
+    """重新打开发布页并恢复草稿"""
+    if not handler.open_page(page):
+        return False
+    try:
+        resume_btn = page.locator(DRAFT_RESUME_SELECTORS).first
+        if resume_btn.is_visible(timeout=5000):
+            resume_btn.click()
+            time.sleep(2)
+            print("✅ 已恢复草稿")
+            return True
+    except Exception as e:
+        print(f"⚠️  恢复草稿失败：{e}")
+    print("❌ 未找到草稿")
+    return False
+
+
+def _ledger_result(post: Dict[str, Any], report: Dict[str, Any], attempt_started: Optional[float]) -> Dict[str, Any]:
+    """把定时发布报告转换为发布记录库的结果格式（同 run_pipeline 的结果）"""
+    timings = {name: report[name] for name in ('staged_s', 'drift_s') if report[name] is not None}
+    return {
+        'title': post['_label'],
+        'success': report['success'],
+        'submitted': report['clicked_at'] is not None,
+        'attempts': 1 if attempt_started is not None else 0,
+        'timings': timings,
+        'wall_s': round(time.time() - attempt_started, 2) if attempt_started is not None else 0.0,
+        'failed_stage': report['failed_stage'],
+        'error_class': report['error_class'],
+        'error': report['error']
+    }
+
+
+def scheduled_post(
+    config: dict,
+    post: Dict[str, Any],
+    publish_at: datetime,
+    script_dir: str = '.'
+) -> Dict[str, Any]:
+    """
+    在指定时间精准发布
+    与批量发布一样先做预校验（文案、敏感词、重复），结果写入发布记录库（见 douyin_core.ledger），
+    准备到发布的整个过程记录网络指标，开启 tracing 时失败现场保存为 trace.zip
+
+    Args:
+        config: 完整配置（schedule.mode: hot=保持热页面，draft=先存草稿到点前恢复）
+        post: {'title', 'images' 或 'video', 'topics', 'visible', 'cover', 'bgm'}
+        publish_at: 目标发布时间（本地时间）
+
+    Returns:
+        报告 {'mode', 'target', 'clicked_at', 'drift_s', 'staged_s', 'success', 'failed_stage', 'error_class', 'error'}，
+        上传完成时另有 'upload'（吞吐，见 douyin_core.bandwidth），进入浏览器阶段后另有 'network'，
+        保存了失败现场时另有 'trace'
+    """
+    schedule_config = get_schedule_config(config)
+    mode = schedule_config['mode']
+    handler = get_handler(config, job_kind(post))
+    target_ts = publish_at.timestamp()
+    report = {
+        'mode': mode,
+        'target': publish_at.isoformat(sep=' ', timespec='seconds'),
+        'clicked_at': None,
+        'drift_s': None,
+        'staged_s': None,
+        'success': False,
+        'failed_stage': None,
+        'error_class': None,
+        'error': None
+    }
+
+    post = dict(post, _label=post.get('_label') or post.get('title') or 'scheduled_post', _index=0)
+    ledger = open_ledger(config)
+    stage = 'validation'
+    attempt_started = None
+    try:
+        # 启动浏览器前的预校验与批量发布相同
+        validation = validate_batch(config, [post])
+        print_validation_report(validation)
+        row = validation['rows'][0]
+        post['_fingerprint'] = row.get('fingerprint')
+        post['_image_hashes'] = row.get('image_hashes')
+        if not row['ok']:
+            report['error'] = '；'.join(row['errors'])
+            report['error_class'] = 'ValidationError'
+            return report
+
+        ready = handler.check([post])
+        if not ready:
+            report['error'] = '素材校验失败'
+            report['error_class'] = 'ValidationError'
+            return report
+        # 并发上传时按离发布时间的远近分配上行带宽
+        post = dict(ready[0], _publish_at=target_ts)
+
+        if target_ts - time.time() < 0:
+            report['error'] = '发布时间已过'
+            report['error_class'] = 'ValidationError'
+            return report
+
+        stage = 'login'
+        cookies = load_cookies(resolve_cookie_file(config, script_dir))
+        if not cookies:
+            report['error'] = '未找到 Cookie，请先运行 login.py 登录'
+            report['error_class'] = 'NotLoggedIn'
+            return report
+
+        # 第一阶段开始时间
+        wait_until(target_ts - schedule_config['lead_s'], label='准备阶段')
+
+        with browser_session(config, cookies) as (browser, context):
+            tracer = FailureTracer(context, config)
+            tracer.begin(f"{post['_label']}_scheduled")
+            page = context.new_page()
+            # 网络指标挂在准备阶段的页面上（上传在这里发生）；草稿模式恢复后的页面只剩点击发布
+            attach_network_metrics(page, post, config)
+
+            try:
+                stage = 'prepare'
+                attempt_started = staged_started = time.time()
+                staged = stage_post(page, handler, post)
+                if post.get('_upload'):
+                    report['upload'] = post['_upload']
+                if not staged:
+                    report['error'] = '准备阶段失败'
+                    return report
+
+                if mode == 'draft':
+                    stage = 'draft'
+                    if not save_draft(page):
+                        report['error'] = '存草稿失败'
+                        return report
+                    page.close()
+                    report['staged_s'] = round(time.time() - staged_started, 1)
+
+                    wait_until(target_ts - schedule_config['reopen_lead_s'], label='恢复草稿')
+                    page = context.new_page()
+                    if not resume_draft(page, handler):
+                        report['error'] = '恢复草稿失败'
+                        return report
+                else:
+                    report['staged_s'] = round(time.time() - staged_started, 1)
+
+                # 到点前先定位好发布按钮并截图，到点只剩一次点击
+                stage = 'submit'
+                publish_btn = find_publish_button(page)
+                if publish_btn is None:
+                    report['error'] = '未找到发布按钮'
+                    take_screenshot(page, "no_publish_button")
+                    return report
+                take_screenshot(page, "before_publish")
+
+                print(f"⏰ 已就绪，等待 {report['target']} 发布...")
+                wait_until(target_ts, schedule_config['spin_s'])
+                publish_btn.click()
+                clicked_ts = time.time()
+
+                report['clicked_at'] = datetime.fromtimestamp(clicked_ts).isoformat(sep=' ', timespec='milliseconds')
+                report['drift_s'] = round(clicked_ts - target_ts, 3)
+                print(f"✅ 已点击发布（偏差 {report['drift_s']:+.3f}s）")
+
+                stage = 'confirm'
+                time.sleep(5)
+                report['success'] = check_publish_result(page)
+                return report
+
+            except Exception as e:
+                report['error'] = str(e)
+                report['error_class'] = type(e).__name__
+                print(f"❌ 错误：{e}")
+                try:
+                    take_screenshot(page, "exception_error")
+                except Exception:
+                    pass
+                return report
+
+            finally:
+                # 关闭浏览器前收尾：失败才保存 trace，网络指标随报告输出并附加到 trace
+                trace_path = tracer.end(failed=not report['success'])
+                tracer.stop()
+                if trace_path:
+                    report['trace'] = trace_path
+                metrics = post.pop('_network', None)
+                if metrics is not None:
+                    report['network'] = metrics.summary()
+                    metrics.detach()
+                    print(f"🌐 网络：{format_network_summary(report['network'])}")
+                    if trace_path:
+                        add_to_trace(trace_path, report['network'])
+
+    finally:
+        report['failed_stage'] = None if report['success'] else stage
+        if ledger is not None:
+            with ledger:
+                ledger.record(account_name(config), post, _ledger_result(post, report, attempt_started))
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='抖音定时精准发布（提前上传，到点点击发布）')
+    parser.add_argument('--config', default='assets/config.json', help='配置文件路径')
+    parser.add_argument('--at', required=True, help='发布时间：YYYY-MM-DD HH:MM[:SS] 或 HH:MM[:SS]')
+    parser.add_argument('--title', required=True, help='标题')
+    parser.add_argument('--images', nargs='+', help='图片文件路径')
+    parser.add_argument('--video', help='视频文件路径')
+    parser.add_argument('--cover', help='视频封面路径')
+    parser.add_argument('--bgm', help='背景音乐标题')
+    parser.add_argument('--topics', nargs='+', help='话题标签（不含#）')
+    parser.add_argument('--visible', choices=['public', 'friends', 'private'], default='public', help='可见性')
+    parser.add_argument('--mode', choices=['hot', 'draft'], help='hot=保持热页面，draft=存草稿到点前恢复')
+    parser.add_argument('--lead', type=int, help='提前多少秒开始上传和填写')
+    parser.add_argument('--headless', action='store_true', help='无头模式')
+    parser.add_argument('--output-json', action='store_true', help='输出 JSON 报告')
+    args = parser.parse_args()
+
+    if not args.images and not args.video:
+        parser.error('需要 --images 或 --video')
+
+    publish_at = parse_publish_time(args.at)
+    post = {
+        'title': args.title,
+        'images': [os.path.abspath(p) for p in args.images or []],
+        'video': os.path.abspath(args.video) if args.video else None,
+        'cover': os.path.abspath(args.cover) if args.cover else None,
+        'bgm': args.bgm,
+        'topics': args.topics,
+        'visible': args.visible
+    }
+
+    script_dir = Path(__file__).parent
+    os.chdir(script_dir)
+
+    config = load_config(args.config)
+    config.setdefault('schedule', {})
+    if args.mode:
+        config['schedule']['mode'] = args.mode
+    if args.lead:
+        config['schedule']['lead_s'] = args.lead
+    if args.headless:
+        config['browser']['headless'] = True
+    configure_screenshots(config)
+
+    print("=" * 60)
+    print("⏰ 抖音定时发布")
+    print(f"📅 目标时间：{publish_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    report = scheduled_post(config, post, publish_at, script_dir=str(script_dir))
+
+    if args.output_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif report['success']:
+        print(f"✅ 发布完成：目标 {report['target']}，实际 {report['clicked_at']}，偏差 {report['drift_s']:+.3f}s")
+    else:
+        print(f"❌ 定时发布失败：{report['error']}")
+
+    sys.exit(0 if report['success'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+会话保活
+后台定期检查各账号的 Cookie：登录态临近过期（或距上次保存太久）时，用已有 Cookie 打开一个需要登录的
+轻量页面（keepalive.check_url），让服务端续期会话，再把浏览器里更新后的 Cookie 原子写回文件；
+会话已失效、或刷新后仍临近过期时发出告警（打印 + 可选 webhook），提前安排扫码，
+而不是等到发布时才撞上登录页
+
+- 账号：默认账号 + 配置 accounts 中的全部账号（Cookie 文件同 publish.account_config）
+- 过期时间看会话 Cookie（keepalive.session_cookies，如 sessionid），没有时看最早过期的持久 Cookie
+- 访问后的地址含 keepalive.login_marker 视为会话已失效，不覆盖原 Cookie 文件
+- check_url 可指向本地桩服务，SessionKeeper(visit=...) 也可替换整个访问步骤，便于离线验证
+
+用法：
+    python scripts/session_keepalive.py --once      # 检查 / 刷新一轮，有告警时退出码为 1
+    python scripts/session_keepalive.py             # 常驻，每 keepalive.interval_s 一轮
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from douyin_core import load_config, resolve_cookie_file
+from douyin_core.cookies import load_cookies, save_cookies
+from douyin_core.ledger import account_name
+
+DEFAULT_KEEPALIVE_CONFIG = {
+    "interval_s": 6 * 3600,
+    # 会话剩余时间少于 refresh_before_s，或 Cookie 文件超过 refresh_every_s 未更新时刷新
+    "refresh_before_s": 7 * 86400,
+    "refresh_every_s": 86400,
+    # 刷新后剩余时间仍少于 alert_before_s 时告警
+    "alert_before_s": 3 * 86400,
+    "check_url": "https://creator.douyin.com/creator-micro/home",
+    "login_marker": "login",
+    "timeout_ms": 30000,
+    "session_cookies": ["sessionid", "sessionid_ss", "sid_tt"],
+    # 告警 webhook（POST JSON），为空时只打印
+    "webhook": ""
+}
+
+
+def get_keepalive_config(config: dict) -> dict:
+    """读取 keepalive 配置（补齐默认值）"""
+    keepalive_config = dict(DEFAULT_KEEPALIVE_CONFIG)
+    keepalive_config.update(config.get('keepalive', {}))
+    return keepalive_config
+
+
+def session_expires_in_s(cookies: list, names: List[str]) -> Optional[int]:
+    """会话剩余秒数：优先看会话 Cookie，没有时看最早过期的持久 Cookie；都没有时返回 None"""
+    def expiries(items):
+        return [c['expires'] for c in items if isinstance(c.get('expires'), (int, float)) and c['expires'] > 0]
+
+    session = expiries([c for c in cookies if c.get('name') in names])
+    persistent = session or expiries(cookies)
+    if not persistent:
+        return None
+    return int(min(persistent) - time.time())
+
+
+def browser_visit(config: dict, cookies: list) -> Optional[list]:
+    """用 Cookie 打开 check_url，返回浏览器中更新后的 Cookie；被重定向到登录页时返回 None"""
+    from douyin_core.session import browser_session
+
+    settings = get_keepalive_config(config)
+    with browser_session(config, cookies) as (browser, context):
+        page = context.new_page()
+        page.goto(settings['check_url'], wait_until='domcontentloaded', timeout=settings['timeout_ms'])
+        try:
+            page.wait_for_load_state('networkidle', timeout=settings['timeout_ms'])
+        except Exception:
+            pass  # 长连接页面可能一直不空闲，已拿到文档即可
+        if settings['login_marker'] in page.url.lower():
+            return None
+        return context.cookies()
+
+
+def account_configs(config: dict) -> Dict[str, dict]:
+    """需要保活的账号：默认账号 + accounts 中的全部账号"""
+    from douyin_core.publish import account_config
+
+    default = account_name(config)
+    configs = {default: config}
+    for name in config.get('accounts', {}):
+        if name != default:
+            configs[name] = account_config(config, name)
+    return configs
+
+
+class SessionKeeper:
+    """按需刷新各账号会话并告警"""
+
+    def __init__(self, config: dict, script_dir: str = '.',
+                 visit: Optional[Callable[[dict, list], Optional[list]]] = None):
+        self.config = config
+        self.script_dir = script_dir
+        self.settings = get_keepalive_config(config)
+        self.visit = visit or browser_visit
+
+    def alert(self, account: str, message: str, data: Dict[str, Any]):
+        """打印告警，配置了 webhook 时同时 POST（失败只打印）"""
+        print(f"🚨 [{account}] {message}")
+        webhook = self.settings.get('webhook')
+        if not webhook:
+            return
+        payload = json.dumps({'account': account, 'message': message, **data}, ensure_ascii=False).encode()
+        request = urllib.request.Request(webhook, data=payload, headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            print(f"⚠️  告警发送失败：{e}")
+
+    def check_account(self, name: str, account_cfg: dict) -> Dict[str, Any]:
+        """
+        检查一个账号，需要时刷新
+
+        Returns:
+            {'account', 'cookie_file', 'expires_in_s', 'refreshed', 'alert'}
+        """
+        settings = self.settings
+        cookie_file = resolve_cookie_file(account_cfg, self.script_dir)
+        result = {'account': name, 'cookie_file': cookie_file, 'expires_in_s': None,
+                  'refreshed': False, 'alert': None}
+        try:
+            cookies = load_cookies(cookie_file)
+        except (OSError, ValueError) as e:
+            cookies = []
+            print(f"⚠️  [{name}] 读取 Cookie 失败：{e}")
+        if not cookies:
+            result['alert'] = '没有 Cookie，需要扫码登录'
+        else:
+            expires_in = result['expires_in_s'] = session_expires_in_s(cookies, settings['session_cookies'])
+            age = time.time() - os.path.getmtime(cookie_file)
+            if expires_in is not None and expires_in <= 0:
+                result['alert'] = '会话已过期，需要扫码登录'
+            elif expires_in is None or expires_in < settings['refresh_before_s'] or age > settings['refresh_every_s']:
+                self._refresh(name, account_cfg, cookies, cookie_file, result)
+            if result['alert'] is None and result['expires_in_s'] is not None \
+                    and result['expires_in_s'] < settings['alert_before_s']:
+                result['alert'] = f"会话 {result['expires_in_s'] / 86400:.1f} 天后过期，刷新未能延长，请尽快扫码登录"
+
+        if result['alert']:
+            self.alert(name, result['alert'], {'cookie_file': cookie_file, 'expires_in_s': result['expires_in_s']})
+        return result
+
+    def _refresh(self, name: str, account_cfg: dict, cookies: list, cookie_file: str, result: Dict[str, Any]):
+        print(f"🔄 [{name}] 刷新会话...")
+        try:
+            refreshed = self.visit(account_cfg, cookies)
+        except Exception as e:
+            # 网络问题等不判定为失效，下一轮重试
+            print(f"⚠️  [{name}] 刷新失败：{e}")
+            return
+        if refreshed is None:
+            result['alert'] = '会话已失效（跳转到登录页），需要扫码登录'
+            return
+        save_cookies(refreshed, cookie_file)
+        result['refreshed'] = True
+        result['expires_in_s'] = session_expires_in_s(refreshed, self.settings['session_cookies'])
+        if result['expires_in_s'] is not None:
+            print(f"✅ [{name}] 会话剩余 {result['expires_in_s'] / 86400:.1f} 天")
+
+    def run_once(self) -> List[Dict[str, Any]]:
+        """检查 / 刷新所有账号一轮"""
+        return [self.check_account(name, account_cfg) for name, account_cfg in account_configs(self.config).items()]
+
+    def run_forever(self):
+        """常驻：每 interval_s（±10% 随机）一轮"""
+        while True:
+            self.run_once()
+            interval = self.settings['interval_s']
+            time.sleep(interval * random.uniform(0.9, 1.1))
+
+
+def main():
+    """会话保活入口"""
+    parser = argparse.ArgumentParser(description='会话保活：临近过期前刷新 Cookie，失效前告警')
+    parser.add_argument('--config', default='assets/config.json', help='配置文件路径')
+    parser.add_argument('--once', action='store_true', help='只检查 / 刷新一轮')
+    args = parser.parse_args()
+
+    script_dir = Path(__file__).parent
+    os.chdir(script_dir)
+    keeper = SessionKeeper(load_config(args.config), str(script_dir))
+    if not args.once:
+        keeper.run_forever()
+    results = keeper.run_once()
+    sys.exit(1 if any(result['alert'] for result in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+视频上传前预处理命令行（实现见 douyin_core.video_prep）
+
+用法：
+    python scripts/video_prep.py *.mp4 --transcode --workers 4
+"""
+
+from douyin_core.video_prep import main
+
+if __name__ == '__main__':
+    main()